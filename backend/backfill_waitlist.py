@@ -0,0 +1,149 @@
+"""Backfill waitlistSeq on waitlisted registrations written before it existed.
+
+Legacy waitlist rows only carry their `position` (1 = head of the waitlist),
+so they are missing from eventId-waitlistSeq-index: event waitlists do not
+list them and promotion never reaches them. Each one gets
+waitlistSeq = position - LEGACY_SEQ_OFFSET. That keeps their order and puts
+them ahead of every sequence number the per-event counter hands out (those
+start at 1), so the backfill can run while the API is serving registrations
+without colliding with new entries.
+
+Once the rows are done, every event that had legacy rows or has no
+waitlistCount gets waitlistCount set to the length of its waitlist index,
+so the availability endpoint can read it from the event item. The count is
+written only if the event's version is unchanged since it was read, and
+retried otherwise, so joins and promotions running meanwhile are not lost.
+
+Every write is conditional, so the script can be stopped and run again.
+Run it once from backend/ after deploying the index:
+
+    python backfill_waitlist.py            # report what would change
+    python backfill_waitlist.py --apply
+"""
+import argparse
+from collections import defaultdict
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from db import table_from_env
+from pagination import count_all
+from scan import parallel_scan
+
+LEGACY_SEQ_OFFSET = 10 ** 9
+WAITLIST_INDEX = 'eventId-waitlistSeq-index'
+COUNT_ATTEMPTS = 5
+
+events_table = table_from_env('EVENTS_TABLE_NAME', 'Events')
+registrations_table = table_from_env('REGISTRATIONS_TABLE_NAME', 'Registrations')
+
+
+def legacy_seq(position):
+    """waitlistSeq for a legacy row, below every counter-allocated sequence number"""
+    return int(position) - LEGACY_SEQ_OFFSET
+
+
+def find_legacy_rows():
+    """Legacy waitlisted rows grouped by event, head of each waitlist first"""
+    rows = defaultdict(list)
+    for item in parallel_scan(
+        registrations_table,
+        FilterExpression=Attr('status').eq('waitlisted') & Attr('waitlistSeq').not_exists() & Attr('position').exists(),
+        ProjectionExpression='userId, eventId, #position',
+        ExpressionAttributeNames={'#position': 'position'}
+    ):
+        rows[item['eventId']].append(item)
+    for entries in rows.values():
+        entries.sort(key=lambda entry: int(entry['position']))
+    return rows
+
+
+def find_uncounted_events():
+    """Ids of events without a waitlistCount"""
+    return {
+        item['eventId'] for item in parallel_scan(
+            events_table, FilterExpression=Attr('waitlistCount').not_exists(), ProjectionExpression='eventId'
+        )
+    }
+
+
+def backfill_row(row):
+    """Give one legacy row its waitlistSeq; False if it changed since the scan"""
+    try:
+        registrations_table.update_item(
+            Key={'userId': row['userId'], 'eventId': row['eventId']},
+            UpdateExpression='SET waitlistSeq = :seq',
+            ConditionExpression='#status = :waitlisted AND attribute_not_exists(waitlistSeq)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':seq': legacy_seq(row['position']), ':waitlisted': 'waitlisted'}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def set_waitlist_count(event_id: str):
+    """Set waitlistCount from the waitlist index; the count, or None if the event is gone or kept changing"""
+    for _ in range(COUNT_ATTEMPTS):
+        event = events_table.get_item(
+            Key={'eventId': event_id}, ProjectionExpression='version', ConsistentRead=True
+        ).get('Item')
+        if event is None:
+            return None
+        count = count_all(
+            registrations_table.query, IndexName=WAITLIST_INDEX, KeyConditionExpression=Key('eventId').eq(event_id)
+        )
+        version = event.get('version')
+        condition = Attr('version').eq(version) if version is not None else Attr('version').not_exists()
+        try:
+            events_table.update_item(
+                Key={'eventId': event_id},
+                UpdateExpression='SET waitlistCount = :count ADD version :one',
+                ConditionExpression=Attr('eventId').exists() & condition,
+                ExpressionAttributeValues={':count': count, ':one': 1}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            # A join, leave or promotion changed the waitlist meanwhile; count again
+            continue
+        return count
+    return None
+
+
+def backfill(apply: bool):
+    """Backfill every legacy row, then every waitlistCount; returns (rows found, rows updated, events counted)"""
+    found = updated = counted = 0
+    legacy_rows = find_legacy_rows()
+    for event_id, rows in legacy_rows.items():
+        found += len(rows)
+        print(f"{event_id}: {len(rows)} legacy waitlist rows")
+        if apply:
+            updated += sum(backfill_row(row) for row in rows)
+    event_ids = set(legacy_rows) | find_uncounted_events()
+    print(f"{len(event_ids)} events need a waitlistCount")
+    if apply:
+        for event_id in sorted(event_ids):
+            count = set_waitlist_count(event_id)
+            if count is None:
+                print(f"{event_id}: skipped, deleted or still changing; run again")
+                continue
+            counted += 1
+    return found, updated, counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apply', action='store_true', help='write the changes (default: dry run)')
+    args = parser.parse_args()
+    found, updated, counted = backfill(args.apply)
+    if args.apply:
+        print(f"backfilled {updated} of {found} legacy waitlist rows and counted {counted} waitlists")
+    else:
+        print(f"{found} legacy waitlist rows; run with --apply to backfill them")
+
+
+if __name__ == '__main__':
+    main()
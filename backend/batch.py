@@ -0,0 +1,197 @@
+"""Batched DynamoDB reads and writes"""
+import contextvars
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+BATCH_GET_LIMIT = 100
+MAX_RETRIES = int(os.environ.get('BATCH_MAX_RETRIES', '8'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '8'))
+TRANSACT_CONFLICT_RETRIES = int(os.environ.get('TRANSACT_CONFLICT_RETRIES', '3'))
+
+_executor = None
+
+
+def get_executor():
+    """Shared thread pool for concurrent batch requests"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='ddb-batch')
+    return _executor
+
+
+def run_concurrently(func, args):
+    """Map `func` over `args` on the shared pool, keeping the caller's context in each task"""
+    futures = [get_executor().submit(contextvars.copy_context().run, func, arg) for arg in args]
+    return [future.result() for future in futures]
+
+
+def backoff(attempt: int):
+    """Sleep with capped exponential backoff and full jitter"""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    time.sleep(random.uniform(0, delay))
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def key_identity(key: dict):
+    """Hashable identity for a DynamoDB key"""
+    return tuple(sorted(key.items()))
+
+
+def _batch_get_chunk(table, keys, request_args):
+    """Run one BatchGetItem call, retrying UnprocessedKeys with backoff"""
+    request_items = {table.name: dict(request_args, Keys=keys)}
+    items = []
+    for attempt in range(MAX_RETRIES + 1):
+        response = table.meta.client.batch_get_item(RequestItems=request_items)
+        items.extend(response.get('Responses', {}).get(table.name, []))
+        request_items = response.get('UnprocessedKeys') or {}
+        if not request_items:
+            return items
+        backoff(attempt)
+    remaining = len(request_items[table.name]['Keys'])
+    raise RuntimeError(f"BatchGetItem left {remaining} keys unprocessed on {table.name} after {MAX_RETRIES} retries")
+
+
+def batch_get_items(table, keys, **request_args):
+    """Fetch items by primary key, returned in the same order as `keys`.
+
+    Keys are de-duplicated and split into BatchGetItem calls of 100 that run
+    concurrently. Keys with no matching item map to None. `request_args`
+    (such as ProjectionExpression) are sent with every call; a projection
+    must include the key attributes.
+    """
+    if not keys:
+        return []
+    key_names = list(keys[0].keys())
+    unique_keys = list({key_identity(key): key for key in keys}.values())
+    chunks = chunked(unique_keys, BATCH_GET_LIMIT)
+
+    if len(chunks) == 1:
+        results = [_batch_get_chunk(table, chunks[0], request_args)]
+    else:
+        results = run_concurrently(lambda chunk: _batch_get_chunk(table, chunk, request_args), chunks)
+
+    found = {}
+    for items in results:
+        for item in items:
+            found[key_identity({name: item[name] for name in key_names})] = item
+    return [found.get(key_identity(key)) for key in keys]
+
+
+BATCH_WRITE_LIMIT = 25
+
+
+def _batch_write_chunk(table, requests):
+    """Run one BatchWriteItem call, retrying UnprocessedItems with backoff"""
+    request_items = {table.name: requests}
+    for attempt in range(MAX_RETRIES + 1):
+        response = table.meta.client.batch_write_item(RequestItems=request_items)
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return len(requests)
+        backoff(attempt)
+    remaining = len(request_items[table.name])
+    raise RuntimeError(f"BatchWriteItem left {remaining} writes unprocessed on {table.name} after {MAX_RETRIES} retries")
+
+
+def _batch_write(table, requests):
+    chunks = chunked(requests, BATCH_WRITE_LIMIT)
+    if len(chunks) <= 1:
+        return sum(_batch_write_chunk(table, chunk) for chunk in chunks)
+    return sum(run_concurrently(lambda chunk: _batch_write_chunk(table, chunk), chunks))
+
+
+def batch_write_items(table, items):
+    """Put items with BatchWriteItem in concurrent chunks of 25; returns the number written"""
+    return _batch_write(table, [{'PutRequest': {'Item': item}} for item in items])
+
+
+def batch_delete_keys(table, keys):
+    """Delete items by key with BatchWriteItem in concurrent chunks of 25; returns the number deleted"""
+    return _batch_write(table, [{'DeleteRequest': {'Key': key}} for key in keys])
+
+
+def is_transaction_conflict(error: ClientError):
+    """Whether a TransactWriteItems call was cancelled only by conflicting transactions"""
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return False
+    codes = [reason.get('Code') for reason in error.response.get('CancellationReasons', [])]
+    return 'TransactionConflict' in codes and 'ConditionalCheckFailed' not in codes
+
+
+def transact_write_items(client, transact_items):
+    """TransactWriteItems, retried with backoff while it only conflicts with other transactions.
+
+    botocore does not retry TransactionConflict cancellations, which DynamoDB
+    returns when concurrent transactions touch the same item. The error is
+    raised once TRANSACT_CONFLICT_RETRIES retries are spent.
+    """
+    for attempt in range(TRANSACT_CONFLICT_RETRIES + 1):
+        try:
+            return client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if attempt == TRANSACT_CONFLICT_RETRIES or not is_transaction_conflict(e):
+                raise
+        backoff(attempt)
+
+
+TRANSACT_WRITE_LIMIT = 100
+
+
+def _put_new_chunk(table, items, start: int, condition: str):
+    existing = {}
+    pending = list(range(start, start + len(items)))
+    while pending:
+        try:
+            transact_write_items(table.meta.client, [
+                {'Put': {
+                    'TableName': table.name,
+                    'Item': items[i - start],
+                    'ConditionExpression': condition,
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }}
+                for i in pending
+            ])
+            return existing
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            failed = {i: reason for i, reason in zip(pending, reasons) if reason.get('Code') == 'ConditionalCheckFailed'}
+            if not failed:
+                raise
+            for i, reason in failed.items():
+                existing[i] = reason.get('Item') or {}
+            pending = [i for i in pending if i not in failed]
+    return existing
+
+
+def put_new_items(table, items, condition: str):
+    """Conditionally put items in concurrent transactions of up to 100 puts.
+
+    `condition` must hold for each put (typically that the item does not
+    exist yet). One failed condition cancels its whole transaction, so the
+    rest of the chunk is retried without it. Returns {index in `items`:
+    existing item} for every put whose condition failed, with the existing
+    items in low-level form.
+    """
+    chunks = chunked(items, TRANSACT_WRITE_LIMIT)
+    starts = range(0, len(items), TRANSACT_WRITE_LIMIT)
+    if len(chunks) <= 1:
+        results = [_put_new_chunk(table, chunk, start, condition) for chunk, start in zip(chunks, starts)]
+    else:
+        results = run_concurrently(lambda args: _put_new_chunk(table, *args, condition), list(zip(chunks, starts)))
+    existing = {}
+    for result in results:
+        existing.update(result)
+    return existing
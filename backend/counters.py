@@ -0,0 +1,82 @@
+"""Sharded registeredCount counters for hot events.
+
+Events created with counterShards > 0 keep their registered count in N items
+of the EventCounters table instead of on the Events item. Each shard owns a
+fixed slice of the event capacity, so a conditional increment on one shard
+can never push the event past capacity, and writes spread over N items.
+"""
+import random
+
+from boto3.dynamodb.conditions import Key
+
+from pagination import iter_items
+
+MAX_COUNTER_SHARDS = 100
+
+
+def is_sharded(event):
+    """Whether an event keeps its registered count in counter shards"""
+    return int(event.get('counterShards') or 0) > 0
+
+
+def shard_capacity(capacity: int, shards: int, shard_id: int):
+    """Seats owned by one shard; the remainder goes to the lowest shard ids"""
+    base, remainder = divmod(int(capacity), shards)
+    return base + (1 if shard_id < remainder else 0)
+
+
+def shard_order(shards: int):
+    """Shard ids in random order so concurrent writers spread out"""
+    order = list(range(shards))
+    random.shuffle(order)
+    return order
+
+
+def _shard_items(counters_table, event_id: str, projection=None):
+    """Every counter shard item of an event, read consistently page by page"""
+    kwargs = {'KeyConditionExpression': Key('eventId').eq(event_id), 'ConsistentRead': True}
+    if projection:
+        kwargs['ProjectionExpression'] = projection
+    return iter_items(counters_table.query, **kwargs)
+
+
+def read_shard_counts(counters_table, event_id: str):
+    """Map of shard id to registered count for an event"""
+    return {
+        int(item['shardId']): int(item.get('registeredCount', 0))
+        for item in _shard_items(counters_table, event_id)
+    }
+
+
+def read_shard_version(counters_table, event_id: str):
+    """Sum of the shard `version` counters; it grows with every shard update"""
+    return sum(int(item.get('version', 0)) for item in _shard_items(counters_table, event_id, 'version'))
+
+
+def read_shard_summary(counters_table, event_id: str):
+    """Registered count and version summed over an event's shards, in one query"""
+    registered = 0
+    version = 0
+    for item in _shard_items(counters_table, event_id, 'registeredCount, version'):
+        registered += int(item.get('registeredCount', 0))
+        version += int(item.get('version', 0))
+    return registered, version
+
+
+def read_held_seats(counters_table, event_id: str):
+    """Map of shard id to seats held for waitlist promotion, for shards holding any"""
+    return {
+        int(item['shardId']): int(item['heldSeats'])
+        for item in _shard_items(counters_table, event_id, 'shardId, heldSeats')
+        if int(item.get('heldSeats', 0)) > 0
+    }
+
+
+def shards_with_room(event, counts):
+    """Shard ids that still have seats, in random order"""
+    capacity = int(event.get('capacity', 0))
+    shards = int(event['counterShards'])
+    return [
+        shard_id for shard_id in shard_order(shards)
+        if counts.get(shard_id, 0) < shard_capacity(capacity, shards, shard_id)
+    ]
@@ -0,0 +1,229 @@
+"""Lazily created DynamoDB resource, low-level client and tables.
+
+Tables and the client come from a storage engine picked by STORAGE_ENGINE:
+`dynamodb` (the default) or `memory`, an in-process engine for profiling
+and local load tests (see memory_store.py). Both implement the boto3 Table
+and client operations the service uses, so callers do not know which one
+they are talking to.
+
+Nothing here talks to boto3 at import time. The resource is built on the
+first table access and reused by every table, so cold starts only pay for
+it when a request actually needs DynamoDB.
+
+Condition placeholders (#n0, :v0) are numbered per thread. boto3 builds
+them with one builder per client and resets its counters on every call, so
+threads sharing the resource could otherwise reuse each other's placeholders
+and send a request whose names point at the wrong attributes.
+
+The client is tuned from the environment: a connection pool sized for the
+threads that call DynamoDB at once, adaptive retries (which also rate-limit
+the client while DynamoDB is throttling), short connect and read timeouts,
+a per-request retry budget (see retries.py) and optional hedged reads (see
+hedging.py).
+"""
+import os
+import threading
+import time
+
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'dynamodb')
+
+# anyio's default limit on threads serving sync work for requests
+REQUEST_THREADS = 40
+
+DDB_RETRY_MODE = os.environ.get('DDB_RETRY_MODE', 'adaptive')
+DDB_MAX_ATTEMPTS = int(os.environ.get('DDB_MAX_ATTEMPTS', '3'))
+DDB_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('DDB_CONNECT_TIMEOUT_SECONDS', '1'))
+DDB_READ_TIMEOUT_SECONDS = float(os.environ.get('DDB_READ_TIMEOUT_SECONDS', '3'))
+DDB_REQUEST_RETRY_BUDGET = int(os.environ.get('DDB_REQUEST_RETRY_BUDGET', '10'))
+DDB_HEDGED_READS_ENABLED = os.environ.get('DDB_HEDGED_READS', 'false').lower() == 'true'
+DDB_HEDGE_PERCENTILE = float(os.environ.get('DDB_HEDGE_PERCENTILE', '95'))
+DDB_HEDGE_MIN_DELAY_MS = float(os.environ.get('DDB_HEDGE_MIN_DELAY_MS', '5'))
+
+init_timings = {}
+
+_resource = None
+_lock = threading.Lock()
+
+
+def max_pool_connections():
+    """DDB_MAX_POOL_CONNECTIONS, by default one connection per thread that can call DynamoDB at once"""
+    configured = os.environ.get('DDB_MAX_POOL_CONNECTIONS')
+    if configured:
+        return int(configured)
+    from batch import MAX_WORKERS
+    from scan import SCAN_MAX_SEGMENTS
+    pool = REQUEST_THREADS + MAX_WORKERS + SCAN_MAX_SEGMENTS
+    # A hedged read briefly holds two connections
+    return pool * 2 if DDB_HEDGED_READS_ENABLED else pool
+
+
+def client_settings():
+    """The client tuning in effect, as reported by /debug/latency"""
+    return {
+        'maxPoolConnections': max_pool_connections(),
+        'retryMode': DDB_RETRY_MODE,
+        'maxAttempts': DDB_MAX_ATTEMPTS,
+        'connectTimeoutSeconds': DDB_CONNECT_TIMEOUT_SECONDS,
+        'readTimeoutSeconds': DDB_READ_TIMEOUT_SECONDS,
+        'requestRetryBudget': DDB_REQUEST_RETRY_BUDGET,
+        'hedgedReads': DDB_HEDGED_READS_ENABLED,
+        'storageEngine': STORAGE_ENGINE,
+    }
+
+
+def client_config():
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=max_pool_connections(),
+        retries={'mode': DDB_RETRY_MODE, 'total_max_attempts': DDB_MAX_ATTEMPTS},
+        connect_timeout=DDB_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=DDB_READ_TIMEOUT_SECONDS,
+        tcp_keepalive=True,
+    )
+
+
+_hedger = None
+
+
+def get_hedger():
+    """Hedger for table get_item/query calls, or None when DDB_HEDGED_READS is off"""
+    global _hedger
+    if _hedger is None and DDB_HEDGED_READS_ENABLED and STORAGE_ENGINE == 'dynamodb':
+        with _lock:
+            if _hedger is None:
+                from hedging import Hedger
+                from metrics import call_latency
+                _hedger = Hedger(call_latency, max_pool_connections(), DDB_HEDGE_PERCENTILE, DDB_HEDGE_MIN_DELAY_MS)
+    return _hedger
+
+
+def thread_safe_condition_builder():
+    """boto3 ConditionExpressionBuilder whose placeholder counters are per thread"""
+    from boto3.dynamodb.conditions import ConditionExpressionBuilder
+
+    class ThreadLocalConditionBuilder(ConditionExpressionBuilder):
+        def __init__(self):
+            self._counts = threading.local()
+            super().__init__()
+
+        @property
+        def _name_count(self):
+            return getattr(self._counts, 'names', 0)
+
+        @_name_count.setter
+        def _name_count(self, value):
+            self._counts.names = value
+
+        @property
+        def _value_count(self):
+            return getattr(self._counts, 'values', 0)
+
+        @_value_count.setter
+        def _value_count(self, value):
+            self._counts.values = value
+
+    return ThreadLocalConditionBuilder()
+
+
+def get_resource():
+    """Shared boto3 DynamoDB resource, created on first use"""
+    global _resource
+    if _resource is None:
+        with _lock:
+            if _resource is None:
+                started = time.perf_counter()
+                import boto3
+                from metrics import instrument_client
+                from retries import install_retry_budget
+                resource = boto3.resource('dynamodb', config=client_config())
+                # The resource's injector builds every table's condition expressions
+                resource._injector._condition_builder = thread_safe_condition_builder()
+                instrument_client(resource.meta.client)
+                install_retry_budget(resource.meta.client)
+                init_timings['dynamodbResourceMs'] = round((time.perf_counter() - started) * 1000, 2)
+                _resource = resource
+    return _resource
+
+
+class StorageEngine:
+    """Where the tables live.
+
+    get_table returns an object with boto3 Table's `name`, `meta.client`,
+    get_item, put_item, update_item, delete_item, query (on the table key or
+    a GSI) and scan; get_client returns one with transact_write_items,
+    batch_get_item, batch_write_item and describe_table. Both take and return
+    the resource layer's Python types, and fail with botocore ClientErrors.
+    """
+
+    def get_table(self, name: str):
+        raise NotImplementedError
+
+    def get_client(self):
+        raise NotImplementedError
+
+
+class DynamoDBEngine(StorageEngine):
+    def get_table(self, name: str):
+        return get_resource().Table(name)
+
+    def get_client(self):
+        # The resource's client carries its type transformations
+        return get_resource().meta.client
+
+
+def make_storage_engine():
+    """Storage engine from STORAGE_ENGINE: dynamodb (default) or memory"""
+    if STORAGE_ENGINE == 'dynamodb':
+        return DynamoDBEngine()
+    if STORAGE_ENGINE == 'memory':
+        from memory_store import MemoryEngine
+        return MemoryEngine()
+    raise ValueError(f"Unknown STORAGE_ENGINE {STORAGE_ENGINE}")
+
+
+_engine = None
+
+
+def get_engine():
+    """Shared storage engine, created on first use"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = make_storage_engine()
+    return _engine
+
+
+def get_client():
+    """Low-level client shared by every table"""
+    return get_engine().get_client()
+
+
+class LazyTable:
+    """Stand-in for a storage engine table that is only created on first use.
+
+    `name` is available without touching the engine so transactions and batch
+    requests can be built before any call is made.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._table = None
+
+    def _get_table(self):
+        if self._table is None:
+            self._table = get_engine().get_table(self.name)
+        return self._table
+
+    def __getattr__(self, attr):
+        value = getattr(self._get_table(), attr)
+        hedger = get_hedger()
+        return hedger.wrap(attr, value) if hedger is not None else value
+
+    def __repr__(self):
+        return f"LazyTable({self.name!r})"
+
+
+def table_from_env(env_var: str, default_name: str):
+    """LazyTable named by an environment variable"""
+    return LazyTable(os.environ.get(env_var, default_name))
@@ -0,0 +1,11 @@
+"""JSON encoding of DynamoDB values for responses, cursors and NDJSON exports"""
+from decimal import Decimal
+
+
+def json_default(value):
+    """`default` hook for json/orjson: numbers come back from DynamoDB as Decimal, sets as set"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
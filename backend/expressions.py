@@ -0,0 +1,638 @@
+"""DynamoDB expressions for the in-memory storage engine.
+
+Parses condition (also used for filters and key conditions), update and
+projection expressions into small tuple trees and evaluates them against
+plain Python items, following DynamoDB's rules closely enough that code
+which works here works against DynamoDB:
+
+  * comparisons only match values of the same type; a missing attribute
+    never compares true
+  * SET operands are read from the item as it was before the update
+  * ADD creates a missing number or set, DELETE removes set elements
+  * key attributes cannot be updated
+  * attribute names that are reserved words need a #placeholder
+
+boto3 condition objects (Key/Attr) are turned into expression strings with
+boto3's own builder first, exactly as the boto3 resource layer does.
+Parsed trees are cached per expression string.
+"""
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import Binary
+
+from reserved_words import RESERVED_WORDS
+
+
+class ExpressionError(ValueError):
+    """An invalid expression or an operation DynamoDB would reject; a ValidationException"""
+
+
+MISSING = object()
+
+TOKEN = re.compile(
+    r'\s*(?:(?P<name>#[A-Za-z0-9_]+)|(?P<value>:[A-Za-z0-9_]+)|(?P<number>\d+)'
+    r'|(?P<word>[A-Za-z_][A-Za-z0-9_]*)|(?P<op><>|<=|>=|[=<>(),.\[\]+-]))'
+)
+COMPARATORS = {'=', '<>', '<', '<=', '>', '>='}
+CONDITION_FUNCTIONS = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains'}
+UPDATE_CLAUSES = {'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+def tokenize(expression: str):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise ExpressionError(f"Invalid expression: syntax error near {expression[position:position + 10]!r}")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser over the tokens of one expression"""
+
+    def __init__(self, expression: str, names):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = dict(names)
+
+    def peek(self, offset: int = 0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ExpressionError(f"Invalid expression: unexpected end of {self.expression!r}")
+        self.position += 1
+        return token
+
+    def expect(self, text: str):
+        kind, value = self.next()
+        if value.upper() != text:
+            raise ExpressionError(f"Invalid expression: expected {text!r}, found {value!r} in {self.expression!r}")
+
+    def at_keyword(self, *keywords):
+        kind, value = self.peek()
+        return kind == 'word' and value.upper() in keywords
+
+    def at(self, text: str):
+        return self.peek()[1] == text
+
+    def done(self):
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Invalid expression: unexpected {self.peek()[1]!r} in {self.expression!r}")
+
+    # Operands
+
+    def path(self):
+        elements = [self.name()]
+        while True:
+            if self.at('.'):
+                self.next()
+                elements.append(self.name())
+            elif self.at('['):
+                self.next()
+                kind, value = self.next()
+                if kind != 'number':
+                    raise ExpressionError(f"Invalid expression: list index must be a number in {self.expression!r}")
+                self.expect(']')
+                elements.append(int(value))
+            else:
+                return ('path', tuple(elements))
+
+    def name(self):
+        kind, value = self.next()
+        if kind == 'name':
+            if value not in self.names:
+                raise ExpressionError(f"An expression attribute name used in the document path is not defined: {value}")
+            return self.names[value]
+        if kind == 'word':
+            if value.upper() in RESERVED_WORDS:
+                raise ExpressionError(f"Invalid expression: Attribute name is a reserved keyword; reserved keyword: {value}")
+            return value
+        raise ExpressionError(f"Invalid expression: expected an attribute name, found {value!r} in {self.expression!r}")
+
+    def operand(self):
+        kind, value = self.peek()
+        if kind == 'value':
+            self.next()
+            return ('value', value)
+        if kind == 'word' and value == 'size' and self.peek(1)[1] == '(':
+            self.next()
+            self.expect('(')
+            path = self.path()
+            self.expect(')')
+            return ('size', path)
+        return self.path()
+
+    # Conditions
+
+    def condition(self):
+        node = self.conjunction()
+        while self.at_keyword('OR'):
+            self.next()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.at_keyword('AND'):
+            self.next()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.at_keyword('NOT'):
+            self.next()
+            return ('not', self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        if self.at('('):
+            self.next()
+            node = self.condition()
+            self.expect(')')
+            return node
+        kind, value = self.peek()
+        if kind == 'word' and value in CONDITION_FUNCTIONS and self.peek(1)[1] == '(':
+            self.next()
+            self.expect('(')
+            args = [self.operand()]
+            while self.at(','):
+                self.next()
+                args.append(self.operand())
+            self.expect(')')
+            return ('function', value, tuple(args))
+        left = self.operand()
+        if self.at_keyword('BETWEEN'):
+            self.next()
+            low = self.operand()
+            self.expect('AND')
+            return ('between', left, low, self.operand())
+        if self.at_keyword('IN'):
+            self.next()
+            self.expect('(')
+            options = [self.operand()]
+            while self.at(','):
+                self.next()
+                options.append(self.operand())
+            self.expect(')')
+            return ('in', left, tuple(options))
+        kind, operator = self.next()
+        if operator not in COMPARATORS:
+            raise ExpressionError(f"Invalid expression: expected a comparison, found {operator!r} in {self.expression!r}")
+        return ('compare', operator, left, self.operand())
+
+    # Updates
+
+    def update(self):
+        actions = []
+        seen = set()
+        while self.peek()[0] is not None:
+            kind, clause = self.next()
+            clause = clause.upper()
+            if kind != 'word' or clause not in UPDATE_CLAUSES:
+                raise ExpressionError(f"Invalid UpdateExpression: unexpected {clause!r} in {self.expression!r}")
+            if clause in seen:
+                raise ExpressionError(f"Invalid UpdateExpression: The \"{clause}\" section can only be used once")
+            seen.add(clause)
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.expect('=')
+                    actions.append(('SET', path, self.set_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', path, None))
+                else:
+                    kind, value = self.next()
+                    if kind != 'value':
+                        raise ExpressionError(f"Invalid UpdateExpression: {clause} needs a value placeholder")
+                    actions.append((clause, path, ('value', value)))
+                if not self.at(','):
+                    break
+                self.next()
+        if not actions:
+            raise ExpressionError("Invalid UpdateExpression: the expression is empty")
+        return tuple(actions)
+
+    def set_value(self):
+        node = self.set_operand()
+        if self.at('+') or self.at('-'):
+            operator = self.next()[1]
+            node = (operator, node, self.set_operand())
+        return node
+
+    def set_operand(self):
+        kind, value = self.peek()
+        if kind == 'word' and value in ('if_not_exists', 'list_append') and self.peek(1)[1] == '(':
+            self.next()
+            self.expect('(')
+            first = self.path() if value == 'if_not_exists' else self.set_value()
+            self.expect(',')
+            second = self.set_value()
+            self.expect(')')
+            return (value, first, second)
+        return self.operand()
+
+    # Projections
+
+    def projection(self):
+        paths = [self.path()]
+        while self.at(','):
+            self.next()
+            paths.append(self.path())
+        return tuple(paths)
+
+
+def _names_key(names):
+    return tuple(sorted((names or {}).items()))
+
+
+@lru_cache(maxsize=1024)
+def _parse_condition(expression: str, names):
+    parser = Parser(expression, names)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@lru_cache(maxsize=1024)
+def _parse_update(expression: str, names):
+    parser = Parser(expression, names)
+    return parser.update()
+
+
+@lru_cache(maxsize=1024)
+def _parse_projection(expression: str, names):
+    parser = Parser(expression, names)
+    paths = parser.projection()
+    parser.done()
+    return paths
+
+
+def build_condition(condition, names, values, is_key_condition: bool = False):
+    """(expression, names, values) for a condition string or boto3 condition object"""
+    names = dict(names or {})
+    values = dict(values or {})
+    if isinstance(condition, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(condition, is_key_condition=is_key_condition)
+        names.update(built.attribute_name_placeholders)
+        values.update(to_item_value(built.attribute_value_placeholders))
+        condition = built.condition_expression
+    return condition, names, values
+
+
+EXPRESSION_PARAMETERS = (
+    'KeyConditionExpression', 'ConditionExpression', 'UpdateExpression', 'FilterExpression', 'ProjectionExpression'
+)
+PLACEHOLDER = re.compile(r'[#:][A-Za-z0-9_]+')
+
+
+def check_placeholders(params):
+    """Reject expression attribute names or values that no expression of the call uses, like DynamoDB"""
+    text = ' '.join(params[name] for name in EXPRESSION_PARAMETERS if isinstance(params.get(name), str))
+    used = set(PLACEHOLDER.findall(text))
+    for parameter in ('ExpressionAttributeNames', 'ExpressionAttributeValues'):
+        unused = set(params.get(parameter) or ()) - used
+        if unused:
+            raise ExpressionError(
+                f"Value provided in {parameter} unused in expressions: keys: {{{', '.join(sorted(unused))}}}"
+            )
+
+
+def parse_condition(expression: str, names):
+    return _parse_condition(expression, _names_key(names))
+
+
+def parse_update(expression: str, names):
+    return _parse_update(expression, _names_key(names))
+
+
+def parse_projection(expression: str, names):
+    return _parse_projection(expression, _names_key(names))
+
+
+# Values
+
+def to_item_value(value):
+    """Copy of a Python value in the form boto3 returns it: ints become Decimal, bytes Binary.
+
+    Floats are rejected like boto3's serializer does.
+    """
+    if value is None or isinstance(value, (str, bool, Decimal, Binary)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, (bytes, bytearray)):
+        return Binary(value)
+    if isinstance(value, dict):
+        return {key: to_item_value(entry) for key, entry in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_item_value(entry) for entry in value]
+    if isinstance(value, (set, frozenset)):
+        if not value:
+            raise ExpressionError("One or more parameter values were invalid: An string set may not be empty")
+        return {to_item_value(entry) for entry in value}
+    raise TypeError(f'Unsupported type "{type(value)}" for value "{value}"')
+
+
+def copy_value(value):
+    """Copy of a stored value that callers may mutate freely"""
+    if isinstance(value, dict):
+        return {key: copy_value(entry) for key, entry in value.items()}
+    if isinstance(value, list):
+        return [copy_value(entry) for entry in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def value_type(value):
+    """DynamoDB type descriptor of a stored value"""
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, str):
+        return 'S'
+    if isinstance(value, Decimal):
+        return 'N'
+    if isinstance(value, Binary):
+        return 'B'
+    if value is None:
+        return 'NULL'
+    if isinstance(value, dict):
+        return 'M'
+    if isinstance(value, list):
+        return 'L'
+    if isinstance(value, set):
+        return value_type(next(iter(value))) + 'S' if value else 'SS'
+    return type(value).__name__
+
+
+def _ordered(value):
+    # Binary values order by their bytes
+    return value.value if isinstance(value, Binary) else value
+
+
+def compare(operator: str, left, right):
+    if left is MISSING or right is MISSING:
+        return False
+    same_type = value_type(left) == value_type(right)
+    if operator == '=':
+        return same_type and left == right
+    if operator == '<>':
+        return not same_type or left != right
+    if not same_type or value_type(left) not in ('S', 'N', 'B'):
+        return False
+    left, right = _ordered(left), _ordered(right)
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def get_path(item, path):
+    value = item
+    for element in path:
+        if isinstance(element, int):
+            if not isinstance(value, list) or element >= len(value):
+                return MISSING
+        elif not isinstance(value, dict) or element not in value:
+            return MISSING
+        value = value[element]
+    return value
+
+
+def _value(values, placeholder: str):
+    if placeholder not in values:
+        raise ExpressionError(f"An expression attribute value used in expression is not defined; attribute value: {placeholder}")
+    return values[placeholder]
+
+
+def evaluate_operand(node, item, values):
+    kind = node[0]
+    if kind == 'path':
+        return get_path(item, node[1])
+    if kind == 'value':
+        return _value(values, node[1])
+    if kind == 'size':
+        value = get_path(item, node[1][1])
+        if value is MISSING:
+            return MISSING
+        if isinstance(value, Binary):
+            return Decimal(len(value.value))
+        if isinstance(value, (str, list, dict, set)):
+            return Decimal(len(value))
+        raise ExpressionError("Invalid ConditionExpression: Incorrect operand type for operator or function; operator or function: size")
+    raise ExpressionError(f"Invalid expression: {kind} is only allowed in update expressions")
+
+
+def evaluate_condition(node, item, values):
+    kind = node[0]
+    if kind == 'and':
+        return evaluate_condition(node[1], item, values) and evaluate_condition(node[2], item, values)
+    if kind == 'or':
+        return evaluate_condition(node[1], item, values) or evaluate_condition(node[2], item, values)
+    if kind == 'not':
+        return not evaluate_condition(node[1], item, values)
+    if kind == 'compare':
+        return compare(node[1], evaluate_operand(node[2], item, values), evaluate_operand(node[3], item, values))
+    if kind == 'between':
+        value = evaluate_operand(node[1], item, values)
+        return (compare('>=', value, evaluate_operand(node[2], item, values))
+                and compare('<=', value, evaluate_operand(node[3], item, values)))
+    if kind == 'in':
+        value = evaluate_operand(node[1], item, values)
+        return any(compare('=', value, evaluate_operand(option, item, values)) for option in node[2])
+    if kind == 'function':
+        return _evaluate_function(node[1], node[2], item, values)
+    raise ExpressionError(f"Invalid ConditionExpression: {kind} is not a condition")
+
+
+def _evaluate_function(name: str, args, item, values):
+    if args[0][0] != 'path':
+        raise ExpressionError(f"Invalid ConditionExpression: the first operand of {name} must be an attribute path")
+    value = get_path(item, args[0][1])
+    if name == 'attribute_exists':
+        return value is not MISSING
+    if name == 'attribute_not_exists':
+        return value is MISSING
+    if len(args) != 2:
+        raise ExpressionError(f"Invalid ConditionExpression: {name} takes two operands")
+    operand = evaluate_operand(args[1], item, values)
+    if value is MISSING or operand is MISSING:
+        return False
+    if name == 'attribute_type':
+        return value_type(value) == operand
+    if name == 'begins_with':
+        if isinstance(value, str) and isinstance(operand, str):
+            return value.startswith(operand)
+        if isinstance(value, Binary) and isinstance(operand, Binary):
+            return value.value.startswith(operand.value)
+        return False
+    # contains
+    if isinstance(value, str):
+        return isinstance(operand, str) and operand in value
+    if isinstance(value, (set, list)):
+        return any(compare('=', entry, operand) for entry in value)
+    return False
+
+
+def matches(condition, item, names, values, is_key_condition: bool = False):
+    """Whether `item` satisfies a condition string or boto3 condition object"""
+    expression, names, values = build_condition(condition, names, values, is_key_condition)
+    return evaluate_condition(parse_condition(expression, names), item, values)
+
+
+# Updates
+
+def _update_operand(node, item, values):
+    kind = node[0]
+    if kind in ('+', '-'):
+        left = _update_operand(node[1], item, values)
+        right = _update_operand(node[2], item, values)
+        if not isinstance(left, Decimal) or not isinstance(right, Decimal):
+            raise ExpressionError("An operand in the update expression has an incorrect data type")
+        return left + right if kind == '+' else left - right
+    if kind == 'if_not_exists':
+        value = get_path(item, node[1][1])
+        return value if value is not MISSING else _update_operand(node[2], item, values)
+    if kind == 'list_append':
+        left = _update_operand(node[1], item, values)
+        right = _update_operand(node[2], item, values)
+        if not isinstance(left, list) or not isinstance(right, list):
+            raise ExpressionError("An operand in the update expression has an incorrect data type")
+        return left + right
+    value = evaluate_operand(node, item, values)
+    if value is MISSING:
+        raise ExpressionError("The provided expression refers to an attribute that does not exist in the item")
+    return value
+
+
+def _set_path(item, path, value):
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    last = path[-1]
+    if isinstance(last, int):
+        if not isinstance(parent, list):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        if last >= len(parent):
+            parent.append(value)
+        else:
+            parent[last] = value
+    elif isinstance(parent, dict):
+        parent[last] = value
+    else:
+        raise ExpressionError("The document path provided in the update expression is invalid for update")
+
+
+def _remove_path(item, path):
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    last = path[-1]
+    if isinstance(last, int):
+        if isinstance(parent, list) and last < len(parent):
+            del parent[last]
+    elif isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def apply_update(item, expression: str, names, values, key_names):
+    """New item and updated top-level attribute names after an UpdateExpression.
+
+    `item` is not modified; every operand is read from it as it was
+    before the update.
+    """
+    actions = parse_update(expression, names)
+    values = values or {}
+    changes = []
+    paths = [path[1] for _, path, _ in actions]
+    for index, path in enumerate(paths):
+        for other in paths[index + 1:]:
+            if path[:len(other)] == other[:len(path)]:
+                raise ExpressionError("Invalid UpdateExpression: Two document paths overlap with each other")
+    for action, path, operand in actions:
+        if path[1][0] in key_names:
+            raise ExpressionError(f"Cannot update attribute {path[1][0]}. This attribute is part of the key")
+        if action == 'SET':
+            changes.append((action, path[1], copy_value(_update_operand(operand, item, values))))
+        elif action == 'REMOVE':
+            changes.append((action, path[1], None))
+        else:
+            value = _value(values, operand[1])
+            current = get_path(item, path[1])
+            changes.append((action, path[1], _add_or_delete(action, current, value)))
+
+    updated = copy_value(item)
+    for action, path, value in changes:
+        if action == 'REMOVE' or value is MISSING:
+            _remove_path(updated, path)
+        else:
+            _set_path(updated, path, value)
+    return updated, {path[0] for _, path, _ in changes}
+
+
+def _add_or_delete(action: str, current, value):
+    if action == 'ADD':
+        if isinstance(value, Decimal):
+            if current is MISSING:
+                return value
+            if isinstance(current, Decimal):
+                return current + value
+        elif isinstance(value, set):
+            if current is MISSING:
+                return set(value)
+            if isinstance(current, set) and value_type(current) == value_type(value):
+                return current | value
+        raise ExpressionError("An operand in the update expression has an incorrect data type")
+    # DELETE removes elements from a set, and the attribute once the set is empty
+    if not isinstance(value, set):
+        raise ExpressionError("An operand in the update expression has an incorrect data type")
+    if current is MISSING:
+        return MISSING
+    if not isinstance(current, set) or value_type(current) != value_type(value):
+        raise ExpressionError("An operand in the update expression has an incorrect data type")
+    remaining = current - value
+    return remaining if remaining else MISSING
+
+
+def updated_attributes(expression: str, names):
+    """Top-level attributes an UpdateExpression touches, for UPDATED_OLD/UPDATED_NEW"""
+    return {path[1][0] for _, path, _ in parse_update(expression, names)}
+
+
+# Projections
+
+def project(item, expression: str, names):
+    """Only the attributes named by a ProjectionExpression"""
+    result = {}
+    has_indexes = False
+    for _, path in parse_projection(expression, names):
+        value = get_path(item, path)
+        if value is MISSING:
+            continue
+        target = result
+        for element in path[:-1]:
+            target = target.setdefault(element, {})
+        target[path[-1]] = copy_value(value)
+        has_indexes = has_indexes or any(isinstance(element, int) for element in path)
+    return _as_lists(result) if has_indexes else result
+
+
+def _as_lists(node):
+    # Selected list elements were collected by index; return them in order, as a shorter list
+    if not isinstance(node, dict):
+        return node
+    if node and all(isinstance(key, int) for key in node):
+        return [_as_lists(node[key]) for key in sorted(node)]
+    return {key: _as_lists(value) for key, value in node.items()}
@@ -0,0 +1,89 @@
+"""Hedged DynamoDB reads.
+
+A GetItem or Query that has not answered within the operation's recent p95
+latency is sent a second time, and whichever copy answers first is used.
+Both are idempotent reads, so the slower copy only costs read capacity; it
+runs to completion and shows up in the request's DynamoDB metrics. Until
+an operation has enough recorded calls to estimate its p95, it is not
+hedged.
+"""
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Table methods that may be hedged, with their operation names
+HEDGED_METHODS = {'get_item': 'GetItem', 'query': 'Query'}
+
+
+class Hedger:
+    """Runs reads with a backup request after a latency-percentile delay"""
+
+    def __init__(self, call_latency, max_workers: int, percentile: float = 95,
+                 min_delay_ms: float = 5.0, min_samples: int = 100):
+        self.call_latency = call_latency
+        self.max_workers = max_workers
+        self.percentile = percentile
+        self.min_delay_ms = min_delay_ms
+        self.min_samples = min_samples
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {'hedged': 0, 'hedgeWins': 0}
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ddb-hedge')
+        return self._executor
+
+    def _submit(self, func, args, kwargs):
+        return self._get_executor().submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def delay_seconds(self, operation: str):
+        """Seconds to wait before hedging `operation`, or None when it is not hedged yet"""
+        latency_ms = self.call_latency.percentile(operation, self.percentile, self.min_samples)
+        if latency_ms is None:
+            return None
+        return max(latency_ms, self.min_delay_ms) / 1000
+
+    def call(self, operation: str, func, *args, **kwargs):
+        """`func(*args, **kwargs)`, hedged once it runs longer than the delay"""
+        delay = self.delay_seconds(operation)
+        if delay is None:
+            return func(*args, **kwargs)
+        primary = self._submit(func, args, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge = self._submit(func, args, kwargs)
+        self._count('hedged')
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedgeWins')
+                    return future.result()
+        # Both copies failed; report the original request's error
+        return primary.result()
+
+    def wrap(self, method_name: str, method):
+        """Hedged version of a table method, or the method itself if it is not a hedged read"""
+        operation = HEDGED_METHODS.get(method_name)
+        if operation is None:
+            return method
+
+        def hedged(*args, **kwargs):
+            return self.call(operation, method, *args, **kwargs)
+        return hedged
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, percentile=self.percentile, minDelayMs=self.min_delay_ms,
+                        minSamples=self.min_samples)
@@ -0,0 +1,221 @@
+"""Idempotency-Key handling for mutating endpoints.
+
+The first response for a key is stored in the IdempotencyKeys table (with a
+TTL) and in an in-process LRU, and replayed for every later request with the
+same key without running the endpoint again. A key is claimed with a
+conditional put before the endpoint runs, so a duplicate that arrives while
+the first request is still in flight waits for its response instead of
+repeating the work: in the same container it awaits the same future, in
+another container it polls the stored record.
+
+Client errors (4xx) are stored and replayed like successes; server errors
+release the key so a retry can try again. If the response cannot be stored,
+it is still returned and the key is released, so retries in other
+containers are not turned away with 409 until the claim's lock expires.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import traceback
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from response_encoding import FastJSONResponse
+
+MAX_KEY_LENGTH = 255
+IN_PROGRESS = 'in-progress'
+COMPLETED = 'completed'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+_deserializer = TypeDeserializer()
+
+
+def fingerprint(scope: str, payload):
+    """Hash of the endpoint and request body a key was first used with"""
+    raw = json.dumps([scope, jsonable_encoder(payload)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Stored responses in the IdempotencyKeys table"""
+
+    def __init__(self, table, ttl_seconds: int, lock_seconds: int):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+
+    def claim(self, key: str, request_hash: str):
+        """Claim a key for processing; returns None, or the existing record if someone else has it.
+
+        An in-progress claim whose lock has expired (its request died) can be taken over.
+        """
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    'idempotencyKey': key,
+                    'state': IN_PROGRESS,
+                    'requestHash': request_hash,
+                    'lockedUntil': now + self.lock_seconds,
+                    'expiresAt': now + self.ttl_seconds,
+                },
+                ConditionExpression='attribute_not_exists(idempotencyKey) OR (#state = :inProgress AND lockedUntil < :now)',
+                ExpressionAttributeNames={'#state': 'state'},
+                ExpressionAttributeValues={':inProgress': IN_PROGRESS, ':now': now},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return {k: _deserializer.deserialize(v) for k, v in (e.response.get('Item') or {}).items()}
+        return None
+
+    def get(self, key: str):
+        return self.table.get_item(Key={'idempotencyKey': key}, ConsistentRead=True).get('Item')
+
+    def complete(self, key: str, request_hash: str, status_code: int, body: str):
+        self.table.put_item(Item={
+            'idempotencyKey': key,
+            'state': COMPLETED,
+            'requestHash': request_hash,
+            'statusCode': status_code,
+            'body': body,
+            'expiresAt': int(time.time()) + self.ttl_seconds,
+        })
+
+    def release(self, key: str):
+        """Drop an in-progress claim so the request can be retried"""
+        try:
+            self.table.delete_item(
+                Key={'idempotencyKey': key},
+                ConditionExpression='#state = :inProgress',
+                ExpressionAttributeNames={'#state': 'state'},
+                ExpressionAttributeValues={':inProgress': IN_PROGRESS}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+
+class Idempotency:
+    """Runs an endpoint at most once per key and replays the stored response.
+
+    `wait_seconds` bounds how long a duplicate waits for a request in
+    flight in another container before it gets a 409.
+    """
+
+    def __init__(self, store: IdempotencyStore, cache, wait_seconds: float = 5.0, poll_seconds: float = 0.2):
+        self.store = store
+        self.cache = cache
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight = {}
+
+    async def run(self, key: str, scope: str, payload, status_code: int, handler, *args):
+        """Response for `handler(*args)`, run only by the first request with `key`"""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        request_hash = fingerprint(scope, payload)
+        while True:
+            stored = self.cache.get(key)
+            if stored is not None:
+                return self._replay(stored, request_hash)
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # Same container, same key: share the first request's outcome.
+            # None means it failed without a stored response, so try again.
+            stored = await asyncio.shield(inflight)
+            if stored is not None:
+                return self._replay(stored, request_hash)
+
+        inflight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = inflight
+        stored = None
+        try:
+            stored = await self._run_once(key, request_hash, status_code, handler, args)
+        finally:
+            del self._inflight[key]
+            inflight.set_result(stored)
+        if stored.get('replayed'):
+            return self._replay(stored, request_hash)
+        return self._response(stored)
+
+    async def _run_once(self, key, request_hash, status_code, handler, args):
+        while True:
+            existing = await run_in_threadpool(self.store.claim, key, request_hash)
+            if existing is None:
+                break
+            if existing.get('state') != COMPLETED:
+                # None: the other request failed and released the key, so claim it again
+                existing = await self._wait_for(key)
+            if existing is not None:
+                stored = self._stored(existing)
+                self.cache.set(key, stored)
+                return dict(stored, replayed=True)
+
+        try:
+            content = await handler(*args)
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await run_in_threadpool(self.store.release, key)
+                raise
+            status_code, content = e.status_code, {'detail': e.detail}
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+        stored = {
+            'requestHash': request_hash,
+            'statusCode': status_code,
+            'body': FastJSONResponse(jsonable_encoder(content)).body.decode(),
+        }
+        try:
+            await run_in_threadpool(self.store.complete, key, request_hash, stored['statusCode'], stored['body'])
+        except Exception:
+            traceback.print_exc()
+            await self._release_quietly(key)
+        self.cache.set(key, stored)
+        return stored
+
+    async def _release_quietly(self, key: str):
+        # If this fails too, the claim's lockedUntil still lets a retry take it over
+        try:
+            await run_in_threadpool(self.store.release, key)
+        except Exception:
+            traceback.print_exc()
+
+    async def _wait_for(self, key: str):
+        """Poll a key claimed by another request until its response is stored or it is released"""
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_seconds)
+            record = await run_in_threadpool(self.store.get, key)
+            if record is None or record.get('state') == COMPLETED:
+                return record
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+
+    def _stored(self, record):
+        return {
+            'requestHash': record.get('requestHash'),
+            'statusCode': int(record['statusCode']),
+            'body': record['body'],
+        }
+
+    def _replay(self, stored, request_hash: str):
+        if stored['requestHash'] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        return self._response(stored, headers={REPLAYED_HEADER: 'true'})
+
+    def _response(self, stored, headers=None):
+        return Response(
+            content=stored['body'],
+            status_code=stored['statusCode'],
+            media_type='application/json',
+            headers=headers
+        )
@@ -0,0 +1,64 @@
+"""Background job records.
+
+Jobs are stored in DynamoDB rather than in process memory, so any container
+can report the progress of work started by another one. Records expire
+through the table's `expiresAt` TTL attribute.
+"""
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+JOB_TTL_SECONDS = 7 * 24 * 3600
+
+
+class JobStore:
+    """Create, update and read job records in the Jobs table"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def create(self, kind: str, **attributes):
+        now = datetime.utcnow().isoformat()
+        job = dict(
+            attributes,
+            jobId=str(uuid.uuid4()),
+            kind=kind,
+            status='running',
+            processed=0,
+            createdAt=now,
+            updatedAt=now,
+            expiresAt=int(time.time()) + JOB_TTL_SECONDS,
+        )
+        self.table.put_item(Item=job)
+        return job
+
+    def get(self, job_id: str):
+        return self.table.get_item(Key={'jobId': job_id}).get('Item')
+
+    def progress(self, job_id: str, processed: int):
+        self.table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET #processed = :processed, updatedAt = :now',
+            ExpressionAttributeNames={'#processed': 'processed'},
+            ExpressionAttributeValues={':processed': processed, ':now': datetime.utcnow().isoformat()}
+        )
+
+    def finish(self, job_id: str, status: str, **attributes):
+        attributes = dict(attributes, status=status, updatedAt=datetime.utcnow().isoformat())
+        self.table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET ' + ', '.join(f'#{name} = :{name}' for name in attributes),
+            ExpressionAttributeNames={f'#{name}': name for name in attributes},
+            ExpressionAttributeValues={f':{name}': value for name, value in attributes.items()}
+        )
+
+    def run(self, job_id: str, func, *args):
+        """Run `func(*args, on_progress=...)` and record its result or error on the job"""
+        try:
+            processed = func(*args, on_progress=lambda count: self.progress(job_id, count))
+        except Exception as e:
+            traceback.print_exc()
+            self.finish(job_id, 'failed', error=str(e))
+            return
+        self.finish(job_id, 'succeeded', processed=processed)
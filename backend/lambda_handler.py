@@ -1,4 +1,52 @@
-from mangum import Mangum
-from main import app
+import json
+import time
 
-handler = Mangum(app)
+_started = time.perf_counter()
+_import_timings = {}
+
+
+def _timed_import(label, importer):
+    started = time.perf_counter()
+    module = importer()
+    _import_timings[label] = round((time.perf_counter() - started) * 1000, 2)
+    return module
+
+
+# Import the heavy framework packages one at a time so the cold start log
+# shows where init time goes; main then only pays for its own module body.
+_timed_import('pydantic', lambda: __import__('pydantic'))
+_timed_import('fastapi', lambda: __import__('fastapi'))
+_timed_import('boto3', lambda: __import__('boto3.dynamodb.conditions'))
+Mangum = _timed_import('mangum', lambda: __import__('mangum')).Mangum
+main = _timed_import('main', lambda: __import__('main'))
+app = main.app
+
+_mangum = Mangum(app)
+_init_ms = round((time.perf_counter() - _started) * 1000, 2)
+_cold_start = True
+
+
+def _dispatch(event, context):
+    # SQS batches carry deferred tasks; everything else is an API Gateway request
+    if event.get('Records') and event['Records'][0].get('eventSource') == 'aws:sqs':
+        return main.task_queue.handle_event(event)
+    return _mangum(event, context)
+
+
+def handler(event, context):
+    global _cold_start
+    if not _cold_start:
+        return _dispatch(event, context)
+
+    _cold_start = False
+    started = time.perf_counter()
+    response = _dispatch(event, context)
+    from db import init_timings
+    print(json.dumps({
+        "message": "cold start",
+        "initMs": _init_ms,
+        "importMs": _import_timings,
+        "firstInvokeMs": round((time.perf_counter() - started) * 1000, 2),
+        **init_timings,
+    }))
+    return response
@@ -1,13 +1,46 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
-import boto3
 from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
 from datetime import datetime
+import asyncio
+import hashlib
 import os
+import time
 
-app = FastAPI()
+from batch import (
+    batch_delete_keys, batch_get_items, batch_write_items, is_transaction_conflict, put_new_items, run_concurrently,
+    transact_write_items
+)
+from cache import TTLCache
+from counters import (
+    MAX_COUNTER_SHARDS, is_sharded, read_held_seats, read_shard_counts, read_shard_summary, read_shard_version,
+    shard_capacity, shard_order, shards_with_room
+)
+from db import DDB_REQUEST_RETRY_BUDGET, client_settings, get_client, get_hedger, table_from_env
+from idempotency import Idempotency, IdempotencyStore
+from jobs import JobStore
+from metrics import (
+    RouteStats, call_latency, emf_record, emit_emf, end_request, server_timing_header, start_request
+)
+from ndjson import NDJSON_MEDIA_TYPE, dumps_line, iter_lines, loads_line
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, count_all, decode_cursor, encode_cursor, iter_items, read_all,
+    read_page
+)
+from projection import InvalidFields, parse_fields, projection_args, select_fields
+from response_encoding import CompressionMiddleware, FastJSONResponse
+from retries import end_budget, retry_stats, start_budget
+from scan import parallel_scan
+from search import FIELD_WEIGHTS, SearchIndex
+from tasks import make_task_queue
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -18,15 +51,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# DynamoDB setup
-dynamodb = boto3.resource('dynamodb')
-events_table_name = os.environ.get('EVENTS_TABLE_NAME', 'Events')
-users_table_name = os.environ.get('USERS_TABLE_NAME', 'Users')
-registrations_table_name = os.environ.get('REGISTRATIONS_TABLE_NAME', 'Registrations')
+# Opt-in br/gzip compression for responses above a size threshold
+if os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'false').lower() == 'true':
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+    )
+
+# DynamoDB setup; the resource and tables are created on first use
+events_table = table_from_env('EVENTS_TABLE_NAME', 'Events')
+users_table = table_from_env('USERS_TABLE_NAME', 'Users')
+registrations_table = table_from_env('REGISTRATIONS_TABLE_NAME', 'Registrations')
+counters_table = table_from_env('COUNTERS_TABLE_NAME', 'EventCounters')
+jobs_table = table_from_env('JOBS_TABLE_NAME', 'Jobs')
+job_store = JobStore(jobs_table)
+task_queue = make_task_queue()
+search_index = SearchIndex(table_from_env('SEARCH_INDEX_TABLE_NAME', 'SearchIndex'))
+
+# In-process read-through caches for event and user lookups
+ITEM_CACHE_MAX_ENTRIES = int(os.environ.get('ITEM_CACHE_MAX_ENTRIES', '1000'))
+ITEM_CACHE_TTL_SECONDS = float(os.environ.get('ITEM_CACHE_TTL_SECONDS', '30'))
+event_cache = TTLCache(ITEM_CACHE_MAX_ENTRIES, ITEM_CACHE_TTL_SECONDS)
+user_cache = TTLCache(ITEM_CACHE_MAX_ENTRIES, ITEM_CACHE_TTL_SECONDS)
+# Event snapshots for new registrations; registrations don't invalidate these
+summary_cache = TTLCache(ITEM_CACHE_MAX_ENTRIES, ITEM_CACHE_TTL_SECONDS)
+# counterShards per event, fixed when the event is created; routes registrations
+shard_layout_cache = TTLCache(ITEM_CACHE_MAX_ENTRIES, ITEM_CACHE_TTL_SECONDS)
+
+DEBUG_ENDPOINTS_ENABLED = os.environ.get('ENABLE_DEBUG_ENDPOINTS', 'false').lower() == 'true'
+
+# Stored responses for requests sent with an Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IDEMPOTENCY_LOCK_SECONDS = 30
+idempotency = Idempotency(
+    IdempotencyStore(table_from_env('IDEMPOTENCY_TABLE_NAME', 'IdempotencyKeys'), IDEMPOTENCY_TTL_SECONDS,
+                     IDEMPOTENCY_LOCK_SECONDS),
+    TTLCache(ITEM_CACHE_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS)
+)
+
+# Per-request DynamoDB metrics; EMF log lines default on inside Lambda
+EMF_METRICS_ENABLED = os.environ.get(
+    'EMF_METRICS_ENABLED', 'true' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'false'
+).lower() == 'true'
+route_stats = RouteStats()
+
+# Sparse GSI over waitlisted registrations, ordered by waitlist sequence
+WAITLIST_INDEX = 'eventId-waitlistSeq-index'
+
+# Event fields copied onto registration items for the user dashboard
+SUMMARY_FIELDS = ('title', 'date', 'location', 'status')
 
-events_table = dynamodb.Table(events_table_name)
-users_table = dynamodb.Table(users_table_name)
-registrations_table = dynamodb.Table(registrations_table_name)
+# Event fields covered by the full-text search index
+SEARCH_FIELDS = tuple(FIELD_WEIGHTS)
+
+
+@app.middleware("http")
+async def record_dynamodb_metrics(request: Request, call_next):
+    """Attach DynamoDB call counts, latency and consumed capacity to each response"""
+    metrics, token = start_request()
+    _, budget_token = start_budget(DDB_REQUEST_RETRY_BUDGET)
+    try:
+        response = await call_next(request)
+        total_ms = metrics.elapsed_ms()
+        route = request.scope.get('route')
+        route_path = route.path if route is not None else request.url.path
+        response.headers['Server-Timing'] = server_timing_header(metrics, total_ms)
+        if EMF_METRICS_ENABLED:
+            emit_emf(emf_record(route_path, request.method, response.status_code, metrics, total_ms))
+        route_stats.add(f"{request.method} {route_path}", metrics, total_ms)
+        return response
+    finally:
+        end_budget(budget_token)
+        end_request(token)
 
 
 # Data Models
@@ -41,6 +137,7 @@ class Event(BaseModel):
     status: str
     hasWaitlist: bool = False
     registeredCount: int = 0
+    counterShards: int = Field(0, ge=0, le=MAX_COUNTER_SHARDS)  # >0 spreads registeredCount over shard items
 
 
 class EventUpdate(BaseModel):
@@ -69,7 +166,7 @@ class Registration(BaseModel):
     userId: str
     eventId: str
     status: str  # "registered" or "waitlisted"
-    position: Optional[int] = None
+    waitlistSeq: Optional[int] = None  # only set while waitlisted
     registeredAt: str
 
 
@@ -85,81 +182,570 @@ class RegistrationResponse(BaseModel):
     message: str
 
 
+MAX_BATCH_REGISTRATIONS = 1000
+
+
+class BatchRegistrationRequest(BaseModel):
+    userIds: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_REGISTRATIONS)
+
+
+# Pagination Helpers
+def is_paginated(limit: Optional[int], cursor: Optional[str]):
+    """Clients opt into pagination by passing limit or cursor"""
+    return limit is not None or cursor is not None
+
+
+def read_page_or_400(operation, limit: Optional[int], cursor: Optional[str], key_shape, **kwargs):
+    """Read one page of results, rejecting malformed cursors and cursors for other keys"""
+    try:
+        return read_page(operation, limit or DEFAULT_PAGE_SIZE, cursor, key_shape, **kwargs)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def read_rows(operation, limit: Optional[int], cursor: Optional[str], key_shape, **kwargs):
+    """Read every item, or one page when pagination is requested"""
+    if is_paginated(limit, cursor):
+        return read_page_or_400(operation, limit, cursor, key_shape, **kwargs)
+    return read_all(operation, **kwargs), None
+
+
+def scan_rows(table, limit: Optional[int], cursor: Optional[str], key_shape, **kwargs):
+    """Scan every item with a parallel segmented scan, or one page when pagination is requested"""
+    if is_paginated(limit, cursor):
+        return read_page_or_400(table.scan, limit, cursor, key_shape, **kwargs)
+    return list(parallel_scan(table, ordered=True, **kwargs)), None
+
+
+def page_result(items, limit: Optional[int], cursor: Optional[str], next_cursor: Optional[str]):
+    """Wrap items in a page envelope when pagination was requested"""
+    if is_paginated(limit, cursor):
+        return {"items": items, "nextCursor": next_cursor}
+    return items
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking DynamoDB call on the threadpool without blocking the event loop"""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+async def idempotent(idempotency_key: Optional[str], scope: str, payload, status_code: int, handler, *args):
+    """Await `handler(*args)`, or with an Idempotency-Key, run it once and replay its response"""
+    if idempotency_key is None:
+        return await handler(*args)
+    return await idempotency.run(idempotency_key, scope, payload, status_code, handler, *args)
+
+
+def fields_or_400(fields: Optional[str]):
+    """Parse a `fields` query parameter, rejecting invalid attribute names"""
+    try:
+        return parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def date_range_condition(condition_type, date_from: Optional[str], date_to: Optional[str]):
+    """Build a date range condition from optional inclusive bounds"""
+    if date_from and date_to:
+        return condition_type('date').between(date_from, date_to)
+    if date_from:
+        return condition_type('date').gte(date_from)
+    if date_to:
+        return condition_type('date').lte(date_to)
+    return None
+
+
+async def with_registered_counts(events):
+    """Sharded events report the sum of their counter shards, read concurrently"""
+    events = list(events)
+    sharded = [i for i, event in enumerate(events) if is_sharded(event)]
+    refreshed = await asyncio.gather(*(run_blocking(with_registered_count, events[i]) for i in sharded))
+    for i, event in zip(sharded, refreshed):
+        events[i] = event
+    return events
+
+
 @app.get("/events")
-def list_events(status: Optional[str] = Query(None)):
+async def list_events(
+    status: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None, alias='from'),
+    date_to: Optional[str] = Query(None, alias='to'),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return")
+):
     try:
+        fields = fields_or_400(fields)
+        # Sharded counts need the event id and shard count even when not requested
+        projection = projection_args(fields, required=('eventId', 'counterShards'))
         if status:
-            response = events_table.scan(FilterExpression=Attr('status').eq(status))
+            # Query the status/date index so results come back sorted by date
+            key_condition = Key('status').eq(status)
+            date_condition = date_range_condition(Key, date_from, date_to)
+            if date_condition is not None:
+                key_condition = key_condition & date_condition
+            events, next_cursor = await run_blocking(
+                read_rows, events_table.query, limit, cursor,
+                {'eventId': None, 'status': status, 'date': None},
+                IndexName='status-date-index',
+                KeyConditionExpression=key_condition,
+                **projection
+            )
         else:
-            response = events_table.scan()
-        return response.get('Items', [])
+            date_condition = date_range_condition(Attr, date_from, date_to)
+            scan_args = {'FilterExpression': date_condition} if date_condition is not None else {}
+            events, next_cursor = await run_blocking(
+                scan_rows, events_table, limit, cursor, {'eventId': None}, **scan_args, **projection)
+        
+        events = await with_registered_counts(events)
+        events = [select_fields(public_event(event), fields) for event in events]
+        return FastJSONResponse(page_result(events, limit, cursor, next_cursor))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Bulk Import/Export Endpoints
+# Declared before /events/{event_id} and /users/{user_id} so the literal paths match first
+IMPORT_BUFFER_SIZE = 250
+MAX_IMPORT_ERRORS = 100
+
+
+def write_import_chunk(table, items, after_write=None):
+    written = batch_write_items(table, items)
+    if after_write:
+        after_write(items)
+    return written
+
+
+async def import_ndjson(request: Request, model, table, key_name: str, to_item, after_write=None):
+    """Validate NDJSON lines with `model` and write them in BatchWriteItem chunks.
+
+    Valid records are buffered (de-duplicated by key, last line wins) and
+    flushed every IMPORT_BUFFER_SIZE records, so memory stays bounded no
+    matter how large the upload is. `after_write` is called with each
+    flushed chunk of items.
+    """
+    imported = 0
+    errors = []
+    failed = 0
+    buffer = {}
+    async for line_number, line in iter_lines(request.stream()):
+        try:
+            record = model(**loads_line(line))
+        except (ValueError, TypeError) as e:
+            failed += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+            continue
+        item = to_item(record)
+        buffer[item[key_name]] = item
+        if len(buffer) >= IMPORT_BUFFER_SIZE:
+            imported += await run_blocking(write_import_chunk, table, list(buffer.values()), after_write)
+            buffer.clear()
+    if buffer:
+        imported += await run_blocking(write_import_chunk, table, list(buffer.values()), after_write)
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+def export_ndjson(table):
+    """Stream every item of a table as NDJSON as the parallel scan segments return pages"""
+    return StreamingResponse(
+        (dumps_line(item) for item in parallel_scan(table)),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def user_import_item(user: UserCreate):
+    return {'userId': user.userId, 'name': user.name, 'createdAt': datetime.utcnow().isoformat()}
+
+
+@app.post("/events/import")
+async def import_events(request: Request):
+    """Import events from an NDJSON body, one Event per line"""
+    try:
+        result = await import_ndjson(
+            request, Event, events_table, 'eventId', new_event_item, after_write=search_index.index_events
+        )
+        event_cache.clear()
+        summary_cache.clear()
+        shard_layout_cache.clear()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/events/export")
+def export_events():
+    """Export all events as NDJSON"""
+    return export_ndjson(events_table)
+
+
+@app.post("/users/import")
+async def import_users(request: Request):
+    """Import users from an NDJSON body, one UserCreate per line"""
+    try:
+        result = await import_ndjson(request, UserCreate, users_table, 'userId', user_import_item)
+        user_cache.clear()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/users/export")
+def export_users():
+    """Export all users as NDJSON"""
+    return export_ndjson(users_table)
+
+
+# Availability Endpoint
+# Declared before /events/{event_id} so the literal path matches first
+AVAILABILITY_FIELDS = (
+    'eventId', 'title', 'date', 'location', 'capacity', 'registeredCount', 'waitlistCount', 'hasWaitlist',
+    'counterShards', 'version'
+)
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.environ.get('AVAILABILITY_CACHE_TTL_SECONDS', '2'))
+availability_cache = TTLCache(16, AVAILABILITY_CACHE_TTL_SECONDS)
+
+
+def event_availability(event):
+    """Seats left and waitlist length from the summary attributes on an event item.
+
+    registeredCount and waitlistCount are kept up to date by the registration,
+    unregistration and promotion paths, and set on events that predate it by
+    backfill_waitlist.py. Sharded events sum their counter shards in one query.
+    """
+    capacity = int(event.get('capacity', 0))
+    registered = int(event.get('registeredCount', 0))
+    version = str(int(event.get('version', 0)))
+    if is_sharded(event):
+        registered, shard_version = read_shard_summary(counters_table, event['eventId'])
+        version += f'.{shard_version}'
+    return {
+        'eventId': event['eventId'],
+        'title': event.get('title'),
+        'date': event.get('date'),
+        'location': event.get('location'),
+        'capacity': capacity,
+        'registeredCount': registered,
+        'seatsLeft': max(0, capacity - registered),
+        'hasWaitlist': event.get('hasWaitlist', False),
+        'waitlistLength': max(0, int(event.get('waitlistCount', 0))),
+        'version': version
+    }
+
+
+def read_availability(status: str):
+    """Availability of every event with `status`, in date order, and its ETag"""
+    events = read_all(
+        events_table.query,
+        IndexName='status-date-index',
+        KeyConditionExpression=Key('status').eq(status),
+        **projection_args(list(AVAILABILITY_FIELDS))
+    )
+    summaries = run_concurrently(event_availability, events)
+    digest = hashlib.sha1(':'.join(f"{item['eventId']}@{item['version']}" for item in summaries).encode()).hexdigest()
+    return summaries, f'W/"{digest[:20]}"'
+
+
+@app.get("/events/availability")
+async def get_availability(status: str = Query('active'), if_none_match: Optional[str] = Header(None)):
+    """Capacity, seats left and waitlist length for every event with a status, from one index query"""
+    try:
+        cached = availability_cache.get(status)
+        if cached is None:
+            cached = await run_blocking(read_availability, status)
+            availability_cache.set(status, cached)
+        summaries, etag = cached
+        if if_none_match and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return FastJSONResponse(summaries, headers={'ETag': etag})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Search Endpoints
+# Declared before /events/{event_id} so the literal paths match first
+REINDEX_SEARCH_TASK = 'reindex-search'
+
+
+def search_offset(cursor: Optional[str]):
+    """Offset into the ranked results encoded in a search cursor"""
+    key = decode_cursor(cursor)
+    if key is None:
+        return 0
+    offset = key.get('offset')
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidCursor("Invalid cursor")
+    return offset
+
+
+@app.get("/events/search")
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return")
+):
+    """Events matching a free-text query on title, description and location, best match first"""
+    try:
+        fields = fields_or_400(fields)
+        try:
+            offset = search_offset(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        limit = limit or DEFAULT_PAGE_SIZE
+        
+        hits = await run_blocking(search_index.search, q)
+        page = hits[offset:offset + limit]
+        # Only the requested page is read from the Events table
+        events = await run_blocking(
+            batch_get_items, events_table, [{'eventId': event_id} for event_id, _ in page],
+            **projection_args(fields, required=('eventId', 'counterShards'))
+        )
+        found = [(event, score) for event, (_, score) in zip(events, page) if event]
+        refreshed = await with_registered_counts(event for event, _ in found)
+        items = [
+            dict(select_fields(public_event(event), fields), score=round(score, 4))
+            for event, (_, score) in zip(refreshed, found)
+        ]
+        next_cursor = encode_cursor({'offset': offset + limit}) if offset + limit < len(hits) else None
+        return FastJSONResponse({"items": items, "nextCursor": next_cursor, "total": len(hits)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@task_queue.task(REINDEX_SEARCH_TASK)
+def run_reindex_search_job(job_id: str):
+    job_store.run(job_id, reindex_events)
+
+
+def reindex_events(on_progress=None):
+    """Rewrite the search index entry of every event; returns the events indexed"""
+    indexed = 0
+    chunk = []
+    for event in parallel_scan(events_table, **projection_args(list(SEARCH_FIELDS), required=('eventId',))):
+        chunk.append(event)
+        if len(chunk) >= IMPORT_BUFFER_SIZE:
+            search_index.index_events(chunk)
+            indexed += len(chunk)
+            chunk = []
+            if on_progress:
+                on_progress(indexed)
+    if chunk:
+        search_index.index_events(chunk)
+        indexed += len(chunk)
+    return indexed
+
+
+@app.post("/events/search/reindex", status_code=202)
+async def reindex_search(background_tasks: BackgroundTasks):
+    """Rebuild the search index from the Events table in a background job"""
+    try:
+        job = await run_blocking(job_store.create, REINDEX_SEARCH_TASK)
+        await run_blocking(task_queue.enqueue, REINDEX_SEARCH_TASK, {'job_id': job['jobId']},
+                           background_tasks=background_tasks)
+        return {"message": "Search index rebuild started", "jobId": job['jobId'], "statusUrl": f"/jobs/{job['jobId']}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/events/{event_id}")
-def get_event(event_id: str):
+async def get_event(event_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     try:
-        response = events_table.get_item(Key={'eventId': event_id})
-        if 'Item' not in response:
-            raise HTTPException(status_code=404, detail="Event not found")
-        return response['Item']
+        if if_none_match:
+            etag = await run_blocking(read_event_etag, event_id)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        # registeredCount is capacity-sensitive, so always read through
+        event = await run_blocking(get_event_or_404, event_id, use_cache=False)
+        response.headers['ETag'] = await run_blocking(event_etag, event)
+        return public_event(await run_blocking(with_registered_count, event))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/events", status_code=201)
-def create_event(event: Event):
+async def insert_event(event: Event):
     try:
-        events_table.put_item(Item=event.dict())
-        return event.dict()
+        item = new_event_item(event)
+        await run_blocking(events_table.put_item, Item=item)
+        event_cache.invalidate(event.eventId)
+        summary_cache.invalidate(event.eventId)
+        shard_layout_cache.invalidate(event.eventId)
+        await run_blocking(search_index.index_event, item)
+        return public_event(item)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/events", status_code=201)
+async def create_event(event: Event, idempotency_key: Optional[str] = Header(None)):
+    return await idempotent(idempotency_key, "POST /events", event, 201, insert_event, event)
+
+
 @app.put("/events/{event_id}")
-def update_event(event_id: str, event_update: EventUpdate):
+async def update_event(event_id: str, event_update: EventUpdate, background_tasks: BackgroundTasks):
     try:
-        # Check if event exists
-        response = events_table.get_item(Key={'eventId': event_id})
-        if 'Item' not in response:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
         # Build update expression
         update_data = {k: v for k, v in event_update.dict().items() if v is not None}
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
+        # summaryVersion tracks the fields copied onto registration items
+        summary_changed = any(field in update_data for field in SUMMARY_FIELDS)
         update_expr = "SET " + ", ".join([f"#{k} = :{k}" for k in update_data.keys()])
+        update_expr += " ADD version :one, summaryVersion :one" if summary_changed else " ADD version :one"
         expr_attr_names = {f"#{k}": k for k in update_data.keys()}
         expr_attr_values = {f":{k}": v for k, v in update_data.items()}
+        expr_attr_values[':one'] = 1
         
-        response = events_table.update_item(
-            Key={'eventId': event_id},
-            UpdateExpression=update_expr,
-            ExpressionAttributeNames=expr_attr_names,
-            ExpressionAttributeValues=expr_attr_values,
-            ReturnValues="ALL_NEW"
-        )
-        return response['Attributes']
+        # The existence check is part of the update, so this is one round trip
+        try:
+            response = await run_blocking(
+                events_table.update_item,
+                Key={'eventId': event_id},
+                UpdateExpression=update_expr,
+                ConditionExpression=Attr('eventId').exists(),
+                ExpressionAttributeNames=expr_attr_names,
+                ExpressionAttributeValues=expr_attr_values,
+                ReturnValues="ALL_NEW"
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            raise HTTPException(status_code=404, detail="Event not found")
+        event_cache.invalidate(event_id)
+        if summary_changed:
+            summary_cache.invalidate(event_id)
+            await run_blocking(schedule_summary_refresh, event_id, background_tasks)
+        if any(field in update_data for field in SEARCH_FIELDS):
+            await run_blocking(search_index.index_event, response['Attributes'])
+        if 'capacity' in update_data or 'hasWaitlist' in update_data:
+            # Added seats go to the waitlist first
+            await run_blocking(schedule_promotion, event_id, background_tasks)
+        return public_event(response['Attributes'])
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Events with more registrations than this are cleaned up by a background job
+CASCADE_DELETE_SYNC_LIMIT = int(os.environ.get('CASCADE_DELETE_SYNC_LIMIT', '500'))
+CASCADE_DELETE_CHUNK_KEYS = 500
+DELETE_REGISTRATIONS_TASK = 'delete-event-registrations'
+
+
+def registration_key_query(event_id: str):
+    """Query arguments for the keys of every registration of an event"""
+    return {
+        'IndexName': 'eventId-index',
+        'KeyConditionExpression': Key('eventId').eq(event_id),
+        'ProjectionExpression': 'userId, eventId'
+    }
+
+
+def delete_counter_shards(event_id: str):
+    shard_ids = read_shard_counts(counters_table, event_id)
+    batch_delete_keys(counters_table, [{'eventId': event_id, 'shardId': shard_id} for shard_id in shard_ids])
+
+
+def delete_event_registrations(event_id: str, sharded: bool, on_progress=None):
+    """Delete every registration and counter shard of an event.
+
+    Keys are read from eventId-index page by page and removed in rounds of
+    CASCADE_DELETE_CHUNK_KEYS, each a set of parallel 25-item BatchWriteItem
+    calls that retry unprocessed items. Returns the registrations deleted.
+    """
+    deleted = 0
+    keys = []
+    for item in iter_items(registrations_table.query, **registration_key_query(event_id)):
+        keys.append({'userId': item['userId'], 'eventId': item['eventId']})
+        if len(keys) >= CASCADE_DELETE_CHUNK_KEYS:
+            deleted += batch_delete_keys(registrations_table, keys)
+            keys = []
+            if on_progress:
+                on_progress(deleted)
+    if keys:
+        deleted += batch_delete_keys(registrations_table, keys)
+    if sharded:
+        delete_counter_shards(event_id)
+    return deleted
+
+
+@task_queue.task(DELETE_REGISTRATIONS_TASK)
+def run_delete_registrations_job(job_id: str, event_id: str, sharded: bool):
+    job_store.run(job_id, delete_event_registrations, event_id, sharded)
+
+
+def delete_small_event_registrations(event_id: str, sharded: bool):
+    """Delete an event's registrations inline when they fit in one page.
+
+    Returns the number deleted, or None when the event is too large and
+    should be cleaned up by a background job.
+    """
+    items, next_cursor = read_page(registrations_table.query, CASCADE_DELETE_SYNC_LIMIT, **registration_key_query(event_id))
+    if next_cursor:
+        return None
+    deleted = batch_delete_keys(registrations_table, [{'userId': item['userId'], 'eventId': item['eventId']} for item in items])
+    if sharded:
+        delete_counter_shards(event_id)
+    return deleted
+
+
 @app.delete("/events/{event_id}")
-def delete_event(event_id: str):
+async def delete_event(event_id: str, background_tasks: BackgroundTasks):
+    """Delete an event and its registrations.
+
+    Small events are cleaned up before responding. Larger ones return 202
+    with a job whose progress is reported by GET /jobs/{job_id}.
+    """
     try:
-        # Check if event exists
-        response = events_table.get_item(Key={'eventId': event_id})
-        if 'Item' not in response:
+        # Delete only if the event exists, in a single round trip
+        try:
+            response = await run_blocking(
+                events_table.delete_item,
+                Key={'eventId': event_id},
+                ConditionExpression=Attr('eventId').exists(),
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
             raise HTTPException(status_code=404, detail="Event not found")
+        event_cache.invalidate(event_id)
+        summary_cache.invalidate(event_id)
+        shard_layout_cache.invalidate(event_id)
+        await run_blocking(search_index.remove_event, event_id)
+        
+        # The event is gone, so no new registrations can claim a seat while cleaning up
+        sharded = is_sharded(response['Attributes'])
+        deleted = await run_blocking(delete_small_event_registrations, event_id, sharded)
+        if deleted is not None:
+            return {"message": "Event deleted successfully", "registrationsDeleted": deleted}
         
-        events_table.delete_item(Key={'eventId': event_id})
-        return {"message": "Event deleted successfully"}
+        job = await run_blocking(job_store.create, DELETE_REGISTRATIONS_TASK, eventId=event_id)
+        await run_blocking(
+            task_queue.enqueue, DELETE_REGISTRATIONS_TASK,
+            {'job_id': job['jobId'], 'event_id': event_id, 'sharded': sharded},
+            background_tasks=background_tasks
+        )
+        return FastJSONResponse({
+            "message": "Event deleted; registrations are being removed in the background",
+            "jobId": job['jobId'],
+            "statusUrl": f"/jobs/{job['jobId']}"
+        }, status_code=202)
     except HTTPException:
         raise
     except Exception as e:
@@ -167,22 +753,26 @@ def delete_event(event_id: str):
 
 
 # User Management Endpoints
-@app.post("/users", status_code=201)
-def create_user(user: UserCreate):
-    """Create a new user"""
+async def insert_user(user: UserCreate):
+    """Create a user item, failing with 409 if the user already exists"""
     try:
-        # Check if user already exists
-        response = users_table.get_item(Key={'userId': user.userId})
-        if 'Item' in response:
-            raise HTTPException(status_code=409, detail=f"User with userId '{user.userId}' already exists")
-        
-        # Create user with timestamp
+        # Create user with timestamp, failing if the user already exists
         user_data = {
             'userId': user.userId,
             'name': user.name,
             'createdAt': datetime.utcnow().isoformat()
         }
-        users_table.put_item(Item=user_data)
+        try:
+            await run_blocking(
+                users_table.put_item,
+                Item=user_data,
+                ConditionExpression=Attr('userId').not_exists()
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            raise HTTPException(status_code=409, detail=f"User with userId '{user.userId}' already exists")
+        user_cache.invalidate(user.userId)
         return user_data
     except HTTPException:
         raise
@@ -190,14 +780,17 @@ def create_user(user: UserCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/users", status_code=201)
+async def create_user(user: UserCreate, idempotency_key: Optional[str] = Header(None)):
+    """Create a new user"""
+    return await idempotent(idempotency_key, "POST /users", user, 201, insert_user, user)
+
+
 @app.get("/users/{user_id}")
-def get_user(user_id: str):
+async def get_user(user_id: str):
     """Get user by ID"""
     try:
-        response = users_table.get_item(Key={'userId': user_id})
-        if 'Item' not in response:
-            raise HTTPException(status_code=404, detail="User not found")
-        return response['Item']
+        return await run_blocking(get_user_or_404, user_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -205,30 +798,51 @@ def get_user(user_id: str):
 
 
 @app.get("/users")
-def list_users():
+async def list_users(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to return")
+):
     """List all users"""
     try:
-        response = users_table.scan()
-        return response.get('Items', [])
+        projection = projection_args(fields_or_400(fields))
+        users, next_cursor = await run_blocking(scan_rows, users_table, limit, cursor, {'userId': None}, **projection)
+        return FastJSONResponse(page_result(users, limit, cursor, next_cursor))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Registration Helper Functions
-def get_event_or_404(event_id: str):
-    """Get event or raise 404"""
+def get_event_or_404(event_id: str, use_cache: bool = True):
+    """Get event or raise 404.
+
+    Pass use_cache=False for capacity-sensitive reads that need the current
+    registeredCount; the fresh item still refreshes the cache.
+    """
+    if use_cache:
+        cached = event_cache.get(event_id)
+        if cached is not None:
+            return dict(cached)
     response = events_table.get_item(Key={'eventId': event_id})
     if 'Item' not in response:
         raise HTTPException(status_code=404, detail="Event not found")
-    return response['Item']
+    event_cache.set(event_id, response['Item'])
+    return dict(response['Item'])
 
 
-def get_user_or_404(user_id: str):
+def get_user_or_404(user_id: str, use_cache: bool = True):
     """Get user or raise 404"""
+    if use_cache:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
     response = users_table.get_item(Key={'userId': user_id})
     if 'Item' not in response:
         raise HTTPException(status_code=404, detail="User not found")
-    return response['Item']
+    user_cache.set(user_id, response['Item'])
+    return dict(response['Item'])
 
 
 def get_registration(user_id: str, event_id: str):
@@ -237,199 +851,1053 @@ def get_registration(user_id: str, event_id: str):
     return response.get('Item')
 
 
-def create_registration_record(user_id: str, event_id: str, status: str, position: Optional[int] = None):
-    """Create a registration record"""
+def event_summary(event):
+    """Snapshot of the event fields shown on dashboards, stored on registration items.
+
+    `version` is the event's summaryVersion, so a refresh never overwrites a
+    newer snapshot with an older one.
+    """
+    summary = {field: event[field] for field in SUMMARY_FIELDS if field in event}
+    summary['version'] = int(event.get('summaryVersion', 0))
+    return summary
+
+
+REFRESH_SUMMARIES_TASK = 'refresh-registration-summaries'
+
+
+@task_queue.task(REFRESH_SUMMARIES_TASK)
+def refresh_registration_summaries(event_id: str):
+    """Rewrite the event snapshot on every registration for the event.
+
+    Runs as a task after Update Event responds. The event is read
+    consistently when the task runs, and each row is only written while its
+    snapshot is older than the event's summaryVersion, so passes for
+    successive updates can run in any order and repeated deliveries are
+    harmless. Returns the registrations visited.
+    """
+    event = events_table.get_item(Key={'eventId': event_id}, ConsistentRead=True).get('Item')
+    if not event:
+        return 0
+    summary = event_summary(event)
+    keys = [
+        {'userId': registration['userId'], 'eventId': registration['eventId']}
+        for registration in iter_items(
+            registrations_table.query,
+            IndexName='eventId-index',
+            KeyConditionExpression=Key('eventId').eq(event_id),
+            ProjectionExpression='userId, eventId'
+        )
+    ]
+    
+    def refresh(key):
+        try:
+            registrations_table.update_item(
+                Key=key,
+                UpdateExpression='SET eventSummary = :summary',
+                ConditionExpression=Attr('userId').exists() & (
+                    Attr('eventSummary.version').not_exists() | Attr('eventSummary.version').lt(summary['version'])
+                ),
+                ExpressionAttributeValues={':summary': summary}
+            )
+        except ClientError as e:
+            # Deleted meanwhile, or already carries a newer snapshot
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    
+    run_concurrently(refresh, keys)
+    return len(keys)
+
+
+def schedule_summary_refresh(event_id: str, background_tasks: Optional[BackgroundTasks] = None):
+    task_queue.enqueue(REFRESH_SUMMARIES_TASK, {'event_id': event_id}, key=f'{REFRESH_SUMMARIES_TASK}:{event_id}',
+                       background_tasks=background_tasks)
+
+
+def get_counter_shards(event_id: str):
+    """counterShards of an event, cached; registrations never change it"""
+    shards = shard_layout_cache.get(event_id)
+    if shards is None:
+        shards = int(get_event_or_404(event_id).get('counterShards') or 0)
+        shard_layout_cache.set(event_id, shards)
+    return shards
+
+
+def get_event_summary(event_id: str):
+    """Cached event snapshot; a stale one is caught by register_transaction"""
+    summary = summary_cache.get(event_id)
+    if summary is None:
+        summary = event_summary(get_event_or_404(event_id))
+        summary_cache.set(event_id, summary)
+    return summary
+
+
+def build_registration_record(user_id: str, event_id: str, summary, status: str, waitlist_seq: Optional[int] = None):
+    """Build a registration item carrying a snapshot of the event"""
     registration_data = {
         'userId': user_id,
         'eventId': event_id,
         'status': status,
+        'eventSummary': summary,
         'registeredAt': datetime.utcnow().isoformat()
     }
-    if position is not None:
-        registration_data['position'] = position
-    
-    registrations_table.put_item(Item=registration_data)
+    if waitlist_seq is not None:
+        registration_data['waitlistSeq'] = waitlist_seq
     return registration_data
 
 
-def increment_registered_count(event_id: str):
+def summary_version_condition(summary):
+    """(condition, values) that the event still has the summaryVersion `summary` was taken at"""
+    if summary['version']:
+        return 'summaryVersion = :summaryVersion', {':summaryVersion': summary['version']}
+    return 'attribute_not_exists(summaryVersion)', {}
+
+
+def summary_check(summary):
+    """ConditionCheck arguments: the event exists and `summary` is its current snapshot"""
+    condition, values = summary_version_condition(summary)
+    check = {'ConditionExpression': f'attribute_exists(eventId) AND {condition}'}
+    if values:
+        check['ExpressionAttributeValues'] = values
+    return check
+
+
+def create_registration_record(user_id: str, event, status: str, waitlist_seq: Optional[int] = None):
+    """Create a registration record, failing with 409 if one already exists.
+
+    The put is paired with a summary_check on the event, like the seat
+    claims, so a snapshot from a stale cached event is retried with the
+    current one instead of overwriting a newer snapshot.
+    """
+    event_id = event['eventId']
+    summary = event_summary(event)
+    for _ in range(MAX_SNAPSHOT_ATTEMPTS):
+        registration_data = build_registration_record(user_id, event_id, summary, status, waitlist_seq)
+        try:
+            transact_write_items(get_client(), [
+                {'Put': {
+                    'TableName': registrations_table.name,
+                    'Item': registration_data,
+                    'ConditionExpression': 'attribute_not_exists(userId)',
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }},
+                {'ConditionCheck': dict(
+                    summary_check(summary), TableName=events_table.name, Key={'eventId': event_id},
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                )}
+            ])
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            registration_reason, event_reason = e.response.get('CancellationReasons', [{}, {}])
+            if registration_reason.get('Code') == 'ConditionalCheckFailed':
+                raise_registration_conflict(deserialize_item(registration_reason.get('Item')))
+            if event_reason.get('Code') == 'ConditionalCheckFailed':
+                summary = refreshed_summary(event_id, deserialize_item(event_reason.get('Item')))
+                continue
+            if is_transaction_conflict(e):
+                raise_busy()
+            raise
+        return registration_data
+    raise_snapshot_conflict()
+
+
+def refreshed_summary(event_id: str, current_event):
+    """Snapshot of the event returned by a failed summary_check; 404 if it was deleted"""
+    if not current_event:
+        raise_event_gone(event_id)
+    summary = event_summary(current_event)
+    summary_cache.set(event_id, summary)
+    return summary
+
+
+def raise_snapshot_conflict():
+    raise HTTPException(status_code=409, detail="Event was updated during registration, please retry")
+
+
+def registration_conflict_message(existing_registration):
+    """Why a user cannot register, given their existing registration"""
+    if existing_registration.get('status') == 'waitlisted':
+        return "User is already on the waitlist for this event"
+    return "User is already registered for this event"
+
+
+def raise_registration_conflict(existing_registration):
+    """Raise the 409 matching an existing registration's status"""
+    raise HTTPException(status_code=409, detail=registration_conflict_message(existing_registration))
+
+
+_deserializer = TypeDeserializer()
+
+
+def deserialize_item(item):
+    """Convert a low-level DynamoDB item (as found on errors) to Python values"""
+    return {k: _deserializer.deserialize(v) for k, v in (item or {}).items()}
+
+
+def counter_key(event_id: str, shard_id: Optional[int] = None):
+    """Table and key holding the registered count, or one of its shards"""
+    if shard_id is None:
+        return events_table, {'eventId': event_id}
+    return counters_table, {'eventId': event_id, 'shardId': shard_id}
+
+
+def forget_event(event_id: str):
+    """Drop an event that was deleted since it was cached from every cache"""
+    event_cache.invalidate(event_id)
+    summary_cache.invalidate(event_id)
+    shard_layout_cache.invalidate(event_id)
+
+
+def raise_event_gone(event_id: str):
+    forget_event(event_id)
+    raise HTTPException(status_code=404, detail="Event not found")
+
+
+def increment_registered_count(event_id: str, shard_id: Optional[int] = None):
     """Atomically increment registered count for an event"""
-    events_table.update_item(
-        Key={'eventId': event_id},
-        UpdateExpression='SET registeredCount = if_not_exists(registeredCount, :zero) + :inc',
+    table, key = counter_key(event_id, shard_id)
+    table.update_item(
+        Key=key,
+        UpdateExpression='SET registeredCount = if_not_exists(registeredCount, :zero) + :inc ADD version :inc',
         ExpressionAttributeValues={':inc': 1, ':zero': 0}
     )
+    event_cache.invalidate(event_id)
+
+
+def decrement_registered_count(event_id: str, shard_id: Optional[int] = None):
+    """Atomically decrement registered count for an event; False if its counter is gone"""
+    table, key = counter_key(event_id, shard_id)
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression='SET registeredCount = registeredCount - :dec ADD version :dec',
+            ConditionExpression=Attr('eventId').exists(),
+            ExpressionAttributeValues={':dec': 1}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # The event was deleted along with its counters
+        return False
+    finally:
+        event_cache.invalidate(event_id)
+    return True
+
+
+def get_registered_count(event):
+    """Registered count for an event, summing counter shards when sharded"""
+    if is_sharded(event):
+        return sum(read_shard_counts(counters_table, event['eventId']).values())
+    return event.get('registeredCount', 0)
+
+
+def with_registered_count(event):
+    """Copy of an event whose registeredCount reflects its counter shards"""
+    if not is_sharded(event):
+        return event
+    return dict(event, registeredCount=get_registered_count(event))
 
 
-def decrement_registered_count(event_id: str):
-    """Atomically decrement registered count for an event"""
-    events_table.update_item(
+def new_event_item(event: Event):
+    """Events item for a created or imported event.
+
+    `version` starts at the creation time in milliseconds, so an event that is
+    deleted and created again never repeats an ETag. waitlistCount starts at
+    0 so joins and leaves keep it exact from the first one.
+    """
+    return dict(event.dict(), version=int(time.time() * 1000), waitlistCount=0)
+
+
+# Counters and versions on event items that the API keeps for itself
+INTERNAL_EVENT_FIELDS = frozenset({'waitlistSeq', 'waitlistCount', 'heldSeats', 'version', 'summaryVersion'})
+
+
+def public_event(event):
+    """An event item as returned by the API, without its internal bookkeeping attributes"""
+    return {name: value for name, value in event.items() if name not in INTERNAL_EVENT_FIELDS}
+
+
+def event_etag(event):
+    """Strong ETag for an event.
+
+    `version` on the event item is bumped by every update, counter change and
+    waitlist allocation. Sharded events also fold in their shard versions,
+    since their counts change without touching the event item.
+    """
+    tag = str(int(event.get('version', 0)))
+    if is_sharded(event):
+        tag += f".{read_shard_version(counters_table, event['eventId'])}"
+    return f'"{tag}"'
+
+
+def body_etag(body: bytes):
+    """Strong ETag naming exactly these response bytes"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def read_event_etag(event_id: str):
+    """Current ETag of an event from a projected read of its version attributes"""
+    response = events_table.get_item(
         Key={'eventId': event_id},
-        UpdateExpression='SET registeredCount = registeredCount - :dec',
-        ExpressionAttributeValues={':dec': 1}
+        ProjectionExpression='eventId, version, counterShards'
     )
+    if 'Item' not in response:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event_etag(response['Item'])
 
 
-def get_next_waitlist_position(event_id: str):
-    """Get the next waitlist position for an event"""
-    response = registrations_table.query(
-        IndexName='eventId-index',
-        KeyConditionExpression=Key('eventId').eq(event_id),
-        FilterExpression=Attr('status').eq('waitlisted')
+def etag_matches(if_none_match: str, etag: str):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in if_none_match.split(','))
+
+
+def not_modified(etag: str):
+    return Response(status_code=304, headers={'ETag': etag})
+
+
+def next_waitlist_seq(event_id: str):
+    """Atomically allocate the next waitlist sequence number for an event"""
+    return allocate_waitlist_seqs(event_id, 1)[0]
+
+
+def adjust_waitlist_count(event_id: str, delta: int):
+    """Apply a change in waitlist length to the event's waitlistCount"""
+    try:
+        events_table.update_item(
+            Key={'eventId': event_id},
+            UpdateExpression='ADD waitlistCount :delta, version :one',
+            ConditionExpression=Attr('eventId').exists(),
+            ExpressionAttributeValues={':delta': delta, ':one': 1}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # The event was deleted; there is no count to keep
+    event_cache.invalidate(event_id)
+
+
+def count_waitlist_before(event_id: str, waitlist_seq, inclusive: bool = True):
+    """Count waitlist entries ahead of a sequence number"""
+    seq_condition = Key('waitlistSeq').lte(waitlist_seq) if inclusive else Key('waitlistSeq').lt(waitlist_seq)
+    return count_all(
+        registrations_table.query,
+        IndexName=WAITLIST_INDEX,
+        KeyConditionExpression=Key('eventId').eq(event_id) & seq_condition
+    )
+
+
+def get_waitlist_position(event_id: str, waitlist_seq):
+    """Derive the 1-based waitlist position for a sequence number"""
+    return count_waitlist_before(event_id, waitlist_seq)
+
+
+def waitlist_entry_position(entry):
+    """Position of a user's waitlist entry.
+
+    Rows written before waitlistSeq existed keep their stored `position` until
+    backfill_waitlist.py gives them a sequence number.
+    """
+    if 'waitlistSeq' not in entry:
+        return int(entry['position']) if 'position' in entry else None
+    return get_waitlist_position(entry['eventId'], entry['waitlistSeq'])
+
+
+class EventFull(Exception):
+    """Raised when the seat transaction fails the capacity condition"""
+
+    def __init__(self, event):
+        super().__init__(event.get('eventId'))
+        self.event = event
+
+
+class SeatUnavailable(Exception):
+    """Raised when only the seat update's condition failed"""
+
+    def __init__(self, item):
+        super().__init__()
+        self.item = item
+
+
+class EventChanged(Exception):
+    """Raised when the event check of a seat claim failed; `item` is empty when the event is gone"""
+
+    def __init__(self, item):
+        super().__init__()
+        self.item = item
+
+
+def claim_seat_transaction(user_id: str, registration_data: dict, seat_update: dict, event_check=None):
+    """Create a registered record and claim a seat in one transaction.
+
+    The transaction checks that the user exists and that no registration
+    exists yet, and applies `seat_update`, whose condition guards capacity.
+    Seats kept in counter shards also pass `event_check`, a condition on
+    the Events item, since the shard alone cannot tell the event was deleted.
+    Failed conditions are mapped to 404/409 responses, EventChanged carrying
+    the event when its check failed, or SeatUnavailable carrying the old seat
+    item when only the seat condition failed. Conflicts with concurrent
+    transactions on the seat are retried, then answered with 503.
+    """
+    transact_items = [
+        {'ConditionCheck': {
+            'TableName': users_table.name,
+            'Key': {'userId': user_id},
+            'ConditionExpression': 'attribute_exists(userId)'
+        }},
+        {'Put': {
+            'TableName': registrations_table.name,
+            'Item': registration_data,
+            'ConditionExpression': 'attribute_not_exists(userId)',
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }},
+        {'Update': dict(seat_update, ReturnValuesOnConditionCheckFailure='ALL_OLD')}
+    ]
+    if event_check is not None:
+        transact_items.append({'ConditionCheck': dict(
+            event_check, TableName=events_table.name, Key={'eventId': registration_data['eventId']},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )})
+    try:
+        transact_write_items(get_client(), transact_items)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or [{} for _ in transact_items]
+        user_reason, registration_reason, seat_reason = reasons[:3]
+        event_reason = reasons[3] if len(reasons) > 3 else {}
+        if user_reason.get('Code') == 'ConditionalCheckFailed':
+            raise HTTPException(status_code=404, detail="User not found")
+        if event_reason.get('Code') == 'ConditionalCheckFailed':
+            raise EventChanged(deserialize_item(event_reason.get('Item')))
+        if registration_reason.get('Code') == 'ConditionalCheckFailed':
+            raise_registration_conflict(deserialize_item(registration_reason.get('Item')))
+        if seat_reason.get('Code') == 'ConditionalCheckFailed':
+            raise SeatUnavailable(deserialize_item(seat_reason.get('Item')))
+        if is_transaction_conflict(e):
+            raise_busy()
+        raise
+
+
+def raise_busy():
+    """503 for a write that kept conflicting with concurrent transactions"""
+    raise HTTPException(
+        status_code=503,
+        detail="Too many concurrent registrations for this event, please retry",
+        headers={'Retry-After': '1'}
     )
-    waitlist_entries = response.get('Items', [])
-    if not waitlist_entries:
-        return 1
-    return max(entry.get('position', 0) for entry in waitlist_entries) + 1
 
 
-def is_event_full(event):
-    """Check if event is at capacity"""
-    registered_count = event.get('registeredCount', 0)
-    capacity = event.get('capacity', 0)
-    return registered_count >= capacity
+MAX_SNAPSHOT_ATTEMPTS = 3
 
 
-def handle_registration(user_id: str, event_id: str):
-    """Handle registration logic with capacity and waitlist checks"""
-    # Validate user and event exist
-    user = get_user_or_404(user_id)
-    event = get_event_or_404(event_id)
+def register_transaction(user_id: str, event_id: str):
+    """Register against the registeredCount on the event item.
+
+    The update is guarded by registeredCount < capacity, so concurrent
+    requests cannot overbook the event. Raises EventFull with the event when
+    it is at capacity or keeps its count in counter shards.
+
+    The event snapshot on the registration comes from summary_cache; the
+    update also requires the event's summaryVersion to match it, and a stale
+    snapshot is retried with the event returned by the failed condition.
+    """
+    summary = get_event_summary(event_id)
+    for _ in range(MAX_SNAPSHOT_ATTEMPTS):
+        registration_data = build_registration_record(user_id, event_id, summary, 'registered')
+        summary_version = summary['version']
+        condition = (
+            'attribute_exists(eventId) AND '
+            '(attribute_not_exists(counterShards) OR counterShards = :zero) AND '
+            '(registeredCount < #capacity OR (attribute_not_exists(registeredCount) AND #capacity > :zero))'
+        )
+        version_condition, version_values = summary_version_condition(summary)
+        condition += f' AND {version_condition}'
+        values = {':inc': 1, ':zero': 0, **version_values}
+        try:
+            claim_seat_transaction(user_id, registration_data, {
+                'TableName': events_table.name,
+                'Key': {'eventId': event_id},
+                'UpdateExpression': 'SET registeredCount = if_not_exists(registeredCount, :zero) + :inc ADD version :inc',
+                'ConditionExpression': condition,
+                'ExpressionAttributeNames': {'#capacity': 'capacity'},
+                'ExpressionAttributeValues': values
+            })
+        except SeatUnavailable as e:
+            if not e.item:
+                raise_event_gone(event_id)
+            if int(e.item.get('summaryVersion', 0)) == summary_version:
+                raise EventFull(e.item)
+            # The snapshot was stale; retry with the current event
+            summary = refreshed_summary(event_id, e.item)
+            continue
+        event_cache.invalidate(event_id)
+        return registration_data
+    raise_snapshot_conflict()
+
+
+def register_sharded_transaction(user_id: str, event):
+    """Register against one of the event's counter shards.
+
+    Each shard owns a slice of the capacity. A random shard is tried first;
+    if it is full, the shard counts are read once and the shards with room
+    are tried in turn. Raises EventFull when every shard is at capacity.
+
+    The transaction's summary_check on the event also guards the snapshot
+    taken from `event`, which may come from cache, as in register_transaction.
+    """
+    event_id = event['eventId']
+    shards = int(event['counterShards'])
+    capacity = int(event.get('capacity', 0))
+    summary = event_summary(event)
+
+    def claim(shard_id: int, seats: int):
+        """The registration once a seat on the shard is claimed, or None when the shard is full"""
+        nonlocal summary
+        for _ in range(MAX_SNAPSHOT_ATTEMPTS):
+            registration_data = build_registration_record(user_id, event_id, summary, 'registered')
+            registration_data['counterShard'] = shard_id
+            try:
+                claim_seat_transaction(user_id, registration_data, {
+                    'TableName': counters_table.name,
+                    'Key': {'eventId': event_id, 'shardId': shard_id},
+                    'UpdateExpression': 'SET registeredCount = if_not_exists(registeredCount, :zero) + :inc ADD version :inc',
+                    'ConditionExpression': 'attribute_not_exists(registeredCount) OR registeredCount < :seats',
+                    'ExpressionAttributeValues': {':inc': 1, ':zero': 0, ':seats': seats}
+                }, event_check=summary_check(summary))
+                return registration_data
+            except SeatUnavailable:
+                return None
+            except EventChanged as e:
+                # Deleted, or the snapshot was stale; retry with the current event
+                summary = refreshed_summary(event_id, e.item)
+        raise_snapshot_conflict()
+
+    candidates = shard_order(shards)[:1]
+    counts_loaded = False
+    while True:
+        for shard_id in candidates:
+            seats = shard_capacity(capacity, shards, shard_id)
+            if seats <= 0:
+                continue
+            registration_data = claim(shard_id, seats)
+            if registration_data is not None:
+                return registration_data
+        if counts_loaded:
+            break
+        counts = read_shard_counts(counters_table, event_id)
+        candidates = shards_with_room(event, counts)
+        counts_loaded = True
+    raise EventFull(with_registered_count(event))
+
+
+def registered_response(user_id: str, event_id: str):
+    """Response for a successful registration"""
+    return RegistrationResponse(
+        userId=user_id,
+        eventId=event_id,
+        status='registered',
+        position=None,
+        message="Successfully registered for event"
+    )
+
+
+def handle_registration(user_id: str, event_id: str, background_tasks: Optional[BackgroundTasks] = None):
+    """Handle registration logic with capacity and waitlist checks.
+
+    Hot events keep their count in counter shards, so their registrations go
+    straight to a shard and never write the Events item to take a seat.
+    """
+    if not get_counter_shards(event_id):
+        try:
+            # Register and take a seat atomically; this is a single round trip
+            register_transaction(user_id, event_id)
+            return registered_response(user_id, event_id)
+        except EventFull as full:
+            # Full, or the event was recreated with counter shards since it was cached
+            event = full.event
+    else:
+        event = get_event_or_404(event_id)
     
-    # Check if already registered or waitlisted
-    existing_registration = get_registration(user_id, event_id)
-    if existing_registration:
-        status = existing_registration.get('status')
-        if status == 'registered':
-            raise HTTPException(status_code=409, detail="User is already registered for this event")
-        elif status == 'waitlisted':
-            raise HTTPException(status_code=409, detail="User is already on the waitlist for this event")
+    if is_sharded(event):
+        try:
+            register_sharded_transaction(user_id, event)
+            return registered_response(user_id, event_id)
+        except EventFull as full:
+            event = full.event
     
-    # Check capacity
-    if is_event_full(event):
-        # Event is full
-        has_waitlist = event.get('hasWaitlist', False)
-        if not has_waitlist:
-            # No waitlist - reject registration
-            raise HTTPException(
-                status_code=422,
-                detail=f"Event is full. Capacity: {event['capacity']}, Registered: {event.get('registeredCount', 0)}"
-            )
-        else:
-            # Add to waitlist
-            position = get_next_waitlist_position(event_id)
-            registration = create_registration_record(user_id, event_id, 'waitlisted', position)
-            return RegistrationResponse(
-                userId=user_id,
-                eventId=event_id,
-                status='waitlisted',
-                position=position,
-                message=f"Event is full. Added to waitlist at position {position}"
-            )
-    else:
-        # Event has capacity - register user
-        registration = create_registration_record(user_id, event_id, 'registered')
-        increment_registered_count(event_id)
-        return RegistrationResponse(
-            userId=user_id,
-            eventId=event_id,
-            status='registered',
-            position=None,
-            message="Successfully registered for event"
+    # Event is full
+    has_waitlist = event.get('hasWaitlist', False)
+    if not has_waitlist:
+        # No waitlist - reject registration
+        raise HTTPException(
+            status_code=422,
+            detail=f"Event is full. Capacity: {event['capacity']}, Registered: {event.get('registeredCount', 0)}"
         )
+    
+    # Add to waitlist
+    waitlist_seq = next_waitlist_seq(event_id)
+    try:
+        create_registration_record(user_id, event, 'waitlisted', waitlist_seq)
+    except HTTPException:
+        # The user already has a registration; give back the counted waitlist spot
+        adjust_waitlist_count(event_id, -1)
+        raise
+    # Count only the entries ahead, so an index that has not caught up with this row cannot undercount it
+    position = count_waitlist_before(event_id, waitlist_seq, inclusive=False) + 1
+    if position == 1:
+        # A seat may have been released while this entry was being written
+        schedule_promotion(event_id, background_tasks)
+    return RegistrationResponse(
+        userId=user_id,
+        eventId=event_id,
+        status='waitlisted',
+        position=position,
+        message=f"Event is full. Added to waitlist at position {position}"
+    )
 
 
 # Registration Endpoints
-@app.post("/events/{event_id}/register", status_code=201)
-def register_for_event(event_id: str, request: RegistrationRequest):
-    """Register a user for an event"""
+async def register_user(event_id: str, user_id: str, background_tasks: BackgroundTasks):
     try:
-        result = handle_registration(request.userId, event_id)
-        return result
+        return await run_blocking(handle_registration, user_id, event_id, background_tasks)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def promote_from_waitlist(event_id: str):
-    """Promote the first person from waitlist to registered"""
-    # Find first waitlisted user (position = 1)
-    response = registrations_table.query(
-        IndexName='eventId-index',
-        KeyConditionExpression=Key('eventId').eq(event_id),
-        FilterExpression=Attr('status').eq('waitlisted') & Attr('position').eq(1)
+@app.post("/events/{event_id}/register", status_code=201)
+async def register_for_event(
+    event_id: str,
+    request: RegistrationRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Register a user for an event"""
+    return await idempotent(
+        idempotency_key, f"POST /events/{event_id}/register", request, 201,
+        register_user, event_id, request.userId, background_tasks
     )
+
+
+MAX_SEAT_CLAIM_ATTEMPTS = 10
+
+
+def claim_seats(event, wanted: int):
+    """Claim up to `wanted` seats with a single counter delta.
+
+    The count read from the event (or each shard) is written back with an
+    optimistic `registeredCount = :old` condition and re-read on conflict, so
+    the claim never exceeds capacity. Returns the counter shard for each
+    claimed seat (None when the event is not sharded).
+    """
+    event_id = event['eventId']
+    capacity = int(event.get('capacity', 0))
+    claimed = []
+    for _ in range(MAX_SEAT_CLAIM_ATTEMPTS):
+        if is_sharded(event):
+            shards = int(event['counterShards'])
+            counts = read_shard_counts(counters_table, event_id)
+            slots = [
+                (shard_id, counts.get(shard_id, 0), shard_capacity(capacity, shards, shard_id))
+                for shard_id in shards_with_room(event, counts)
+            ]
+        else:
+            current = get_event_or_404(event_id, use_cache=False)
+            slots = [(None, int(current.get('registeredCount', 0)), int(current.get('capacity', 0)))]
+        
+        conflicted = False
+        for shard_id, count, seats in slots:
+            take = min(seats - count, wanted - len(claimed))
+            if take <= 0:
+                continue
+            table, key = counter_key(event_id, shard_id)
+            try:
+                table.update_item(
+                    Key=key,
+                    UpdateExpression='SET registeredCount = :new ADD version :one',
+                    ConditionExpression=(
+                        Attr('registeredCount').eq(count) if count else
+                        Attr('registeredCount').not_exists() | Attr('registeredCount').eq(0)
+                    ) & Attr('eventId').exists(),
+                    ExpressionAttributeValues={':new': count + take, ':one': 1}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                conflicted = True
+                continue
+            claimed.extend([shard_id] * take)
+        
+        if not conflicted or len(claimed) >= wanted:
+            break
+    event_cache.invalidate(event_id)
+    return claimed
+
+
+def allocate_waitlist_seqs(event_id: str, count: int):
+    """Atomically reserve a block of consecutive waitlist sequence numbers"""
+    try:
+        response = events_table.update_item(
+            Key={'eventId': event_id},
+            UpdateExpression='ADD waitlistSeq :count, waitlistCount :count, version :one',
+            ConditionExpression=Attr('eventId').exists(),
+            ExpressionAttributeValues={':count': count, ':one': 1},
+            ReturnValues='UPDATED_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        raise_event_gone(event_id)
+    event_cache.invalidate(event_id)
+    last_seq = int(response['Attributes']['waitlistSeq'])
+    return list(range(last_seq - count + 1, last_seq + 1))
+
+
+def handle_batch_registration(user_ids: List[str], event_id: str, background_tasks: Optional[BackgroundTasks] = None):
+    """Register many users for one event in a single pass.
+
+    The event is read once, users and existing registrations are checked with
+    BatchGetItem, seats are claimed with one counter delta, the remaining
+    users are waitlisted in order, and every new registration is written with
+    a conditional put in transactions of up to 100. A user who registered
+    through another request meanwhile is rejected, and the seat or waitlist
+    spot claimed for them is given back.
+    """
+    event = get_event_or_404(event_id, use_cache=False)
+    user_ids = list(dict.fromkeys(user_ids))
+    has_waitlist = event.get('hasWaitlist', False)
     
-    waitlist_entries = response.get('Items', [])
-    if not waitlist_entries:
-        return None
+    users = batch_get_items(users_table, [{'userId': user_id} for user_id in user_ids])
+    existing = batch_get_items(registrations_table, [{'userId': user_id, 'eventId': event_id} for user_id in user_ids])
     
-    first_waitlisted = waitlist_entries[0]
-    user_id = first_waitlisted['userId']
+    results = {}
+    candidates = []
+    for user_id, user, registration in zip(user_ids, users, existing):
+        if not user:
+            results[user_id] = ('rejected', None, "User not found")
+        elif registration:
+            results[user_id] = ('rejected', None, registration_conflict_message(registration))
+        else:
+            candidates.append(user_id)
     
-    # Update status to registered and remove position
-    registrations_table.update_item(
-        Key={'userId': user_id, 'eventId': event_id},
-        UpdateExpression='SET #status = :registered REMOVE #position',
-        ExpressionAttributeNames={'#status': 'status', '#position': 'position'},
-        ExpressionAttributeValues={':registered': 'registered'}
-    )
+    # Seats go to candidates in request order; the rest are waitlisted or rejected
+    seat_shards = claim_seats(event, len(candidates)) if candidates else []
+    registered_ids = candidates[:len(seat_shards)]
+    overflow_ids = candidates[len(seat_shards):]
+    
+    summary = event_summary(event)
+    new_registrations = []
+    for user_id, shard_id in zip(registered_ids, seat_shards):
+        registration_data = build_registration_record(user_id, event_id, summary, 'registered')
+        if shard_id is not None:
+            registration_data['counterShard'] = shard_id
+        new_registrations.append(registration_data)
+    
+    ahead = None
+    if overflow_ids and has_waitlist:
+        waitlist_seqs = allocate_waitlist_seqs(event_id, len(overflow_ids))
+        ahead = count_waitlist_before(event_id, waitlist_seqs[0], inclusive=False)
+        for user_id, waitlist_seq in zip(overflow_ids, waitlist_seqs):
+            new_registrations.append(build_registration_record(user_id, event_id, summary, 'waitlisted', waitlist_seq))
+    else:
+        for user_id in overflow_ids:
+            results[user_id] = ('rejected', None, f"Event is full. Capacity: {event['capacity']}")
+    
+    conflicts = put_new_items(registrations_table, new_registrations, 'attribute_not_exists(userId)')
+    released = 0
+    position = ahead or 0
+    for index, registration_data in enumerate(new_registrations):
+        user_id = registration_data['userId']
+        if index in conflicts:
+            # Registered by another request since the pre-check; give back what was claimed for them
+            results[user_id] = ('rejected', None, registration_conflict_message(deserialize_item(conflicts[index])))
+            if registration_data['status'] == 'registered':
+                decrement_registered_count(event_id, registration_data.get('counterShard'))
+                released += 1
+            else:
+                adjust_waitlist_count(event_id, -1)
+        elif registration_data['status'] == 'registered':
+            results[user_id] = ('registered', None, "Successfully registered for event")
+        else:
+            position += 1
+            results[user_id] = ('waitlisted', position, f"Event is full. Added to waitlist at position {position}")
+    if has_waitlist and (released or ahead == 0):
+        schedule_promotion(event_id, background_tasks)
     
-    # Decrement positions for remaining waitlist entries
+    responses = []
+    for user_id in user_ids:
+        status, position, message = results[user_id]
+        responses.append(RegistrationResponse(
+            userId=user_id,
+            eventId=event_id,
+            status=status,
+            position=position,
+            message=message
+        ))
+    return responses
+
+
+@app.post("/events/{event_id}/register/batch")
+async def batch_register_for_event(event_id: str, request: BatchRegistrationRequest, background_tasks: BackgroundTasks):
+    """Register a list of users for an event, returning a result per user"""
+    try:
+        return await run_blocking(handle_batch_registration, request.userIds, event_id, background_tasks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+PROMOTE_WAITLIST_TASK = 'promote-waitlist'
+PROMOTION_BATCH = 25
+
+
+def first_waitlisted(event_id: str, limit: int):
+    """User ids at the head of an event's waitlist, in sequence order"""
     response = registrations_table.query(
-        IndexName='eventId-index',
+        IndexName=WAITLIST_INDEX,
         KeyConditionExpression=Key('eventId').eq(event_id),
-        FilterExpression=Attr('status').eq('waitlisted')
+        ScanIndexForward=True,
+        Limit=limit
     )
-    
-    for entry in response.get('Items', []):
-        if entry.get('position', 0) > 1:
-            registrations_table.update_item(
-                Key={'userId': entry['userId'], 'eventId': event_id},
-                UpdateExpression='SET #position = #position - :dec',
-                ExpressionAttributeNames={'#position': 'position'},
-                ExpressionAttributeValues={':dec': 1}
-            )
-    
-    return user_id
+    return [item['userId'] for item in response.get('Items', [])]
+
+
+def promotion_update(user_id: str, event_id: str, counter_shard: Optional[int]):
+    """Update that moves a waitlist entry to registered, if it is still waitlisted.
+
+    Remaining positions are derived from the waitlist index, so nothing is renumbered.
+    """
+    update_expr = 'SET #status = :registered REMOVE waitlistSeq'
+    values = {':registered': 'registered'}
+    if counter_shard is not None:
+        # The promoted user takes over the seat's shard
+        update_expr = 'SET #status = :registered, counterShard = :shard REMOVE waitlistSeq'
+        values[':shard'] = counter_shard
+    return {
+        'Key': {'userId': user_id, 'eventId': event_id},
+        'UpdateExpression': update_expr,
+        'ConditionExpression': 'attribute_exists(waitlistSeq)',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': values
+    }
+
+
+def read_held_seats_for(event):
+    """(shard id, held seats) for every counter holding seats for promotion"""
+    if is_sharded(event):
+        return list(read_held_seats(counters_table, event['eventId']).items())
+    held = int(event.get('heldSeats', 0))
+    return [(None, held)] if held > 0 else []
+
+
+def promote_waitlisted_user(user_id: str, event_id: str, counter_shard: Optional[int], from_held: bool):
+    """Promote one waitlisted user in a transaction that also shortens waitlistCount.
+
+    With `from_held` the seat is taken from the counter's held seats;
+    otherwise it has already been claimed. Returns 'promoted', 'gone' when
+    the entry is no longer waitlisted, or 'stopped' when no held seats are
+    left (another worker used them) or the event was deleted.
+    """
+    event_update = {
+        'TableName': events_table.name,
+        'Key': {'eventId': event_id},
+        'UpdateExpression': 'ADD waitlistCount :release, version :one',
+        'ConditionExpression': 'attribute_exists(eventId)',
+        'ExpressionAttributeValues': {':release': -1, ':one': 1}
+    }
+    transact_items = [
+        {'Update': dict(promotion_update(user_id, event_id, counter_shard), TableName=registrations_table.name)}
+    ]
+    if from_held and counter_shard is None:
+        # The event item is the counter; one item can only appear once per transaction
+        event_update['UpdateExpression'] = 'ADD heldSeats :release, waitlistCount :release, version :one'
+        event_update['ConditionExpression'] = 'heldSeats > :zero'
+        event_update['ExpressionAttributeValues'][':zero'] = 0
+    elif from_held:
+        table, key = counter_key(event_id, counter_shard)
+        transact_items.append({'Update': {
+            'TableName': table.name,
+            'Key': key,
+            'UpdateExpression': 'ADD heldSeats :release, version :one',
+            'ConditionExpression': 'heldSeats > :zero',
+            'ExpressionAttributeValues': {':release': -1, ':one': 1, ':zero': 0}
+        }})
+    transact_items.append({'Update': event_update})
+    try:
+        transact_write_items(get_client(), transact_items)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons', [])
+        if any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons[1:]):
+            return 'stopped'
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return 'gone'
+        raise
+    return 'promoted'
 
 
-def handle_unregistration(user_id: str, event_id: str):
-    """Handle unregistration logic with waitlist promotion"""
-    # Check if registration exists
-    registration = get_registration(user_id, event_id)
+def release_held_seats(event_id: str, counter_shard: Optional[int], count: int):
+    """Return held seats nobody is waiting for; False if they changed meanwhile"""
+    table, key = counter_key(event_id, counter_shard)
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression='SET registeredCount = registeredCount - :count ADD heldSeats :release, version :one',
+            ConditionExpression=Attr('heldSeats').gte(count),
+            ExpressionAttributeValues={':count': count, ':release': -count, ':one': 1}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def read_held(event_id: str, counter_shard: Optional[int]):
+    table, key = counter_key(event_id, counter_shard)
+    item = table.get_item(Key=key, ProjectionExpression='heldSeats', ConsistentRead=True).get('Item', {})
+    return int(item.get('heldSeats', 0))
+
+
+def transfer_held_seats(event_id: str, counter_shard: Optional[int], held: int):
+    """Hand held seats to the head of the waitlist, releasing any left over"""
+    promoted = 0
+    while held > 0:
+        waiting = first_waitlisted(event_id, held)
+        if not waiting:
+            if release_held_seats(event_id, counter_shard, held):
+                break
+            held = read_held(event_id, counter_shard)
+            continue
+        for user_id in waiting:
+            outcome = promote_waitlisted_user(user_id, event_id, counter_shard, from_held=True)
+            if outcome == 'stopped':
+                return promoted
+            if outcome == 'promoted':
+                promoted += 1
+                held -= 1
+    return promoted
+
+
+def fill_free_seats(event):
+    """Claim free seats for waitlisted users, e.g. after a capacity increase.
+
+    Seats are claimed before anyone is promoted, so a registration racing
+    for the same seat can never push the event past capacity. Claimed seats
+    left without a taker are given back.
+    """
+    event_id = event['eventId']
+    promoted = 0
+    waiting = first_waitlisted(event_id, PROMOTION_BATCH)
+    while waiting:
+        seats = claim_seats(event, len(waiting))
+        queue = list(waiting)
+        for counter_shard in seats:
+            while queue:
+                outcome = promote_waitlisted_user(queue.pop(0), event_id, counter_shard, from_held=False)
+                if outcome == 'stopped':
+                    return promoted
+                if outcome == 'promoted':
+                    promoted += 1
+                    break
+            else:
+                decrement_registered_count(event_id, counter_shard)
+        if len(seats) < len(waiting):
+            break
+        waiting = first_waitlisted(event_id, PROMOTION_BATCH)
+    return promoted
+
+
+@task_queue.task(PROMOTE_WAITLIST_TASK)
+def promote_waitlist(event_id: str):
+    """Promotion pass for one event; safe to run any number of times.
+
+    Seats freed by unregistrations stay held on their counter until this
+    pass hands them to the head of the waitlist, so the count never drops
+    below the seats in use and newcomers cannot overtake waitlisted users.
+    One pass handles every held seat, which coalesces bursts of
+    unregistrations, and then fills any seats that are simply free.
+    """
+    event = events_table.get_item(Key={'eventId': event_id}, ConsistentRead=True).get('Item')
+    if not event:
+        return 0
+    promoted = 0
+    for counter_shard, held in read_held_seats_for(event):
+        promoted += transfer_held_seats(event_id, counter_shard, held)
+    promoted += fill_free_seats(event)
+    event_cache.invalidate(event_id)
+    return promoted
+
+
+def schedule_promotion(event_id: str, background_tasks: Optional[BackgroundTasks] = None):
+    task_queue.enqueue(PROMOTE_WAITLIST_TASK, {'event_id': event_id}, key=f'{PROMOTE_WAITLIST_TASK}:{event_id}',
+                       background_tasks=background_tasks)
+
+
+def hold_seat(event_id: str, counter_shard: Optional[int] = None):
+    """Keep a freed seat counted until the promotion pass hands it on; False if the counter is gone"""
+    table, key = counter_key(event_id, counter_shard)
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression='ADD heldSeats :one, version :one',
+            ConditionExpression=Attr('eventId').exists(),
+            ExpressionAttributeValues={':one': 1}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    finally:
+        event_cache.invalidate(event_id)
+    return True
+
+
+def handle_unregistration(user_id: str, event_id: str, background_tasks: Optional[BackgroundTasks] = None):
+    """Delete a registration; waitlist promotion happens after the response"""
+    # Delete registration, getting back the deleted row in the same call
+    response = registrations_table.delete_item(
+        Key={'userId': user_id, 'eventId': event_id},
+        ReturnValues='ALL_OLD'
+    )
+    registration = response.get('Attributes')
     if not registration:
         raise HTTPException(status_code=404, detail="Registration not found")
     
-    status = registration.get('status')
-    
-    # Delete registration
-    registrations_table.delete_item(Key={'userId': user_id, 'eventId': event_id})
-    
-    # If user was registered (not waitlisted), decrement count and promote from waitlist
-    if status == 'registered':
-        decrement_registered_count(event_id)
-        
-        # Check if there's a waitlist to promote from
-        promoted_user = promote_from_waitlist(event_id)
-        
-        if promoted_user:
-            # Increment count for promoted user
-            increment_registered_count(event_id)
-            return {
-                "message": "Successfully unregistered from event",
-                "promoted_user": promoted_user
-            }
+    if registration.get('status') == 'registered':
+        counter_shard = registration.get('counterShard')
+        if counter_shard is not None:
+            counter_shard = int(counter_shard)
+        try:
+            event = get_event_or_404(event_id)
+        except HTTPException:
+            # The event was deleted; its counters go with it
+            return {"message": "Successfully unregistered from event"}
+        if event.get('hasWaitlist', False):
+            # False when another container deleted the event since it was cached
+            if hold_seat(event_id, counter_shard):
+                schedule_promotion(event_id, background_tasks)
+            else:
+                forget_event(event_id)
+        elif not decrement_registered_count(event_id, counter_shard):
+            forget_event(event_id)
+    elif registration.get('status') == 'waitlisted':
+        adjust_waitlist_count(event_id, -1)
     
     return {"message": "Successfully unregistered from event"}
 
 
 @app.delete("/events/{event_id}/register/{user_id}")
-def unregister_from_event(event_id: str, user_id: str):
+async def unregister_from_event(event_id: str, user_id: str, background_tasks: BackgroundTasks):
     """Unregister a user from an event"""
     try:
-        result = handle_unregistration(user_id, event_id)
+        result = await run_blocking(handle_unregistration, user_id, event_id, background_tasks)
         return result
     except HTTPException:
         raise
@@ -439,31 +1907,35 @@ def unregister_from_event(event_id: str, user_id: str):
 
 # Query Endpoints
 @app.get("/users/{user_id}/registrations")
-def get_user_registrations(user_id: str):
+async def get_user_registrations(
+    user_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated event attributes to return")
+):
     """Get all events a user is registered for"""
     try:
-        # Verify user exists
-        get_user_or_404(user_id)
-        
-        # Query registrations for user with status="registered"
-        response = registrations_table.query(
-            KeyConditionExpression=Key('userId').eq(user_id),
-            FilterExpression=Attr('status').eq('registered')
+        fields = fields_or_400(fields)
+        # Verify user exists while querying registrations for user with status="registered"
+        _, registrations = await asyncio.gather(
+            run_blocking(get_user_or_404, user_id),
+            run_blocking(
+                read_all,
+                registrations_table.query,
+                KeyConditionExpression=Key('userId').eq(user_id),
+                FilterExpression=Attr('status').eq('registered')
+            )
         )
         
-        registrations = response.get('Items', [])
-        
-        # Fetch event details for each registration
-        events = []
-        for reg in registrations:
-            event_response = events_table.get_item(Key={'eventId': reg['eventId']})
-            if 'Item' in event_response:
-                events.append(event_response['Item'])
+        # Fetch event details for all registrations in batches
+        hydrated = await run_blocking(
+            batch_get_items, events_table, [{'eventId': reg['eventId']} for reg in registrations],
+            **projection_args(fields, required=('eventId', 'date'))
+        )
+        events = [event for event in hydrated if event]
         
         # Sort by date
         events.sort(key=lambda x: x.get('date', ''))
         
-        return events
+        return FastJSONResponse([select_fields(public_event(event), fields) for event in events])
     except HTTPException:
         raise
     except Exception as e:
@@ -471,30 +1943,85 @@ def get_user_registrations(user_id: str):
 
 
 @app.get("/users/{user_id}/waitlist")
-def get_user_waitlist(user_id: str):
+async def get_user_waitlist(
+    user_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated event attributes to return")
+):
     """Get all events a user is waitlisted for"""
     try:
-        # Verify user exists
-        get_user_or_404(user_id)
-        
-        # Query registrations for user with status="waitlisted"
-        response = registrations_table.query(
-            KeyConditionExpression=Key('userId').eq(user_id),
-            FilterExpression=Attr('status').eq('waitlisted')
+        fields = fields_or_400(fields)
+        # Verify user exists while querying registrations for user with status="waitlisted"
+        _, waitlist_entries = await asyncio.gather(
+            run_blocking(get_user_or_404, user_id),
+            run_blocking(
+                read_all,
+                registrations_table.query,
+                KeyConditionExpression=Key('userId').eq(user_id),
+                FilterExpression=Attr('status').eq('waitlisted')
+            )
         )
         
-        waitlist_entries = response.get('Items', [])
-        
-        # Fetch event details and include position
+        # Fetch event details in batches while deriving each waitlist position
+        events, *positions = await asyncio.gather(
+            run_blocking(
+                batch_get_items, events_table, [{'eventId': entry['eventId']} for entry in waitlist_entries],
+                **projection_args(fields, required=('eventId',))
+            ),
+            *(run_blocking(waitlist_entry_position, entry) for entry in waitlist_entries)
+        )
         results = []
-        for entry in waitlist_entries:
-            event_response = events_table.get_item(Key={'eventId': entry['eventId']})
-            if 'Item' in event_response:
-                event_data = event_response['Item']
-                event_data['waitlistPosition'] = entry.get('position')
+        for position, event in zip(positions, events):
+            if event:
+                event_data = select_fields(public_event(event), fields)
+                event_data['waitlistPosition'] = position
                 results.append(event_data)
         
-        return results
+        return FastJSONResponse(results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/users/{user_id}/dashboard")
+async def get_user_dashboard(user_id: str):
+    """Registrations and waitlist entries for a user, sorted by event date.
+
+    Served from one query of the user's partition using the event snapshot on
+    each registration; only rows written before snapshots existed fall back
+    to reading their events. Waitlist positions are not included (see
+    /users/{user_id}/waitlist).
+    """
+    try:
+        # Verify user exists while querying all of the user's registrations
+        _, rows = await asyncio.gather(
+            run_blocking(get_user_or_404, user_id),
+            run_blocking(read_all, registrations_table.query, KeyConditionExpression=Key('userId').eq(user_id))
+        )
+        
+        summaries = {}
+        legacy_ids = [row['eventId'] for row in rows if 'eventSummary' not in row]
+        if legacy_ids:
+            events = await run_blocking(batch_get_items, events_table, [{'eventId': event_id} for event_id in legacy_ids])
+            summaries = {event['eventId']: event_summary(event) for event in events if event}
+        
+        dashboard = {'registrations': [], 'waitlist': []}
+        for row in rows:
+            summary = row.get('eventSummary') or summaries.get(row['eventId'])
+            if summary is None:
+                # Event no longer exists
+                continue
+            entry = {
+                'eventId': row['eventId'],
+                'status': row.get('status'),
+                'registeredAt': row.get('registeredAt'),
+                'event': {field: summary[field] for field in SUMMARY_FIELDS if field in summary}
+            }
+            dashboard['waitlist' if row.get('status') == 'waitlisted' else 'registrations'].append(entry)
+        
+        for entries in dashboard.values():
+            entries.sort(key=lambda entry: entry['event'].get('date', ''))
+        return FastJSONResponse(dashboard)
     except HTTPException:
         raise
     except Exception as e:
@@ -502,29 +2029,47 @@ def get_user_waitlist(user_id: str):
 
 
 @app.get("/events/{event_id}/registrations")
-def get_event_registrations(event_id: str):
-    """Get all users registered for an event"""
+async def get_event_registrations(
+    event_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated user attributes to return"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get all users registered for an event.
+
+    The ETag is a digest of the page itself: the roster comes from the
+    eventually consistent eventId-index, which can lag behind the event's
+    version, so a version-based tag could label a stale page as current.
+    """
     try:
-        # Verify event exists
-        get_event_or_404(event_id)
+        fields = fields_or_400(fields)
         
-        # Query registrations for event with status="registered"
-        response = registrations_table.query(
-            IndexName='eventId-index',
-            KeyConditionExpression=Key('eventId').eq(event_id),
-            FilterExpression=Attr('status').eq('registered')
+        # Verify event exists while querying registrations for event with status="registered"
+        _, (registrations, next_cursor) = await asyncio.gather(
+            run_blocking(get_event_or_404, event_id),
+            run_blocking(
+                read_rows, registrations_table.query, limit, cursor,
+                {'userId': None, 'eventId': event_id},
+                IndexName='eventId-index',
+                KeyConditionExpression=Key('eventId').eq(event_id),
+                FilterExpression=Attr('status').eq('registered')
+            )
         )
         
-        registrations = response.get('Items', [])
-        
-        # Fetch user details for each registration
-        users = []
-        for reg in registrations:
-            user_response = users_table.get_item(Key={'userId': reg['userId']})
-            if 'Item' in user_response:
-                users.append(user_response['Item'])
+        # Fetch user details for all registrations in batches
+        hydrated = await run_blocking(
+            batch_get_items, users_table, [{'userId': reg['userId']} for reg in registrations],
+            **projection_args(fields, required=('userId',))
+        )
+        users = [select_fields(user, fields) for user in hydrated if user]
         
-        return users
+        response = FastJSONResponse(page_result(users, limit, cursor, next_cursor))
+        etag = body_etag(response.body)
+        if if_none_match and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers['ETag'] = etag
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -532,35 +2077,95 @@ def get_event_registrations(event_id: str):
 
 
 @app.get("/events/{event_id}/waitlist")
-def get_event_waitlist(event_id: str):
+async def get_event_waitlist(
+    event_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated user attributes to return")
+):
     """Get all users on waitlist for an event"""
     try:
-        # Verify event exists
-        get_event_or_404(event_id)
-        
-        # Query registrations for event with status="waitlisted"
-        response = registrations_table.query(
-            IndexName='eventId-index',
-            KeyConditionExpression=Key('eventId').eq(event_id),
-            FilterExpression=Attr('status').eq('waitlisted')
+        fields = fields_or_400(fields)
+        # Verify event exists while querying the waitlist index, which returns entries in waitlist order
+        _, (waitlist_entries, next_cursor) = await asyncio.gather(
+            run_blocking(get_event_or_404, event_id),
+            run_blocking(
+                read_rows, registrations_table.query, limit, cursor,
+                {'userId': None, 'eventId': event_id, 'waitlistSeq': None},
+                IndexName=WAITLIST_INDEX,
+                KeyConditionExpression=Key('eventId').eq(event_id)
+            )
         )
         
-        waitlist_entries = response.get('Items', [])
-        
-        # Fetch user details and include position
+        # Fetch user details in batches. Positions are derived from order;
+        # later pages count the entries ahead of them at the same time.
+        lookups = [run_blocking(
+            batch_get_items, users_table, [{'userId': entry['userId']} for entry in waitlist_entries],
+            **projection_args(fields, required=('userId',))
+        )]
+        if cursor and waitlist_entries:
+            lookups.append(run_blocking(
+                count_waitlist_before, event_id, waitlist_entries[0]['waitlistSeq'], inclusive=False
+            ))
+        users, *offsets = await asyncio.gather(*lookups)
+        offset = offsets[0] if offsets else 0
         results = []
-        for entry in waitlist_entries:
-            user_response = users_table.get_item(Key={'userId': entry['userId']})
-            if 'Item' in user_response:
-                user_data = user_response['Item']
-                user_data['waitlistPosition'] = entry.get('position')
+        for position, user in enumerate(users, start=offset + 1):
+            if user:
+                user_data = select_fields(user, fields)
+                user_data['waitlistPosition'] = position
                 results.append(user_data)
         
-        # Sort by position
-        results.sort(key=lambda x: x.get('waitlistPosition', 0))
-        
-        return results
+        return FastJSONResponse(page_result(results, limit, cursor, next_cursor))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# Job Endpoints
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of a background job"""
+    try:
+        job = await run_blocking(job_store.get, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Debug Endpoints
+@app.get("/debug/cache")
+async def get_cache_stats():
+    """Hit/miss counters for the in-process item caches"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"events": event_cache.stats(), "users": user_cache.stats(), "eventSummaries": summary_cache.stats(),
+            "shardLayouts": shard_layout_cache.stats(), "availability": availability_cache.stats(),
+            "idempotencyKeys": idempotency.cache.stats(), "searchIndex": search_index.stats()}
+
+
+@app.get("/debug/metrics")
+async def get_route_metrics():
+    """DynamoDB calls, latency and consumed capacity aggregated per route"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return route_stats.snapshot()
+
+
+@app.get("/debug/latency")
+async def get_call_latency():
+    """Per-operation DynamoDB call latency histograms, retry and hedging counts, and the client tuning"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    hedger = get_hedger()
+    return {
+        "calls": call_latency.snapshot(),
+        "retries": retry_stats.snapshot(),
+        "hedging": hedger.stats() if hedger is not None else None,
+        "client": client_settings(),
+    }
@@ -0,0 +1,640 @@
+"""In-memory storage engine, selected with STORAGE_ENGINE=memory.
+
+Implements the part of boto3's DynamoDB Table and client interface this
+service uses (get/put/update/delete item, query on the key or a GSI, scan,
+transactions and batch calls) on plain Python dicts, so the request path can
+be profiled, and a local uvicorn load-tested, without a network-bound
+DynamoDB. Data lives in the process and is lost when it exits.
+
+Each table keeps its items by primary key plus sorted partitions for the
+table key and for every GSI, so a query bisects into one partition instead
+of filtering the table; GSIs are sparse like DynamoDB's. A single lock per
+engine makes conditional writes, ADD counters and transactions atomic.
+Failures are botocore ClientErrors with DynamoDB's error codes, including
+ALL_OLD items on failed conditions and transaction cancellation reasons,
+and calls are recorded in the request metrics like DynamoDB calls (without
+consumed capacity).
+
+Table layouts must match BackendStack; tables are looked up by name.
+"""
+import bisect
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+from expressions import (
+    MISSING, ExpressionError, apply_update, build_condition, check_placeholders, compare, copy_value,
+    evaluate_condition, parse_condition, project, to_item_value, updated_attributes, value_type
+)
+from metrics import record_call
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+TRANSACTION_LIMIT = 100
+# Scan segments split the 32-bit hash space of partition keys into equal ranges
+HASH_SPACE = 2 ** 32
+
+_serializer = TypeSerializer()
+
+
+class IndexSchema:
+    """Key attributes, as (name, type) pairs, of a table or GSI"""
+
+    def __init__(self, hash_key, range_key=None, keys_only: bool = False):
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.keys_only = keys_only
+
+    @property
+    def key_names(self):
+        return (self.hash_key[0],) + ((self.range_key[0],) if self.range_key else ())
+
+
+class TableSchema(IndexSchema):
+    def __init__(self, hash_key, range_key=None, indexes=None):
+        super().__init__(hash_key, range_key)
+        self.indexes = indexes or {}
+
+
+TABLE_SCHEMAS = {
+    'Events': TableSchema(('eventId', 'S'), indexes={
+        'status-date-index': IndexSchema(('status', 'S'), ('date', 'S')),
+    }),
+    'Users': TableSchema(('userId', 'S')),
+    'Registrations': TableSchema(('userId', 'S'), ('eventId', 'S'), indexes={
+        'eventId-index': IndexSchema(('eventId', 'S'), ('userId', 'S')),
+        'eventId-waitlistSeq-index': IndexSchema(('eventId', 'S'), ('waitlistSeq', 'N'), keys_only=True),
+    }),
+    'EventCounters': TableSchema(('eventId', 'S'), ('shardId', 'N')),
+    'SearchIndex': TableSchema(('eventId', 'S'), indexes={
+        'seq-index': IndexSchema(('indexShard', 'S'), ('seq', 'N')),
+    }),
+    'IdempotencyKeys': TableSchema(('idempotencyKey', 'S')),
+    'Jobs': TableSchema(('jobId', 'S')),
+}
+
+
+def client_error(code: str, message: str, operation: str, **extra):
+    return ClientError(
+        dict(extra, Error={'Code': code, 'Message': message}, ResponseMetadata={'HTTPStatusCode': 400}),
+        operation
+    )
+
+
+def serialize_item(item):
+    """Low-level form of an item, as DynamoDB returns it on errors"""
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def _check_key_value(name: str, expected: str, value, index_name=None):
+    if value_type(value) != expected:
+        where = f" IndexName: {index_name}" if index_name else ""
+        raise ExpressionError(
+            f"One or more parameter values were invalid: Type mismatch for key {name} "
+            f"expected: {expected} actual: {value_type(value)}{where}"
+        )
+    if value == '':
+        raise ExpressionError(f"One or more parameter values are not valid. The AttributeValue for a key attribute "
+                              f"cannot contain an empty string value. Key: {name}")
+
+
+class Partitions:
+    """Partition key value -> [(sort key value, primary key)] kept sorted, for a table or one GSI"""
+
+    def __init__(self, schema: IndexSchema, name=None):
+        self.schema = schema
+        self.name = name
+        self.partitions = {}
+
+    def entry(self, item, primary_key):
+        """(partition value, sort entry) of an item, or None if it lacks the keys (sparse GSI)"""
+        hash_name, hash_type = self.schema.hash_key
+        hash_value = item.get(hash_name)
+        if hash_value is None:
+            return None
+        _check_key_value(hash_name, hash_type, hash_value, self.name)
+        range_value = None
+        if self.schema.range_key:
+            range_name, range_type = self.schema.range_key
+            range_value = item.get(range_name)
+            if range_value is None:
+                return None
+            _check_key_value(range_name, range_type, range_value, self.name)
+        return hash_value, (range_value, primary_key)
+
+    def add(self, item, primary_key):
+        entry = self.entry(item, primary_key)
+        if entry is not None:
+            bisect.insort(self.partitions.setdefault(entry[0], []), entry[1])
+
+    def remove(self, item, primary_key):
+        entry = self.entry(item, primary_key)
+        if entry is None:
+            return
+        entries = self.partitions[entry[0]]
+        del entries[bisect.bisect_left(entries, entry[1])]
+        if not entries:
+            del self.partitions[entry[0]]
+
+
+class MemoryTable:
+    """One table with boto3 Table's method signatures"""
+
+    def __init__(self, name: str, schema: TableSchema, engine):
+        self.name = name
+        self.schema = schema
+        self.engine = engine
+        self.meta = SimpleNamespace(client=engine.client)
+        self.items = {}
+        self.primary = Partitions(schema)
+        self.indexes = {index_name: Partitions(index, index_name) for index_name, index in schema.indexes.items()}
+        # (partition key hash, primary key) of every item, in scan order
+        self._scan_order = []
+
+    # Keys and storage
+
+    def _primary_key(self, key):
+        """Primary key tuple of a Key argument, which must hold exactly the key attributes"""
+        if set(key) != set(self.schema.key_names):
+            raise ExpressionError("The provided key element does not match the schema")
+        return self._item_key(key)
+
+    def _item_key(self, item):
+        values = []
+        for name, expected in filter(None, (self.schema.hash_key, self.schema.range_key)):
+            if name not in item:
+                raise ExpressionError(f"One or more parameter values were invalid: Missing the key {name} in the item")
+            _check_key_value(name, expected, item[name])
+            values.append(item[name])
+        return tuple(values)
+
+    def _key_attributes(self, item, index_name=None):
+        names = list(self.schema.key_names)
+        if index_name is not None:
+            names.extend(name for name in self.schema.indexes[index_name].key_names if name not in names)
+        return {name: item[name] for name in names}
+
+    def _scan_entry(self, primary_key):
+        return zlib.crc32(str(primary_key[0]).encode()), primary_key
+
+    def _store(self, primary_key, item):
+        old = self.items.get(primary_key)
+        # Check the new item against every index before changing anything
+        for partitions in self.indexes.values():
+            partitions.entry(item, primary_key)
+        if old is not None:
+            for partitions in self.indexes.values():
+                partitions.remove(old, primary_key)
+        else:
+            self.primary.add(item, primary_key)
+            bisect.insort(self._scan_order, self._scan_entry(primary_key))
+        self.items[primary_key] = item
+        for partitions in self.indexes.values():
+            partitions.add(item, primary_key)
+
+    def _delete(self, primary_key):
+        old = self.items.pop(primary_key, None)
+        if old is None:
+            return
+        self.primary.remove(old, primary_key)
+        for partitions in self.indexes.values():
+            partitions.remove(old, primary_key)
+        del self._scan_order[bisect.bisect_left(self._scan_order, self._scan_entry(primary_key))]
+
+    # Writes are prepared (conditions checked, new item built) and then
+    # committed, so transactions can check every action before applying any
+
+    def _condition_holds(self, old, params):
+        condition = params.get('ConditionExpression')
+        if condition is None:
+            return True
+        expression, names, values = build_condition(
+            condition, params.get('ExpressionAttributeNames'), to_item_value(params.get('ExpressionAttributeValues'))
+        )
+        return evaluate_condition(parse_condition(expression, names), old or {}, values)
+
+    def prepare(self, action: str, params):
+        """(primary key, old item, new item, None to delete or MISSING to keep, condition held)"""
+        check_placeholders(params)
+        if action == 'Put':
+            item = to_item_value(params['Item'])
+            primary_key = self._item_key(item)
+        else:
+            primary_key = self._primary_key(to_item_value(params['Key']))
+        old = self.items.get(primary_key)
+        held = self._condition_holds(old, params)
+        if action == 'Put':
+            return primary_key, old, item, held
+        if action == 'Delete':
+            return primary_key, old, None, held
+        if action == 'ConditionCheck' or not held:
+            # DynamoDB checks the condition before evaluating the update
+            return primary_key, old, MISSING, held
+        base = old if old is not None else dict(zip(self.schema.key_names, primary_key))
+        new, _ = apply_update(
+            base, params['UpdateExpression'], params.get('ExpressionAttributeNames'),
+            to_item_value(params.get('ExpressionAttributeValues')), self.schema.key_names
+        )
+        return primary_key, old, new, held
+
+    def commit(self, primary_key, new):
+        if new is None:
+            self._delete(primary_key)
+        elif new is not MISSING:
+            self._store(primary_key, new)
+
+    def _write(self, operation: str, action: str, params):
+        primary_key, old, new, held = self.prepare(action, params)
+        if not held:
+            extra = {}
+            if params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and old is not None:
+                extra['Item'] = serialize_item(old)
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation, **extra)
+        self.commit(primary_key, new)
+        return old, new
+
+    def put_item(self, **params):
+        def put():
+            old, _ = self._write('PutItem', 'Put', params)
+            return {'Attributes': copy_value(old)} if params.get('ReturnValues') == 'ALL_OLD' and old else {}
+        return self.engine.run('PutItem', put)
+
+    def delete_item(self, **params):
+        def delete():
+            old, _ = self._write('DeleteItem', 'Delete', params)
+            return {'Attributes': copy_value(old)} if params.get('ReturnValues') == 'ALL_OLD' and old else {}
+        return self.engine.run('DeleteItem', delete)
+
+    def update_item(self, **params):
+        def update():
+            old, new = self._write('UpdateItem', 'Update', params)
+            return_values = params.get('ReturnValues', 'NONE')
+            if return_values == 'ALL_NEW':
+                return {'Attributes': copy_value(new)}
+            if return_values == 'ALL_OLD':
+                return {'Attributes': copy_value(old)} if old else {}
+            if return_values in ('UPDATED_NEW', 'UPDATED_OLD'):
+                updated = updated_attributes(params['UpdateExpression'], params.get('ExpressionAttributeNames'))
+                source = new if return_values == 'UPDATED_NEW' else (old or {})
+                attributes = {name: copy_value(source[name]) for name in updated if name in source}
+                return {'Attributes': attributes} if attributes else {}
+            return {}
+        return self.engine.run('UpdateItem', update)
+
+    # Reads
+
+    def _output(self, item, params, index_name=None):
+        if index_name is not None and self.schema.indexes[index_name].keys_only:
+            item = self._key_attributes(item, index_name)
+        if params.get('ProjectionExpression'):
+            return project(item, params['ProjectionExpression'], params.get('ExpressionAttributeNames'))
+        return copy_value(item)
+
+    def get_item(self, **params):
+        def get():
+            check_placeholders(params)
+            item = self.items.get(self._primary_key(to_item_value(params['Key'])))
+            return {'Item': self._output(item, params)} if item is not None else {}
+        return self.engine.run('GetItem', get)
+
+    def query(self, **params):
+        return self.engine.run('Query', lambda: self._query(params))
+
+    def scan(self, **params):
+        return self.engine.run('Scan', lambda: self._scan(params))
+
+    def _key_range(self, params, schema: IndexSchema):
+        """Partition value and a predicate on sort key values from a KeyConditionExpression"""
+        expression, names, values = build_condition(
+            params['KeyConditionExpression'], params.get('ExpressionAttributeNames'),
+            to_item_value(params.get('ExpressionAttributeValues')), is_key_condition=True
+        )
+        node = parse_condition(expression, names)
+        conditions = []
+        while node[0] == 'and':
+            conditions.append(node[2])
+            node = node[1]
+        conditions.append(node)
+
+        hash_value = MISSING
+        range_conditions = []
+        for condition in conditions:
+            operand = condition[2] if condition[0] == 'compare' else condition[1] if condition[0] == 'between' \
+                else condition[2][0] if condition[0] == 'function' else None
+            name = operand[1][0] if operand and operand[0] == 'path' and len(operand[1]) == 1 else None
+            if name == schema.hash_key[0] and condition[0] == 'compare' and condition[1] == '=':
+                hash_value = values.get(condition[3][1], MISSING) if condition[3][0] == 'value' else MISSING
+            elif schema.range_key and name == schema.range_key[0] and (
+                    condition[0] == 'between' or (condition[0] == 'compare' and condition[1] != '<>')
+                    or (condition[0] == 'function' and condition[1] == 'begins_with')):
+                range_conditions.append(condition)
+            else:
+                raise ExpressionError("Query key condition not supported")
+        if hash_value is MISSING or len(range_conditions) > 1:
+            raise ExpressionError("Query condition missed key schema element")
+        if not range_conditions:
+            return hash_value, None, None
+
+        condition = range_conditions[0]
+        range_name = schema.range_key[0]
+
+        def matches(range_value):
+            return evaluate_condition(condition, {range_name: range_value}, values)
+
+        # The lowest sort key that can match, to bisect to
+        low = None
+        if condition[0] == 'between':
+            low = values.get(condition[2][1])
+        elif condition[0] == 'function' or condition[1] in ('=', '>', '>='):
+            low = values.get(condition[3][1] if condition[0] == 'compare' else condition[2][1][1])
+        return hash_value, matches, low
+
+    def _query(self, params):
+        check_placeholders(params)
+        index_name = params.get('IndexName')
+        if index_name is None:
+            schema, partitions = self.schema, self.primary
+        elif index_name in self.indexes:
+            schema, partitions = self.schema.indexes[index_name], self.indexes[index_name]
+            if params.get('ConsistentRead'):
+                raise ExpressionError("Consistent reads are not supported on global secondary indexes")
+        else:
+            raise ExpressionError(f"The table does not have the specified index: {index_name}")
+
+        hash_value, range_matches, low = self._key_range(params, schema)
+        entries = partitions.partitions.get(hash_value, [])
+        forward = params.get('ScanIndexForward', True)
+        start_key = params.get('ExclusiveStartKey')
+        if start_key is not None:
+            start_key = to_item_value(start_key)
+            range_value = start_key.get(schema.range_key[0]) if schema.range_key else None
+            start = (range_value, self._item_key(start_key))
+            position = bisect.bisect_right(entries, start) if forward else bisect.bisect_left(entries, start) - 1
+        elif forward:
+            position = bisect.bisect_left(entries, (low,)) if low is not None and range_matches else 0
+        else:
+            position = len(entries) - 1
+
+        def candidates(position):
+            step = 1 if forward else -1
+            matched = False
+            while 0 <= position < len(entries):
+                range_value, primary_key = entries[position]
+                if range_matches is None or range_matches(range_value):
+                    matched = True
+                    yield self.items[primary_key]
+                elif matched or (forward and low is not None and compare('>', range_value, low)):
+                    # Matching sort keys are contiguous, so nothing further can match
+                    return
+                position += step
+
+        return self._page(candidates(position), params, index_name)
+
+    def _scan(self, params):
+        check_placeholders(params)
+        index_name = params.get('IndexName')
+        if index_name is not None and index_name not in self.indexes:
+            raise ExpressionError(f"The table does not have the specified index: {index_name}")
+        segment, total_segments = params.get('Segment'), params.get('TotalSegments')
+        if (segment is None) != (total_segments is None) or (
+                total_segments is not None and not 0 <= segment < total_segments):
+            raise ExpressionError("Segment must be given with TotalSegments and be less than it")
+
+        low, high = 0, HASH_SPACE
+        if total_segments is not None:
+            low = -(-segment * HASH_SPACE // total_segments)
+            high = -(-(segment + 1) * HASH_SPACE // total_segments)
+        start_key = params.get('ExclusiveStartKey')
+        if start_key is not None:
+            position = bisect.bisect_right(self._scan_order, self._scan_entry(self._item_key(to_item_value(start_key))))
+        else:
+            position = bisect.bisect_left(self._scan_order, (low,))
+
+        def candidates(position):
+            while position < len(self._scan_order):
+                key_hash, primary_key = self._scan_order[position]
+                if key_hash >= high:
+                    return
+                item = self.items[primary_key]
+                if index_name is None or self.indexes[index_name].entry(item, primary_key) is not None:
+                    yield item
+                position += 1
+
+        return self._page(candidates(position), params, index_name)
+
+    def _page(self, candidates, params, index_name):
+        """Query/Scan response from candidate items in order, applying Limit, filter and projection"""
+        limit = params.get('Limit')
+        if limit is not None and limit < 1:
+            raise ExpressionError("Limit must be greater than or equal to 1")
+        filter_node = values = None
+        if params.get('FilterExpression') is not None:
+            expression, names, values = build_condition(
+                params['FilterExpression'], params.get('ExpressionAttributeNames'),
+                to_item_value(params.get('ExpressionAttributeValues'))
+            )
+            filter_node = parse_condition(expression, names)
+        count_only = params.get('Select') == 'COUNT'
+
+        items = []
+        count = scanned = 0
+        last_scanned = last = None
+        for item in candidates:
+            if limit is not None and scanned == limit:
+                # More candidates remain after a full page; resume after the last one scanned
+                last = self._key_attributes(last_scanned, index_name)
+                break
+            scanned += 1
+            last_scanned = item
+            if index_name is not None and self.schema.indexes[index_name].keys_only:
+                item = self._key_attributes(item, index_name)
+            if filter_node is not None and not evaluate_condition(filter_node, item, values):
+                continue
+            count += 1
+            if not count_only:
+                items.append(self._output(item, params))
+        response = {'Count': count, 'ScannedCount': scanned}
+        if not count_only:
+            response['Items'] = items
+        if last is not None:
+            response['LastEvaluatedKey'] = copy_value(last)
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return BatchWriter(self)
+
+    def clear(self):
+        self.items.clear()
+        self.primary.partitions.clear()
+        for partitions in self.indexes.values():
+            partitions.partitions.clear()
+        self._scan_order.clear()
+
+
+class BatchWriter:
+    """Buffers puts and deletes into BatchWriteItem calls, like boto3's batch_writer"""
+
+    def __init__(self, table: MemoryTable):
+        self.table = table
+        self.requests = []
+
+    def put_item(self, Item):
+        self.requests.append({'PutRequest': {'Item': Item}})
+        if len(self.requests) >= BATCH_WRITE_LIMIT:
+            self.flush()
+
+    def delete_item(self, Key):
+        self.requests.append({'DeleteRequest': {'Key': Key}})
+        if len(self.requests) >= BATCH_WRITE_LIMIT:
+            self.flush()
+
+    def flush(self):
+        if self.requests:
+            self.table.meta.client.batch_write_item(RequestItems={self.table.name: self.requests})
+            self.requests = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class MemoryClient:
+    """The low-level client calls this service makes, with the resource client's Python types"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def transact_write_items(self, TransactItems, **params):
+        def transact():
+            if not 0 < len(TransactItems) <= TRANSACTION_LIMIT:
+                raise ExpressionError(f"Member must have length less than or equal to {TRANSACTION_LIMIT}")
+            prepared = []
+            seen = set()
+            for entry in TransactItems:
+                (action, action_params), = entry.items()
+                table = self.engine.get_table(action_params['TableName'])
+                primary_key, old, new, held = table.prepare(action, action_params)
+                if (table.name, primary_key) in seen:
+                    raise ExpressionError("Transaction request cannot include multiple operations on one item")
+                seen.add((table.name, primary_key))
+                prepared.append((table, primary_key, old, new, held, action_params))
+
+            if all(held for _, _, _, _, held, _ in prepared):
+                for table, primary_key, _, new, _, _ in prepared:
+                    table.commit(primary_key, new)
+                return {}
+            reasons = []
+            for _, _, old, _, held, action_params in prepared:
+                if held:
+                    reasons.append({'Code': 'None'})
+                    continue
+                reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                if action_params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and old is not None:
+                    reason['Item'] = serialize_item(old)
+                reasons.append(reason)
+            codes = ', '.join(reason['Code'] for reason in reasons)
+            raise client_error(
+                'TransactionCanceledException',
+                f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                'TransactWriteItems', CancellationReasons=reasons
+            )
+        return self.engine.run('TransactWriteItems', transact)
+
+    def batch_get_item(self, RequestItems, **params):
+        def batch_get():
+            if sum(len(request['Keys']) for request in RequestItems.values()) > BATCH_GET_LIMIT:
+                raise ExpressionError(f"Too many items requested for the BatchGetItem call (limit {BATCH_GET_LIMIT})")
+            responses = {}
+            for table_name, request in RequestItems.items():
+                table = self.engine.get_table(table_name)
+                check_placeholders(request)
+                primary_keys = [table._primary_key(to_item_value(key)) for key in request['Keys']]
+                if len(set(primary_keys)) != len(primary_keys):
+                    raise ExpressionError("Provided list of item keys contains duplicates")
+                responses[table_name] = [
+                    table._output(table.items[primary_key], request)
+                    for primary_key in primary_keys if primary_key in table.items
+                ]
+            return {'Responses': responses, 'UnprocessedKeys': {}}
+        return self.engine.run('BatchGetItem', batch_get)
+
+    def batch_write_item(self, RequestItems, **params):
+        def batch_write():
+            if sum(len(requests) for requests in RequestItems.values()) > BATCH_WRITE_LIMIT:
+                raise ExpressionError(f"Too many items requested for the BatchWriteItem call (limit {BATCH_WRITE_LIMIT})")
+            prepared = []
+            for table_name, requests in RequestItems.items():
+                table = self.engine.get_table(table_name)
+                seen = set()
+                for request in requests:
+                    if 'PutRequest' in request:
+                        primary_key, _, new, _ = table.prepare('Put', request['PutRequest'])
+                    else:
+                        primary_key, _, new, _ = table.prepare('Delete', request['DeleteRequest'])
+                    if primary_key in seen:
+                        raise ExpressionError("Provided list of item keys contains duplicates")
+                    seen.add(primary_key)
+                    prepared.append((table, primary_key, new))
+            for table, primary_key, new in prepared:
+                table.commit(primary_key, new)
+            return {'UnprocessedItems': {}}
+        return self.engine.run('BatchWriteItem', batch_write)
+
+    def describe_table(self, TableName):
+        def describe():
+            table = self.engine.get_table(TableName)
+            # No size is reported, so parallel_scan keeps one sequential scan;
+            # extra segment threads would only wait on the engine lock
+            return {'Table': {
+                'TableName': table.name,
+                'TableStatus': 'ACTIVE',
+                'ItemCount': len(table.items),
+                'TableSizeBytes': 0,
+                'KeySchema': [{'AttributeName': name, 'KeyType': key_type}
+                              for name, key_type in zip(table.schema.key_names, ('HASH', 'RANGE'))],
+            }}
+        return self.engine.run('DescribeTable', describe)
+
+
+class MemoryEngine:
+    """Tables held in process memory; see db.StorageEngine for the interface"""
+
+    def __init__(self, schemas=None):
+        self._lock = threading.RLock()
+        self.client = MemoryClient(self)
+        self.tables = {
+            name: MemoryTable(name, schema, self) for name, schema in (schemas or TABLE_SCHEMAS).items()
+        }
+
+    def get_table(self, name: str):
+        table = self.tables.get(name)
+        if table is None:
+            raise client_error('ResourceNotFoundException', f"Requested resource not found: Table: {name} not found",
+                               'DescribeTable')
+        return table
+
+    def get_client(self):
+        return self.client
+
+    def run(self, operation: str, func):
+        """Run one call under the engine lock, recording it like a DynamoDB call"""
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                return func()
+        except ExpressionError as e:
+            raise client_error('ValidationException', str(e), operation) from None
+        finally:
+            record_call(operation, (time.perf_counter() - started) * 1000)
+
+    def reset(self):
+        """Drop every item"""
+        with self._lock:
+            for table in self.tables.values():
+                table.clear()
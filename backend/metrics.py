@@ -0,0 +1,296 @@
+"""Per-request DynamoDB instrumentation.
+
+botocore event hooks on the shared DynamoDB client record the call count,
+latency and consumed capacity of every operation (table calls as well as
+batch and transaction calls) against the request that is currently being
+served. The HTTP middleware in main.py turns the result into a
+Server-Timing header, an EMF log line and per-route aggregates. Every
+call's latency also goes into a process-wide histogram per operation.
+"""
+import bisect
+import contextvars
+import json
+import math
+import threading
+import time
+
+METRICS_NAMESPACE = 'EventsApi'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """DynamoDB calls made while serving one request, grouped by operation"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, latency_ms: float, read_units: float, write_units: float):
+        with self._lock:
+            stats = self.operations.setdefault(operation, {'calls': 0, 'ms': 0.0, 'rcu': 0.0, 'wcu': 0.0})
+            stats['calls'] += 1
+            stats['ms'] += latency_ms
+            stats['rcu'] += read_units
+            stats['wcu'] += write_units
+
+    def totals(self):
+        with self._lock:
+            return {
+                'calls': sum(s['calls'] for s in self.operations.values()),
+                'ms': sum(s['ms'] for s in self.operations.values()),
+                'rcu': sum(s['rcu'] for s in self.operations.values()),
+                'wcu': sum(s['wcu'] for s in self.operations.values()),
+            }
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_request():
+    """Begin recording for the current request; returns the metrics and a reset token"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_request():
+    return _current.get()
+
+
+READ_OPERATIONS = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+
+
+def capacity_units(consumed, is_read: bool):
+    """Sum (read, write) units from a ConsumedCapacity entry or list of entries.
+
+    TOTAL mode only reports CapacityUnits, which are attributed to reads or
+    writes by the operation type.
+    """
+    entries = consumed if isinstance(consumed, list) else [consumed] if consumed else []
+    read_units = write_units = 0.0
+    for entry in entries:
+        if 'ReadCapacityUnits' in entry or 'WriteCapacityUnits' in entry:
+            read_units += float(entry.get('ReadCapacityUnits', 0))
+            write_units += float(entry.get('WriteCapacityUnits', 0))
+        elif is_read:
+            read_units += float(entry.get('CapacityUnits', 0))
+        else:
+            write_units += float(entry.get('CapacityUnits', 0))
+    return read_units, write_units
+
+
+def _request_capacity(params, model, **kwargs):
+    if _current.get() is None:
+        return
+    if 'ReturnConsumedCapacity' in model.input_shape.members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _before_call(context, **kwargs):
+    context['metrics_started'] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs):
+    started = context.get('metrics_started')
+    if started is None:
+        return
+    read_units, write_units = capacity_units(parsed.get('ConsumedCapacity'), model.name in READ_OPERATIONS)
+    record_call(model.name, (time.perf_counter() - started) * 1000, read_units, write_units)
+
+
+def record_call(operation: str, latency_ms: float, read_units: float = 0.0, write_units: float = 0.0):
+    """Record one storage call; the in-memory engine uses this directly since it bypasses botocore"""
+    call_latency.record(operation, latency_ms)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record(operation, latency_ms, read_units, write_units)
+
+
+# Histogram buckets grow by 20% from 0.25 ms, so the last bound is about 14 s
+BUCKET_BASE_MS = 0.25
+BUCKET_GROWTH = 1.2
+BUCKET_COUNT = 60
+BUCKET_BOUNDS = [BUCKET_BASE_MS * BUCKET_GROWTH ** i for i in range(BUCKET_COUNT)]
+
+
+class LatencyHistogram:
+    """Latencies in log-spaced buckets; percentiles are reported as bucket upper bounds"""
+
+    def __init__(self):
+        # One extra bucket for anything above the last bound
+        self.counts = [0] * (BUCKET_COUNT + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, pct: float):
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[index], self.max_ms) if index < BUCKET_COUNT else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avgMs': round(self.total_ms / self.count, 2),
+            'p50Ms': round(self.percentile(50), 2),
+            'p95Ms': round(self.percentile(95), 2),
+            'p99Ms': round(self.percentile(99), 2),
+            'maxMs': round(self.max_ms, 2),
+            # Upper bound in ms -> calls, for non-empty buckets
+            'buckets': {
+                (f'{BUCKET_BOUNDS[index]:.2f}' if index < BUCKET_COUNT else '+Inf'): count
+                for index, count in enumerate(self.counts) if count
+            },
+        }
+
+
+class CallLatency:
+    """Process-wide latency histogram of every DynamoDB call, per operation.
+
+    Unlike RequestMetrics this also covers calls made outside a request
+    (background tasks, jobs), and it feeds the hedged read delay.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, latency_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = LatencyHistogram()
+            histogram.add(latency_ms)
+
+    def percentile(self, operation: str, pct: float, min_count: int = 1):
+        """Latency percentile of an operation in ms, or None with fewer than `min_count` calls"""
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None or histogram.count < min_count:
+                return None
+            return histogram.percentile(pct)
+
+    def snapshot(self):
+        with self._lock:
+            return {operation: histogram.snapshot() for operation, histogram in sorted(self._histograms.items())}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+call_latency = CallLatency()
+
+
+def instrument_client(client):
+    """Attach the recording hooks to a botocore DynamoDB client"""
+    events = client.meta.events
+    events.register('provide-client-params.dynamodb.*', _request_capacity)
+    events.register('before-call.dynamodb.*', _before_call)
+    events.register('after-call.dynamodb.*', _after_call)
+    return client
+
+
+def server_timing_header(metrics: RequestMetrics, total_ms: float):
+    """Server-Timing value with the request total, DynamoDB total and one entry per operation"""
+    totals = metrics.totals()
+    parts = [
+        f'app;dur={total_ms:.1f}',
+        f'ddb;dur={totals["ms"]:.1f};desc="{totals["calls"]} calls {totals["rcu"]:g} RCU {totals["wcu"]:g} WCU"',
+    ]
+    for operation, stats in sorted(metrics.operations.items()):
+        parts.append(f'ddb-{operation};dur={stats["ms"]:.1f};desc="{stats["calls"]} calls"')
+    return ', '.join(parts)
+
+
+def emf_record(route: str, method: str, status_code: int, metrics: RequestMetrics, total_ms: float):
+    """CloudWatch Embedded Metric Format record for one request"""
+    totals = metrics.totals()
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Route']],
+                'Metrics': [
+                    {'Name': 'RequestLatency', 'Unit': 'Milliseconds'},
+                    {'Name': 'DynamoDBCalls', 'Unit': 'Count'},
+                    {'Name': 'DynamoDBLatency', 'Unit': 'Milliseconds'},
+                    {'Name': 'ConsumedReadCapacity', 'Unit': 'Count'},
+                    {'Name': 'ConsumedWriteCapacity', 'Unit': 'Count'},
+                ],
+            }],
+        },
+        'Route': f'{method} {route}',
+        'StatusCode': status_code,
+        'RequestLatency': round(total_ms, 2),
+        'DynamoDBCalls': totals['calls'],
+        'DynamoDBLatency': round(totals['ms'], 2),
+        'ConsumedReadCapacity': totals['rcu'],
+        'ConsumedWriteCapacity': totals['wcu'],
+        'Operations': {op: dict(stats, ms=round(stats['ms'], 2)) for op, stats in metrics.operations.items()},
+    }
+
+
+def emit_emf(record):
+    print(json.dumps(record))
+
+
+class RouteStats:
+    """In-process aggregate of request metrics per route"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, metrics: RequestMetrics, total_ms: float):
+        totals = metrics.totals()
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                'requests': 0, 'totalMs': 0.0, 'maxMs': 0.0,
+                'ddbCalls': 0, 'ddbMs': 0.0, 'rcu': 0.0, 'wcu': 0.0, 'operations': {}
+            })
+            stats['requests'] += 1
+            stats['totalMs'] += total_ms
+            stats['maxMs'] = max(stats['maxMs'], total_ms)
+            stats['ddbCalls'] += totals['calls']
+            stats['ddbMs'] += totals['ms']
+            stats['rcu'] += totals['rcu']
+            stats['wcu'] += totals['wcu']
+            for operation, op_stats in metrics.operations.items():
+                stats['operations'][operation] = stats['operations'].get(operation, 0) + op_stats['calls']
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for route, stats in self._routes.items():
+                requests = stats['requests']
+                result[route] = dict(
+                    stats,
+                    totalMs=round(stats['totalMs'], 2),
+                    maxMs=round(stats['maxMs'], 2),
+                    ddbMs=round(stats['ddbMs'], 2),
+                    operations=dict(stats['operations']),
+                    avgMs=round(stats['totalMs'] / requests, 2),
+                    avgDdbCalls=round(stats['ddbCalls'] / requests, 2),
+                )
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
@@ -0,0 +1,50 @@
+"""Newline-delimited JSON encoding and decoding for bulk import/export"""
+import json
+
+from encoding import json_default
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def dumps_line(item):
+    """Encode one item as a newline-terminated JSON line"""
+    return json.dumps(item, default=json_default, separators=(',', ':')) + '\n'
+
+
+async def iter_lines(chunks, max_line_bytes: int = MAX_LINE_BYTES):
+    """Split an async stream of byte chunks into (line number, bytes) pairs.
+
+    Blank lines are skipped but still counted, so line numbers match the
+    uploaded file. Lines are not decoded here, so a bad line can be reported
+    without ending the stream. A line longer than `max_line_bytes` is
+    dropped as it arrives and yielded as None.
+    """
+    buffer = b''
+    line_number = 0
+    too_long = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_number += 1
+            if too_long or len(line) > max_line_bytes:
+                too_long = False
+                yield line_number, None
+            elif line.strip():
+                yield line_number, line
+        if len(buffer) > max_line_bytes:
+            # No newline yet; drop the line instead of buffering it
+            too_long = True
+            buffer = b''
+    if too_long:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, buffer
+
+
+def loads_line(line):
+    """Parse a line from iter_lines; ValueError for invalid UTF-8 or JSON, or an over-long line"""
+    if line is None:
+        raise ValueError(f"Line is longer than {MAX_LINE_BYTES} bytes")
+    return json.loads(line.decode('utf-8'))
@@ -0,0 +1,107 @@
+"""Cursor pagination over DynamoDB scan and query results"""
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from encoding import json_default
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor that cannot be decoded"""
+
+
+def encode_cursor(last_evaluated_key):
+    """Encode a LastEvaluatedKey as an opaque URL-safe cursor"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=json_default, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def is_key_value(value):
+    """Key attributes are strings or numbers; JSON booleans are neither"""
+    return isinstance(value, (str, int, Decimal)) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor, key_shape=None):
+    """Decode a cursor back into an ExclusiveStartKey.
+
+    `key_shape` maps each key attribute of the table or index being read to
+    the value it must hold, or None when any value is allowed. A cursor from
+    another table, index, partition or endpoint is rejected here instead of
+    reaching DynamoDB as an invalid ExclusiveStartKey.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw, parse_float=Decimal)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(key, dict) or not key:
+        raise InvalidCursor("Invalid cursor")
+    if key_shape is not None:
+        if set(key) != set(key_shape) or not all(is_key_value(value) for value in key.values()):
+            raise InvalidCursor("Invalid cursor")
+        if any(expected is not None and key[name] != expected for name, expected in key_shape.items()):
+            raise InvalidCursor("Invalid cursor")
+    return key
+
+
+def read_all(operation, **kwargs):
+    """Call a scan/query operation repeatedly until every page is read"""
+    items = []
+    while True:
+        response = operation(**kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def read_page(operation, limit, cursor=None, key_shape=None, **kwargs):
+    """Read up to `limit` items starting at `cursor`.
+
+    Filters are applied by DynamoDB after `Limit`, so the operation is called
+    again with the remaining budget until the page is full or the table or
+    partition is exhausted. Returns the items and the cursor for the next page.
+    `key_shape` is passed to `decode_cursor` to validate the cursor.
+    """
+    items = []
+    start_key = decode_cursor(cursor, key_shape)
+    while True:
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = operation(Limit=limit - len(items), **kwargs)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key or len(items) >= limit:
+            return items, encode_cursor(start_key)
+
+
+def count_all(operation, **kwargs):
+    """Count matching items across every page without returning them"""
+    total = 0
+    while True:
+        response = operation(Select='COUNT', **kwargs)
+        total += response.get('Count', 0)
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return total
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_items(operation, **kwargs):
+    """Yield items page by page without holding more than one page in memory"""
+    while True:
+        response = operation(**kwargs)
+        yield from response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
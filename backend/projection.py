@@ -0,0 +1,47 @@
+"""Client-selected attribute projections (`fields=`) for list endpoints"""
+import re
+
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+MAX_FIELDS = 50
+
+
+class InvalidFields(ValueError):
+    """Raised when a `fields` parameter names an invalid attribute"""
+
+
+def parse_fields(fields):
+    """Split a comma-separated `fields` value into attribute names, or None for all"""
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    if not names:
+        raise InvalidFields("fields must name at least one attribute")
+    if len(names) > MAX_FIELDS:
+        raise InvalidFields(f"fields may name at most {MAX_FIELDS} attributes")
+    invalid = [name for name in names if not FIELD_NAME.match(name)]
+    if invalid:
+        raise InvalidFields(f"Invalid field names: {', '.join(invalid)}")
+    return names
+
+
+def projection_args(fields, required=()):
+    """ProjectionExpression kwargs for `fields` plus any attributes the server needs.
+
+    Every name goes through a placeholder, so reserved words such as `date`
+    and `status` are safe. Returns {} when no projection was requested.
+    """
+    if fields is None:
+        return {}
+    names = list(dict.fromkeys([*fields, *required]))
+    placeholders = {f'#f{i}': name for i, name in enumerate(names)}
+    return {
+        'ProjectionExpression': ', '.join(placeholders),
+        'ExpressionAttributeNames': placeholders,
+    }
+
+
+def select_fields(item, fields):
+    """Copy of an item limited to the requested fields"""
+    if fields is None:
+        return item
+    return {name: item[name] for name in fields if name in item}
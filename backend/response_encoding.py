@@ -0,0 +1,107 @@
+"""orjson responses and opt-in response compression"""
+import gzip
+
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from encoding import json_default
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; DynamoDB items can be returned as-is.
+
+    Returning this from an endpoint also skips FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=json_default)
+
+
+def accepted_encodings(accept_encoding: str):
+    """Content codings from an Accept-Encoding header that are not refused with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress complete responses of at least `minimum_size` bytes with br or gzip.
+
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed. Streamed responses (such as NDJSON exports) and responses that
+    already carry a Content-Encoding pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        self.brotli = brotli
+
+    def choose_encoding(self, accept_encoding: str):
+        accepted = accepted_encodings(accept_encoding)
+        if self.brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted or '*' in accepted:
+            return 'gzip'
+        return None
+
+    def compress(self, body: bytes, encoding: str):
+        if encoding == 'br':
+            return self.brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if message.get('more_body') or len(body) < self.minimum_size or 'content-encoding' in headers:
+                await send(start)
+                await send(message)
+                return
+            compressed = self.compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(compressed))
+            headers.add_vary_header('Accept-Encoding')
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                # A strong ETag names the uncompressed bytes; the compressed body only matches weakly
+                headers['ETag'] = f'W/{etag}'
+            await send(start)
+            await send({'type': 'http.response.body', 'body': compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,100 @@
+"""Per-request retry budget for DynamoDB calls.
+
+botocore retries each call on its own (DDB_MAX_ATTEMPTS attempts in
+adaptive mode), so a request that makes many calls during a throttling
+spike can multiply its load and its latency. The HTTP middleware gives
+every request a budget of retries shared by all of its calls; once it is
+spent, further failures are returned to the caller instead of retried.
+Work outside a request (background tasks, jobs) has no budget and keeps
+botocore's per-call limit; tasks.py runs deferred tasks in an empty context
+so they do not pick up the budget of the request that enqueued them.
+"""
+import contextvars
+import threading
+
+_current = contextvars.ContextVar('retry_budget', default=None)
+
+
+class RetryBudget:
+    """Retries left for the current request, shared by its threads"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def exhausted(self):
+        with self._lock:
+            return self.used >= self.limit
+
+    def spend(self):
+        with self._lock:
+            self.used += 1
+
+
+class RetryStats:
+    """Process-wide counts of retries sent and retries refused by a budget"""
+
+    def __init__(self):
+        self.retries = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def add(self, retries: int = 0, refused: int = 0):
+        with self._lock:
+            self.retries += retries
+            self.refused += refused
+
+    def snapshot(self):
+        with self._lock:
+            return {'retries': self.retries, 'refusedByBudget': self.refused}
+
+    def clear(self):
+        with self._lock:
+            self.retries = self.refused = 0
+
+
+retry_stats = RetryStats()
+
+
+def start_budget(limit: int):
+    """Give the current request `limit` retries; returns the budget and a reset token"""
+    budget = RetryBudget(limit)
+    return budget, _current.set(budget)
+
+
+def end_budget(token):
+    _current.reset(token)
+
+
+def _failed(response, caught_exception):
+    if caught_exception is not None:
+        return True
+    return response is not None and response[0].status_code >= 400
+
+
+def _refuse_retry(response, caught_exception, **kwargs):
+    # Registered ahead of botocore's retry handler: False stops the retry,
+    # None leaves the decision to botocore
+    budget = _current.get()
+    if budget is None or not _failed(response, caught_exception) or not budget.exhausted():
+        return None
+    retry_stats.add(refused=1)
+    return False
+
+
+def _count_retry(request, **kwargs):
+    if request.context.get('retries', {}).get('attempt', 1) <= 1:
+        return
+    retry_stats.add(retries=1)
+    budget = _current.get()
+    if budget is not None:
+        budget.spend()
+
+
+def install_retry_budget(client):
+    """Attach the budget hooks to a botocore DynamoDB client"""
+    events = client.meta.events
+    events.register_first('needs-retry.dynamodb', _refuse_retry)
+    events.register('request-created.dynamodb', _count_retry)
+    return client
@@ -0,0 +1,118 @@
+"""Parallel segmented scans.
+
+A full-table scan is split into DynamoDB Segment/TotalSegments ranges that
+are read concurrently, one thread per segment. Items are streamed back as
+pages arrive, with a small per-scan prefetch buffer, so a scan never holds
+the whole table in memory. Ordered merges return segment 0 first, then
+segment 1 and so on, which keeps results stable between calls; unordered
+merges return pages as soon as any segment produces one.
+"""
+import contextvars
+import os
+import queue
+import threading
+
+from cache import TTLCache
+from pagination import iter_items
+
+SCAN_MAX_SEGMENTS = int(os.environ.get('SCAN_MAX_SEGMENTS', '8'))
+SCAN_BYTES_PER_SEGMENT = int(os.environ.get('SCAN_BYTES_PER_SEGMENT', str(8 * 1024 * 1024)))
+PREFETCH_PAGES = 2
+TABLE_SIZE_TTL_SECONDS = 3600
+
+_table_sizes = TTLCache(max_entries=64, ttl_seconds=TABLE_SIZE_TTL_SECONDS)
+_DONE = object()
+
+
+def segments_for(table):
+    """Degree of parallelism for a scan of `table`, from its approximate size.
+
+    DynamoDB refreshes TableSizeBytes about every six hours, so the size is
+    cached per container and small tables keep a single sequential scan.
+    """
+    size = _table_sizes.get(table.name)
+    if size is None:
+        size = int(table.meta.client.describe_table(TableName=table.name)['Table'].get('TableSizeBytes', 0))
+        _table_sizes.set(table.name, size)
+    return max(1, min(SCAN_MAX_SEGMENTS, -(-size // SCAN_BYTES_PER_SEGMENT)))
+
+
+def _put(pages, entry, stop):
+    """Queue an entry unless the consumer has gone away; returns False once it has"""
+    while not stop.is_set():
+        try:
+            pages.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_segment(table, segment, total_segments, pages, stop, kwargs):
+    try:
+        kwargs = dict(kwargs, Segment=segment, TotalSegments=total_segments)
+        while not stop.is_set():
+            response = table.scan(**kwargs)
+            if not _put(pages, (segment, response.get('Items', [])), stop):
+                return
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_key
+        _put(pages, (segment, _DONE), stop)
+    except Exception as e:
+        _put(pages, (segment, e), stop)
+
+
+def parallel_scan(table, segments=None, ordered=False, **kwargs):
+    """Yield every item of a scan, reading `segments` segments concurrently.
+
+    `segments` defaults to segments_for(table); with one segment this is a
+    plain sequential scan. `kwargs` (FilterExpression, ProjectionExpression,
+    ...) apply to every segment. Errors from any segment are raised here.
+    """
+    if segments is None:
+        segments = segments_for(table)
+    if segments <= 1:
+        yield from iter_items(table.scan, **kwargs)
+        return
+
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(maxsize=PREFETCH_PAGES) for _ in range(segments)]
+    else:
+        shared = queue.Queue(maxsize=PREFETCH_PAGES * segments)
+        queues = [shared] * segments
+    threads = [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_scan_segment, table, segment, segments, queues[segment], stop, kwargs),
+            name=f'scan-{table.name}-{segment}',
+            daemon=True
+        )
+        for segment in range(segments)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        if ordered:
+            for segment_queue in queues:
+                yield from _drain(segment_queue, 1)
+        else:
+            yield from _drain(shared, segments)
+    finally:
+        stop.set()
+
+
+def _drain(pages, producers):
+    """Yield items from a page queue until `producers` segments have finished"""
+    remaining = producers
+    while remaining:
+        _, page = pages.get()
+        if page is _DONE:
+            remaining -= 1
+        elif isinstance(page, Exception):
+            raise page
+        else:
+            yield from page
@@ -0,0 +1,219 @@
+"""Full-text search over event titles, descriptions and locations.
+
+Every event has one item in the SearchIndex table holding its terms in a
+compact "term:weight term:weight" string. Items are rewritten when the
+event is created, updated or deleted (deletes leave an expiring tombstone).
+
+A container loads all items once into an in-memory inverted index
+(term -> {eventId: weight}). After that it only reads the items changed
+since its last read, through the `seq-index` GSI, at most every
+SEARCH_REFRESH_SECONDS. A query only walks the posting lists of its own
+terms, so its cost depends on how many events match, not on table size.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from boto3.dynamodb.conditions import Key
+
+from batch import batch_write_items
+from scan import parallel_scan
+
+SEARCH_REFRESH_SECONDS = float(os.environ.get('SEARCH_REFRESH_SECONDS', '5'))
+SEQ_INDEX = 'seq-index'
+# Every item shares one GSI partition so changes can be read in seq order
+INDEX_SHARD = 'events'
+# Changes are re-read with this much overlap, to allow for clock skew between
+# writers and for the GSI's eventual consistency; re-applying an item is harmless
+SEQ_OVERLAP_MS = 10_000
+TOMBSTONE_TTL_SECONDS = 7 * 24 * 3600
+
+FIELD_WEIGHTS = {'title': 3, 'location': 2, 'description': 1}
+TOKEN = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or the to was with'.split()
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str):
+    """Lowercase alphanumeric terms of `text`, without stop words"""
+    return [term for term in TOKEN.findall(text.lower()) if term not in STOP_WORDS]
+
+
+def event_terms(event):
+    """Map of term to weight for an event; title and location terms count extra"""
+    terms = defaultdict(int)
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(str(event.get(field) or '')):
+            terms[term] += weight
+    return dict(terms)
+
+
+def encode_terms(terms):
+    return ' '.join(f'{term}:{weight}' for term, weight in sorted(terms.items()))
+
+
+def decode_terms(encoded: str):
+    terms = {}
+    for entry in encoded.split():
+        term, _, weight = entry.rpartition(':')
+        terms[term] = int(weight)
+    return terms
+
+
+class InvertedIndex:
+    """Posting lists with BM25 ranking; not thread-safe on its own"""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, event_id: str, terms):
+        self.remove(event_id)
+        for term, weight in terms.items():
+            self.postings[term][event_id] = weight
+        self.documents[event_id] = list(terms)
+        length = sum(terms.values())
+        self.lengths[event_id] = length
+        self.total_length += length
+
+    def remove(self, event_id: str):
+        length = self.lengths.pop(event_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.documents.pop(event_id):
+            del self.postings[term][event_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, terms):
+        """(eventId, score) for events matching any term, best first"""
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self.total_length / count
+        scores = defaultdict(float)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for event_id, weight in postings.items():
+                norm = K1 * (1 - B + B * self.lengths[event_id] / average_length)
+                scores[event_id] += idf * weight * (K1 + 1) / (weight + norm)
+        return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
+
+
+class SearchIndex:
+    """Inverted index kept in sync with the SearchIndex table"""
+
+    def __init__(self, table, refresh_seconds: float = SEARCH_REFRESH_SECONDS, clock=time.monotonic):
+        self.table = table
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.index = InvertedIndex()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._seqs = {}
+        self._last_seq = 0
+        self._checked_at = 0.0
+
+    def _item(self, event_id: str, **attributes):
+        return dict(attributes, eventId=event_id, indexShard=INDEX_SHARD, seq=int(time.time() * 1000))
+
+    def _event_item(self, event):
+        return self._item(event['eventId'], terms=encode_terms(event_terms(event)))
+
+    def _apply(self, item):
+        """Apply a stored item to the in-memory index; caller holds the lock"""
+        seq = int(item.get('seq', 0))
+        # A lagging GSI read can return an older version than one already applied
+        if seq < self._seqs.get(item['eventId'], 0):
+            return
+        self._seqs[item['eventId']] = seq
+        self._last_seq = max(self._last_seq, seq)
+        if item.get('deleted'):
+            self.index.remove(item['eventId'])
+        else:
+            self.index.add(item['eventId'], decode_terms(item.get('terms', '')))
+
+    def index_event(self, event):
+        """Store and apply the terms of a created or updated event"""
+        item = self._event_item(event)
+        self.table.put_item(Item=item)
+        with self._lock:
+            self._apply(item)
+
+    def index_events(self, events):
+        """Store and apply the terms of many events with BatchWriteItem"""
+        items = [self._event_item(event) for event in events]
+        batch_write_items(self.table, items)
+        with self._lock:
+            for item in items:
+                self._apply(item)
+
+    def remove_event(self, event_id: str):
+        """Replace an event's terms with a tombstone other containers will see"""
+        item = self._item(event_id, deleted=True, expiresAt=int(time.time()) + TOMBSTONE_TTL_SECONDS)
+        self.table.put_item(Item=item)
+        with self._lock:
+            self._apply(item)
+
+    def refresh(self):
+        """Load the whole index on first use, then apply recent changes"""
+        with self._lock:
+            now = self.clock()
+            if self._loaded and now - self._checked_at < self.refresh_seconds:
+                return
+            if not self._loaded:
+                for item in parallel_scan(self.table):
+                    self._apply(item)
+                self._loaded = True
+            else:
+                since = self._last_seq - SEQ_OVERLAP_MS
+                kwargs = {
+                    'IndexName': SEQ_INDEX,
+                    'KeyConditionExpression': Key('indexShard').eq(INDEX_SHARD) & Key('seq').gt(since)
+                }
+                while True:
+                    response = self.table.query(**kwargs)
+                    for item in response.get('Items', []):
+                        self._apply(item)
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            self._checked_at = now
+
+    def search(self, query: str):
+        """Ranked (eventId, score) pairs for a free-text query"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.refresh()
+        with self._lock:
+            return self.index.search(terms)
+
+    def clear(self):
+        """Forget the in-memory index; the next search loads it again"""
+        with self._lock:
+            self.index = InvertedIndex()
+            self._seqs = {}
+            self._last_seq = 0
+            self._loaded = False
+
+    def stats(self):
+        with self._lock:
+            return {'loaded': self._loaded, 'events': len(self.index), 'terms': len(self.index.postings)}
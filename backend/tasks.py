@@ -0,0 +1,164 @@
+"""Deferred work that runs after the response is sent.
+
+Handlers are registered by name and enqueued with a JSON-serializable
+payload; the queue backend decides where they run:
+
+  * BackgroundTaskQueue runs them in-process after the response, through
+    FastAPI BackgroundTasks (the default).
+  * InMemoryQueue holds them until drain() is called, for tests and local runs.
+  * SQSTaskQueue sends them to SQS and runs them when Lambda delivers the
+    messages to handle_event. Mangum waits for background tasks before
+    returning, so on Lambda this is what takes work off the request path.
+
+Tasks enqueued with a `key` are coalesced: while one is waiting to run,
+enqueueing another with the same key is a no-op. A key that has waited
+longer than TASK_PENDING_TTL seconds stops coalescing, so a task that never
+ran (for example because its response failed before background tasks
+started) cannot block its key. Handlers must be idempotent, since SQS
+delivers at least once and coalescing is best effort.
+
+Handlers run in an empty contextvars context. BackgroundTasks would
+otherwise inherit the finished request's context, and with it the request's
+retry budget and metrics.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+TASK_PENDING_TTL = float(os.environ.get('TASK_PENDING_TTL', '30'))
+
+
+class TaskQueue:
+    """Handler registry plus per-key coalescing of pending tasks"""
+
+    def __init__(self, pending_ttl: float = TASK_PENDING_TTL):
+        self.handlers = {}
+        self.pending_ttl = pending_ttl
+        # key -> monotonic time after which it no longer coalesces
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def task(self, name: str):
+        """Decorator registering a handler for tasks called `name`"""
+        def register(func):
+            self.handlers[name] = func
+            return func
+        return register
+
+    def enqueue(self, name: str, payload: dict, key=None, background_tasks=None):
+        """Schedule a task; returns False when it was coalesced into a pending one"""
+        if name not in self.handlers:
+            raise KeyError(f"No handler registered for task {name}")
+        if key is not None:
+            now = time.monotonic()
+            with self._lock:
+                if self._pending.get(key, 0) > now:
+                    return False
+                self._pending[key] = now + self.pending_ttl
+        try:
+            self._submit(name, payload, key, background_tasks)
+        except BaseException:
+            self._release(key)
+            raise
+        return True
+
+    def run(self, name: str, payload: dict, key=None):
+        # Clear the key first, so work enqueued while this runs gets its own pass
+        self._release(key)
+        return contextvars.Context().run(self.handlers[name], **payload)
+
+    def _release(self, key):
+        if key is not None:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _submit(self, name, payload, key, background_tasks):
+        raise NotImplementedError
+
+
+class BackgroundTaskQueue(TaskQueue):
+    """Runs tasks in-process once the current response has been sent"""
+
+    def _submit(self, name, payload, key, background_tasks):
+        if background_tasks is None:
+            self.run(name, payload, key)
+        else:
+            background_tasks.add_task(self.run, name, payload, key)
+
+
+class InMemoryQueue(TaskQueue):
+    """Holds tasks until drain(); lets tests decide when deferred work happens"""
+
+    def __init__(self):
+        super().__init__()
+        self.tasks = deque()
+
+    def _submit(self, name, payload, key, background_tasks):
+        self.tasks.append((name, payload, key))
+
+    def drain(self):
+        """Run pending tasks, including any they enqueue; returns how many ran"""
+        ran = 0
+        while self.tasks:
+            self.run(*self.tasks.popleft())
+            ran += 1
+        return ran
+
+
+class SQSTaskQueue(TaskQueue):
+    """Sends tasks to an SQS queue consumed by handle_event"""
+
+    def __init__(self, queue_url: str, client=None):
+        super().__init__()
+        self.queue_url = queue_url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('sqs')
+        return self._client
+
+    def enqueue(self, name: str, payload: dict, key=None, background_tasks=None):
+        if name not in self.handlers:
+            raise KeyError(f"No handler registered for task {name}")
+        # Consumers may run in any container, so duplicates are coalesced per batch instead
+        self.client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps({'task': name, 'payload': payload, 'key': key})
+        )
+        return True
+
+    def handle_event(self, event):
+        """Run the tasks in an SQS event, once per key, reporting failed messages"""
+        groups = {}
+        for record in event.get('Records', []):
+            message = json.loads(record['body'])
+            group_key = message.get('key') or record['messageId']
+            groups.setdefault(group_key, (message, []))[1].append(record['messageId'])
+
+        failures = []
+        for message, message_ids in groups.values():
+            try:
+                self.run(message['task'], message['payload'])
+            except Exception:
+                traceback.print_exc()
+                failures.extend({'itemIdentifier': message_id} for message_id in message_ids)
+        return {'batchItemFailures': failures}
+
+
+def make_task_queue():
+    """Queue backend from TASK_QUEUE_BACKEND: background (default), memory or sqs"""
+    backend = os.environ.get('TASK_QUEUE_BACKEND', 'background')
+    if backend == 'memory':
+        return InMemoryQueue()
+    if backend == 'sqs':
+        return SQSTaskQueue(os.environ['TASK_QUEUE_URL'])
+    if backend == 'background':
+        return BackgroundTaskQueue()
+    raise ValueError(f"Unknown TASK_QUEUE_BACKEND {backend}")
@@ -0,0 +1,303 @@
+"""Parity of the in-memory storage engine with DynamoDB, as emulated by moto.
+
+Every test runs the same boto3 calls against moto's mock and a fresh
+MemoryEngine and asserts both return the same thing: the response (minus
+request metadata), or the error code, ALL_OLD item and cancellation reasons
+of a failed call. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks')
+sys.path.insert(0, BENCHMARKS_DIR)
+from local_tables import configure_environment, create_tables  # noqa: E402
+
+configure_environment()
+from memory_store import MemoryEngine  # noqa: E402
+
+METADATA_KEYS = ('ResponseMetadata', 'ConsumedCapacity')
+
+
+@pytest.fixture
+def engines():
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        create_tables()
+        resource = boto3.resource('dynamodb')
+        memory = MemoryEngine()
+        yield {
+            'moto': (resource.Table, resource.meta.client),
+            'memory': (memory.get_table, memory.get_client()),
+        }
+
+
+def outcome(call):
+    """Response of `call` without metadata, or the parts of its ClientError that callers inspect"""
+    try:
+        response = call()
+    except ClientError as e:
+        return {
+            'error': e.response['Error']['Code'],
+            'item': e.response.get('Item'),
+            'reasons': [reason.get('Code') for reason in e.response.get('CancellationReasons', [])],
+        }
+    if isinstance(response, dict):
+        return {key: value for key, value in response.items() if key not in METADATA_KEYS}
+    return response
+
+
+def both(engines, operation):
+    """Run operation(get_table, client) on each engine, assert they agree and return the result.
+
+    `operation` returns a list of call outcomes, so a test can compare a
+    sequence of calls at once.
+    """
+    results = {name: operation(get_table, client) for name, (get_table, client) in engines.items()}
+    assert results['memory'] == results['moto']
+    return results['moto']
+
+
+def seed_registrations(table):
+    for i in range(12):
+        item = {'userId': f'user-{i:02d}', 'eventId': 'event-a' if i % 3 else 'event-b', 'status': 'registered'}
+        if i % 4 == 0:
+            item.update(status='waitlisted', waitlistSeq=100 - i)
+        table.put_item(Item=item)
+
+
+# Conditions
+
+def test_conditional_put_and_failed_condition_item(engines):
+    def operation(get_table, client):
+        table = get_table('Events')
+        item = {'eventId': 'e1', 'capacity': 10, 'registeredCount': 3, 'tags': {'a', 'b'}}
+        return [
+            outcome(lambda: table.put_item(Item=item, ConditionExpression='attribute_not_exists(eventId)')),
+            outcome(lambda: table.put_item(
+                Item=item, ConditionExpression='attribute_not_exists(eventId)',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )),
+            outcome(lambda: table.delete_item(Key={'eventId': 'missing'}, ConditionExpression=Attr('eventId').exists())),
+        ]
+
+    results = both(engines, operation)
+    assert results[1]['error'] == 'ConditionalCheckFailedException'
+    assert results[1]['item']['capacity'] == {'N': '10'}
+
+
+@pytest.mark.parametrize('condition', [
+    Attr('registeredCount').lt(Attr('capacity')),
+    Attr('registeredCount').between(5, 9),
+    Attr('title').begins_with('Py') & Attr('tags').contains('b'),
+    Attr('status').is_in(['active', 'draft']) | Attr('missing').exists(),
+    ~Attr('details.room').eq('A1'),
+    Attr('details.speakers[1]').eq('bo'),
+    Attr('tags').size().eq(2) & Attr('title').attribute_type('S'),
+    Attr('capacity').gte(10) & Attr('missing').not_exists(),
+])
+def test_condition_expressions(engines, condition):
+    def operation(get_table, client):
+        table = get_table('Events')
+        table.put_item(Item={
+            'eventId': 'e1', 'title': 'PyCon', 'status': 'draft', 'capacity': 10, 'registeredCount': 3,
+            'tags': {'a', 'b'}, 'details': {'room': 'B2', 'speakers': ['al', 'bo']},
+        })
+        return [outcome(lambda: table.update_item(
+            Key={'eventId': 'e1'}, UpdateExpression='SET checked = :yes', ConditionExpression=condition,
+            ExpressionAttributeValues={':yes': True}, ReturnValues='UPDATED_NEW'
+        ))]
+
+    both(engines, operation)
+
+
+# Update expressions
+
+@pytest.mark.parametrize('update_expression, values, return_values', [
+    ('SET registeredCount = if_not_exists(registeredCount, :zero) + :one', {':zero': 0, ':one': 1}, 'UPDATED_NEW'),
+    ('SET total = registeredCount + version', None, 'UPDATED_NEW'),
+    # capacity is a reserved word, so both reject it without a #placeholder
+    ('SET seats = capacity - registeredCount', None, 'ALL_NEW'),
+    ('SET speakers = list_append(speakers, :more)', {':more': ['cy']}, 'UPDATED_OLD'),
+    ('SET details.room = :room, details.floor = :floor', {':room': 'C3', ':floor': 2}, 'ALL_NEW'),
+    ('REMOVE title, speakers[0]', None, 'ALL_OLD'),
+    ('ADD version :one, tags :tags', {':one': 1, ':tags': {'c'}}, 'UPDATED_NEW'),
+    ('DELETE tags :tags', {':tags': {'a'}}, 'ALL_NEW'),
+    ('DELETE tags :tags', {':tags': {'a', 'b'}}, 'ALL_NEW'),
+    ('SET title = :title ADD version :one REMOVE details', {':title': 'New', ':one': 1}, 'ALL_NEW'),
+])
+def test_update_expressions(engines, update_expression, values, return_values):
+    def operation(get_table, client):
+        table = get_table('Events')
+        table.put_item(Item={
+            'eventId': 'e1', 'title': 'PyCon', 'capacity': 10, 'registeredCount': 3,
+            'tags': {'a', 'b'}, 'speakers': ['al', 'bo'], 'details': {'room': 'B2'}, 'version': 1,
+        })
+        params = {'Key': {'eventId': 'e1'}, 'UpdateExpression': update_expression, 'ReturnValues': return_values}
+        if values:
+            params['ExpressionAttributeValues'] = values
+        return [
+            outcome(lambda: table.update_item(**params)),
+            outcome(lambda: table.get_item(Key={'eventId': 'e1'}, ConsistentRead=True)),
+        ]
+
+    both(engines, operation)
+
+
+def test_update_creates_missing_item(engines):
+    def operation(get_table, client):
+        table = get_table('EventCounters')
+        return [
+            outcome(lambda: table.update_item(
+                Key={'eventId': 'e1', 'shardId': 3}, UpdateExpression='ADD registeredCount :one, version :one',
+                ExpressionAttributeValues={':one': 1}, ReturnValues='ALL_NEW'
+            )),
+            outcome(lambda: table.update_item(
+                Key={'eventId': 'e1', 'shardId': 3}, UpdateExpression='ADD registeredCount :one',
+                ConditionExpression='registeredCount < :seats',
+                ExpressionAttributeValues={':one': 1, ':seats': 1}
+            )),
+        ]
+
+    both(engines, operation)
+
+
+def test_failed_condition_before_invalid_update(engines):
+    # The update would fail on a missing item, but the condition is checked first
+    def operation(get_table, client):
+        table = get_table('Events')
+        return [outcome(lambda: table.update_item(
+            Key={'eventId': 'gone'}, UpdateExpression='SET registeredCount = registeredCount - :one',
+            ConditionExpression=Attr('eventId').exists(), ExpressionAttributeValues={':one': 1}
+        )), outcome(lambda: table.get_item(Key={'eventId': 'gone'}))]
+
+    results = both(engines, operation)
+    assert results[0]['error'] == 'ConditionalCheckFailedException'
+
+
+def test_transaction_cancellation_reasons(engines):
+    def operation(get_table, client):
+        get_table('Events').put_item(Item={'eventId': 'e1', 'capacity': 1, 'registeredCount': 1})
+        return [outcome(lambda: client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': 'Registrations',
+                'Item': {'userId': 'u1', 'eventId': 'e1'},
+                'ConditionExpression': 'attribute_not_exists(userId)',
+            }},
+            {'Update': {
+                'TableName': 'Events',
+                'Key': {'eventId': 'e1'},
+                'UpdateExpression': 'ADD registeredCount :one',
+                'ConditionExpression': 'registeredCount < #capacity',
+                'ExpressionAttributeNames': {'#capacity': 'capacity'},
+                'ExpressionAttributeValues': {':one': 1},
+            }},
+        ])), outcome(lambda: get_table('Registrations').get_item(Key={'userId': 'u1', 'eventId': 'e1'}))]
+
+    results = both(engines, operation)
+    assert results[0]['reasons'] == ['None', 'ConditionalCheckFailed']
+
+
+# GSI queries
+
+@pytest.mark.parametrize('params', [
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-a')},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-a') & Key('userId').gt('user-05'),
+     'ScanIndexForward': False},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-b'),
+     'FilterExpression': Attr('status').eq('waitlisted'), 'ProjectionExpression': 'userId, waitlistSeq'},
+    # Sparse and KEYS_ONLY: only waitlisted rows, with table and index keys
+    {'IndexName': 'eventId-waitlistSeq-index', 'KeyConditionExpression': Key('eventId').eq('event-a')},
+    {'IndexName': 'eventId-waitlistSeq-index',
+     'KeyConditionExpression': Key('eventId').eq('event-b') & Key('waitlistSeq').between(90, 100)},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-a'), 'Select': 'COUNT'},
+])
+def test_gsi_queries(engines, params):
+    def operation(get_table, client):
+        table = get_table('Registrations')
+        seed_registrations(table)
+        return [outcome(lambda: table.query(**params))]
+
+    both(engines, operation)
+
+
+def test_gsi_with_duplicate_range_values(engines):
+    def operation(get_table, client):
+        table = get_table('Events')
+        for i in range(6):
+            table.put_item(Item={'eventId': f'e{i}', 'status': 'active', 'date': f'2025-06-0{i % 2 + 1}'})
+        return [outcome(lambda: table.query(
+            IndexName='status-date-index',
+            KeyConditionExpression=Key('status').eq('active') & Key('date').begins_with('2025-06'),
+        ))]
+
+    both(engines, operation)
+
+
+# Pagination
+
+def read_pages(query, **params):
+    """Every page of a query or scan as (Count, ScannedCount, Items, LastEvaluatedKey)"""
+    pages = []
+    while True:
+        response = query(**params)
+        pages.append((response['Count'], response['ScannedCount'], response.get('Items'),
+                      response.get('LastEvaluatedKey')))
+        if 'LastEvaluatedKey' not in response:
+            return pages
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+@pytest.mark.parametrize('params', [
+    {'KeyConditionExpression': Key('userId').eq('user-00'), 'Limit': 1},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-a'), 'Limit': 3},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-a'), 'Limit': 4,
+     'FilterExpression': Attr('status').eq('registered')},
+    {'IndexName': 'eventId-waitlistSeq-index', 'KeyConditionExpression': Key('eventId').eq('event-a'), 'Limit': 1},
+    {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq('event-b'), 'Limit': 2,
+     'ScanIndexForward': False},
+])
+def test_query_pagination(engines, params):
+    def operation(get_table, client):
+        table = get_table('Registrations')
+        seed_registrations(table)
+        return read_pages(table.query, **params)
+
+    both(engines, operation)
+
+
+@pytest.mark.parametrize('limit', [None, 1, 5])
+def test_scan_pagination(engines, limit):
+    # Scan order depends on the partition hash, so compare what the pages add up to
+    def operation(get_table, client):
+        table = get_table('Registrations')
+        seed_registrations(table)
+        params = {'FilterExpression': Attr('status').eq('registered')}
+        if limit:
+            params['Limit'] = limit
+        pages = read_pages(table.scan, **params)
+        items = sorted((item for _, _, page, _ in pages for item in page), key=lambda item: item['userId'])
+        return [sum(scanned for _, scanned, _, _ in pages), items, all(
+            len(page_keys) == 2 for *_, page_keys in pages[:-1] if page_keys is not None
+        )]
+
+    results = both(engines, operation)
+    assert results[0] == 12
+    assert results[1][0]['userId'] == 'user-01'
+
+
+def test_decimal_round_trip(engines):
+    def operation(get_table, client):
+        table = get_table('Jobs')
+        table.put_item(Item={'jobId': 'j1', 'ratio': Decimal('0.125'), 'big': 10 ** 20, 'flags': [True, None]})
+        return [outcome(lambda: table.get_item(Key={'jobId': 'j1'}))]
+
+    both(engines, operation)
@@ -0,0 +1,110 @@
+"""Behaviour of the deferred task queue.
+
+Tasks run through an InMemoryQueue, so each test decides when deferred work
+happens by calling drain(). The promotion test drives the API against moto's
+mock, with the tables created as in the parity tests. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks')
+sys.path.insert(0, BENCHMARKS_DIR)
+from local_tables import configure_environment, create_tables  # noqa: E402
+
+configure_environment()
+import tasks  # noqa: E402
+from tasks import InMemoryQueue  # noqa: E402
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def queue():
+    queue = InMemoryQueue()
+    queue.calls = []
+
+    @queue.task('record')
+    def record(value):
+        queue.calls.append(value)
+
+    return queue
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """TestClient for the app on fresh moto tables, with tasks held in an InMemoryQueue"""
+    from fastapi.testclient import TestClient
+    from moto import mock_aws
+
+    with mock_aws():
+        create_tables()
+        import main
+
+        queue = InMemoryQueue()
+        queue.handlers = main.task_queue.handlers
+        monkeypatch.setattr(main, 'task_queue', queue)
+        yield TestClient(main.app), queue
+
+
+def test_duplicate_enqueues_coalesce(queue):
+    assert queue.enqueue('record', {'value': 1}, key='k') is True
+    assert queue.enqueue('record', {'value': 2}, key='k') is False
+    assert queue.enqueue('record', {'value': 3}, key='other') is True
+
+    assert queue.drain() == 2
+    assert queue.calls == [1, 3]
+
+    # Running the task releases its key, so later work gets its own pass
+    assert queue.enqueue('record', {'value': 4}, key='k') is True
+    assert queue.drain() == 1
+    assert queue.calls == [1, 3, 4]
+
+
+def test_expired_key_reschedules(queue, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tasks.time, 'monotonic', clock)
+
+    assert queue.enqueue('record', {'value': 1}, key='k') is True
+    clock.now += queue.pending_ttl - 1
+    assert queue.enqueue('record', {'value': 2}, key='k') is False
+
+    # The first task never ran; once its key expires it no longer blocks the key
+    clock.now += 2
+    assert queue.enqueue('record', {'value': 3}, key='k') is True
+    assert queue.drain() == 2
+    assert queue.calls == [1, 3]
+
+
+def test_freed_seat_promotes_head_of_waitlist(api):
+    client, queue = api
+    for user_id in ('alice', 'bob', 'carol'):
+        assert client.post('/users', json={'userId': user_id, 'name': user_id}).status_code == 201
+    event = {
+        'eventId': 'promo', 'title': 't', 'description': 'd', 'date': '2030-01-01', 'location': 'l',
+        'capacity': 1, 'organizer': 'o', 'status': 'active', 'hasWaitlist': True,
+    }
+    assert client.post('/events', json=event).status_code == 201
+    statuses = [client.post('/events/promo/register', json={'userId': user_id}).json()['status']
+                for user_id in ('alice', 'bob', 'carol')]
+    assert statuses == ['registered', 'waitlisted', 'waitlisted']
+
+    assert client.delete('/events/promo/register/alice').status_code == 200
+    # The seat stays held for the waitlist until the promotion task runs
+    assert [user['userId'] for user in client.get('/events/promo/waitlist').json()] == ['bob', 'carol']
+
+    assert queue.drain() == 1
+    assert [user['userId'] for user in client.get('/events/promo/registrations').json()] == ['bob']
+    waitlist = client.get('/events/promo/waitlist').json()
+    assert [(user['userId'], user['waitlistPosition']) for user in waitlist] == [('carol', 1)]
@@ -0,0 +1,101 @@
+"""Measure Lambda cold start time-to-first-response for lambda_handler.handler.
+
+Each run starts a fresh interpreter, creates the local DynamoDB tables,
+then times `import lambda_handler` and the first `handler()` call for a
+stubbed API Gateway proxy event. boto3 is already imported by the DynamoDB
+mock, so its import share is not included. Run from the repository root:
+
+    python benchmarks/cold_start.py --runs 5 --path /events
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RESULT_PREFIX = 'COLD_START_RESULT '
+
+
+def api_gateway_event(method: str, path: str):
+    """Minimal API Gateway REST (v1) proxy event"""
+    return {
+        'resource': '/{proxy+}',
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Host': 'localhost', 'Accept': 'application/json'},
+        'multiValueHeaders': {'Host': ['localhost'], 'Accept': ['application/json']},
+        'queryStringParameters': None,
+        'multiValueQueryStringParameters': None,
+        'pathParameters': {'proxy': path.lstrip('/')},
+        'stageVariables': None,
+        'requestContext': {
+            'resourcePath': '/{proxy+}',
+            'httpMethod': method,
+            'path': f'/prod{path}',
+            'stage': 'prod',
+            'requestId': 'cold-start-benchmark',
+            'identity': {'sourceIp': '127.0.0.1'},
+        },
+        'body': None,
+        'isBase64Encoded': False,
+    }
+
+
+def run_child(method: str, path: str):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from local_tables import start_local_dynamodb
+
+    start_local_dynamodb()
+
+    started = time.perf_counter()
+    import lambda_handler
+    imported = time.perf_counter()
+    response = lambda_handler.handler(api_gateway_event(method, path), None)
+    responded = time.perf_counter()
+
+    print(RESULT_PREFIX + json.dumps({
+        'importMs': round((imported - started) * 1000, 2),
+        'firstResponseMs': round((responded - imported) * 1000, 2),
+        'totalMs': round((responded - started) * 1000, 2),
+        'statusCode': response['statusCode'],
+    }))
+
+
+def summarize(label, values):
+    return f"{label:>16}: median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--path', default='/events')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.method, args.path)
+        return
+
+    results = []
+    for run in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--method', args.method, '--path', args.path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        lines = output.splitlines()
+        result = json.loads(next(line for line in lines if line.startswith(RESULT_PREFIX))[len(RESULT_PREFIX):])
+        breakdown = next((json.loads(line) for line in lines if line.startswith('{"message": "cold start"')), {})
+        results.append(result)
+        print(f"run {run + 1}: status {result['statusCode']}  total {result['totalMs']} ms  breakdown {breakdown}")
+
+    print()
+    print(summarize('import', [r['importMs'] for r in results]))
+    print(summarize('first response', [r['firstResponseMs'] for r in results]))
+    print(summarize('total', [r['totalMs'] for r in results]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Concurrent register/unregister load against one event, with correctness checks.
+
+Many asyncio workers hammer POST /events/{id}/register and
+DELETE /events/{id}/register/{userId} for the same event through an
+in-process ASGI client, so the synchronous handlers run concurrently in the
+threadpool against the local DynamoDB stand-in. After the run the harness
+reports throughput, latency percentiles and status codes, then checks:
+
+  * registeredCount <= capacity
+  * registeredCount matches the number of registered rows
+  * waitlist positions are contiguous from 1 with unique sequence numbers
+  * nobody is waitlisted while a seat is free
+  * no seats are still held for waitlist promotion
+  * no request failed with a server error other than 503
+
+The mock applies one request at a time, so on its own it never cancels a
+transaction with TransactionConflict the way DynamoDB does when concurrent
+transactions touch the same item. --conflict-rate injects those
+cancellations into that fraction of TransactWriteItems calls, before they
+reach the mock, to exercise the API's conflict retries.
+
+Run from the repository root:
+
+    python benchmarks/contention.py --workers 50 --operations 2000 --capacity 20
+    python benchmarks/contention.py --shards 4 --users 500
+    python benchmarks/contention.py --conflict-rate 0.3
+
+The script exits with status 1 if any invariant is violated.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from endpoints import percentile  # noqa: E402
+from local_tables import start_local_dynamodb  # noqa: E402
+
+EVENT_ID = 'contention-event'
+
+
+def seed(users: int, capacity: int, shards: int, waitlist: bool):
+    import boto3
+
+    resource = boto3.resource('dynamodb')
+    resource.Table('Events').put_item(Item={
+        'eventId': EVENT_ID,
+        'title': 'Contention event',
+        'description': 'Seeded by benchmarks/contention.py',
+        'date': '2025-06-01',
+        'location': 'Main hall',
+        'capacity': capacity,
+        'organizer': 'bench',
+        'status': 'active',
+        'hasWaitlist': waitlist,
+        'registeredCount': 0,
+        'counterShards': shards,
+    })
+    user_ids = [f'user-{i:05d}' for i in range(users)]
+    with resource.Table('Users').batch_writer() as writer:
+        for user_id in user_ids:
+            writer.put_item(Item={'userId': user_id, 'name': user_id, 'createdAt': '2025-01-01T00:00:00'})
+    return user_ids
+
+
+class _CancelledResponse:
+    status_code = 400
+
+
+def inject_transaction_conflicts(rate: float, seed: int):
+    """Cancel `rate` of TransactWriteItems calls with TransactionConflict instead of sending them"""
+    import db
+
+    rng = random.Random(seed)
+
+    def cancel(params, **kwargs):
+        if rng.random() >= rate:
+            return None
+        items = json.loads(params['body'])['TransactItems']
+        reasons = [{'Code': 'None'}] * len(items)
+        reasons[rng.randrange(len(items))] = {'Code': 'TransactionConflict', 'Message': 'Transaction is ongoing for the item'}
+        return _CancelledResponse(), {
+            'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled (injected)'},
+            'CancellationReasons': reasons,
+            'ResponseMetadata': {'HTTPStatusCode': 400},
+        }
+
+    # Returning a response from before-call skips the request and botocore's retries
+    db.get_client().meta.events.register('before-call.dynamodb.TransactWriteItems', cancel)
+
+
+async def worker(client, user_ids, operations: int, unregister_ratio: float, rng: random.Random, samples):
+    for _ in range(operations):
+        user_id = rng.choice(user_ids)
+        if rng.random() < unregister_ratio:
+            operation = 'unregister'
+            request = client.delete(f'/events/{EVENT_ID}/register/{user_id}')
+        else:
+            operation = 'register'
+            request = client.post(f'/events/{EVENT_ID}/register', json={'userId': user_id})
+        started = time.perf_counter()
+        response = await request
+        samples[operation].append(((time.perf_counter() - started) * 1000, response.status_code))
+
+
+async def run_load(app, user_ids, args):
+    import httpx
+
+    samples = defaultdict(list)
+    rng = random.Random(args.seed)
+    per_worker, extra = divmod(args.operations, args.workers)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://contention') as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, user_ids, per_worker + (1 if i < extra else 0), args.unregister_ratio,
+                   random.Random(rng.random()), samples)
+            for i in range(args.workers)
+        ))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def read_state():
+    """Event item, counter shards and registration rows, read consistently"""
+    import boto3
+    from boto3.dynamodb.conditions import Key
+
+    resource = boto3.resource('dynamodb')
+    event = resource.Table('Events').get_item(Key={'eventId': EVENT_ID}, ConsistentRead=True)['Item']
+    shard_counts = {}
+    held = int(event.get('heldSeats', 0))
+    kwargs = {'KeyConditionExpression': Key('eventId').eq(EVENT_ID), 'ConsistentRead': True}
+    while True:
+        response = resource.Table('EventCounters').query(**kwargs)
+        for item in response['Items']:
+            shard_counts[int(item['shardId'])] = int(item.get('registeredCount', 0))
+            held += int(item.get('heldSeats', 0))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    rows = []
+    kwargs = {'IndexName': 'eventId-index', 'KeyConditionExpression': Key('eventId').eq(EVENT_ID)}
+    while True:
+        response = resource.Table('Registrations').query(**kwargs)
+        rows.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return event, shard_counts, held, rows
+
+
+def check_invariants(client, samples, capacity: int, shards: int):
+    """Violated invariants as human-readable lines"""
+    event, shard_counts, held, rows = read_state()
+    violations = []
+    server_errors = Counter(
+        status for values in samples.values() for _, status in values if status >= 500 and status != 503
+    )
+    for status, count in sorted(server_errors.items()):
+        violations.append(f"{count} requests failed with {status}")
+    registered_rows = [row for row in rows if row.get('status') == 'registered']
+    waitlisted_rows = [row for row in rows if row.get('status') == 'waitlisted']
+    registered_count = sum(shard_counts.values()) if shards else int(event.get('registeredCount', 0))
+
+    if registered_count > capacity:
+        violations.append(f"registeredCount {registered_count} exceeds capacity {capacity}")
+    if held:
+        violations.append(f"{held} seats still held for waitlist promotion")
+    if registered_count != len(registered_rows):
+        violations.append(f"registeredCount {registered_count} but {len(registered_rows)} registered rows")
+    if shards:
+        per_shard = Counter(int(row['counterShard']) for row in registered_rows if 'counterShard' in row)
+        for shard_id in range(shards):
+            if per_shard.get(shard_id, 0) != shard_counts.get(shard_id, 0):
+                violations.append(
+                    f"shard {shard_id} count {shard_counts.get(shard_id, 0)} but {per_shard.get(shard_id, 0)} rows"
+                )
+
+    seqs = [row.get('waitlistSeq') for row in waitlisted_rows]
+    if any(seq is None for seq in seqs):
+        violations.append(f"{sum(seq is None for seq in seqs)} waitlisted rows without a waitlistSeq")
+    duplicates = [seq for seq, count in Counter(seqs).items() if seq is not None and count > 1]
+    if duplicates:
+        violations.append(f"duplicate waitlistSeq values {sorted(duplicates)[:10]}")
+
+    waitlist = client.get(f'/events/{EVENT_ID}/waitlist').json()
+    positions = [entry['waitlistPosition'] for entry in waitlist]
+    if positions != list(range(1, len(positions) + 1)):
+        violations.append(f"waitlist positions are not contiguous: {positions[:20]}")
+    if len(positions) != len(waitlisted_rows):
+        violations.append(f"waitlist endpoint returned {len(positions)} entries for {len(waitlisted_rows)} waitlisted rows")
+    if waitlisted_rows and len(registered_rows) < capacity:
+        violations.append(f"{len(waitlisted_rows)} waitlisted while {capacity - len(registered_rows)} seats are free")
+
+    summary = {'registered': len(registered_rows), 'waitlisted': len(waitlisted_rows), 'registeredCount': registered_count}
+    return summary, violations
+
+
+def report(samples, elapsed: float):
+    total = sum(len(values) for values in samples.values())
+    print(f"{total} requests in {elapsed:.2f} s ({total / elapsed:.1f} req/s)")
+    print(f"{'operation':<12} {'count':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  status codes")
+    for operation, values in sorted(samples.items()):
+        latencies = [latency for latency, _ in values]
+        statuses = Counter(status for _, status in values)
+        codes = ' '.join(f"{code}x{count}" for code, count in sorted(statuses.items()))
+        print(f"{operation:<12} {len(values):6d} {percentile(latencies, 50):8.1f} {percentile(latencies, 90):8.1f} "
+              f"{percentile(latencies, 99):8.1f} {max(latencies):8.1f}  {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=50)
+    parser.add_argument('--operations', type=int, default=2000, help='total requests across all workers')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=20)
+    parser.add_argument('--shards', type=int, default=0, help='counterShards for the event')
+    parser.add_argument('--no-waitlist', action='store_true')
+    parser.add_argument('--unregister-ratio', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--conflict-rate', type=float, default=0.0,
+                        help='fraction of TransactWriteItems calls cancelled with an injected TransactionConflict')
+    args = parser.parse_args()
+
+    start_local_dynamodb()
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    user_ids = seed(args.users, args.capacity, args.shards, not args.no_waitlist)
+    if args.conflict_rate:
+        inject_transaction_conflicts(args.conflict_rate, args.seed)
+    samples, elapsed = asyncio.run(run_load(app_module.app, user_ids, args))
+    report(samples, elapsed)
+
+    summary, violations = check_invariants(TestClient(app_module.app), samples, args.capacity, args.shards)
+    print(f"\nfinal state: {summary}")
+    if violations:
+        print("invariant violations:")
+        for line in violations:
+            print(f"  {line}")
+        sys.exit(1)
+    print("all invariants hold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""Latency and DynamoDB call counts for every endpoint at several data sizes.
+
+Seeds the local DynamoDB stand-in with events x users x registrations, then
+calls each endpoint through FastAPI's TestClient and reports latency
+percentiles plus DynamoDB calls per request (read from the Server-Timing
+header). Read endpoints target the busiest event and user so per-item
+hydration shows up as the data grows. Run from the repository root:
+
+    python benchmarks/endpoints.py --sizes small,medium
+    python benchmarks/endpoints.py --sizes 50x200x1000 --iterations 50
+    python benchmarks/endpoints.py --engine memory
+
+Results are compared with benchmarks/baseline.json; more DynamoDB calls per
+request, or a p50 slower than the latency tolerance, is reported as a
+regression and the script exits with status 1. Refresh the baseline with
+--save-baseline after an intended change. With --engine memory the backend
+runs on its in-memory storage engine instead of the DynamoDB stand-in, and
+its results are kept under their own baseline keys.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_tables import configure_environment, reset_tables, start_local_dynamodb  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# name: (events, users, registrations)
+SIZES = {
+    'small': (20, 100, 500),
+    'medium': (100, 500, 2500),
+    'large': (500, 2000, 10000),
+}
+
+OPEN_EVENT_ID = 'bench-open'
+DDB_CALLS = re.compile(r'ddb;dur=[\d.]+;desc="(\d+) calls')
+
+
+def parse_size(value: str):
+    if value in SIZES:
+        return value, SIZES[value]
+    try:
+        events, users, registrations = (int(part) for part in value.split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must be one of {', '.join(SIZES)} or EVENTSxUSERSxREGISTRATIONS")
+    return value, (events, users, registrations)
+
+
+def event_item(event_id: str, capacity: int, index: int):
+    return {
+        'eventId': event_id,
+        'title': f'Benchmark event {index}',
+        'description': 'Seeded by benchmarks/endpoints.py',
+        'date': f'2025-{index % 12 + 1:02d}-{index % 28 + 1:02d}',
+        'location': f'Hall {index % 7}',
+        'capacity': capacity,
+        'organizer': 'bench',
+        'status': 'active' if index % 3 else 'draft',
+        'hasWaitlist': True,
+        'registeredCount': 0,
+        'counterShards': 0,
+    }
+
+
+def seed(events: int, users: int, registrations: int, rng: random.Random):
+    """Write the seed data directly to the tables; returns the busiest event and user ids"""
+    import db
+
+    if registrations > events * users:
+        raise SystemExit(f"cannot seed {registrations} registrations for {events} events x {users} users")
+
+    engine = db.get_engine()
+    event_ids = [f'event-{i:05d}' for i in range(events)]
+    user_ids = [f'user-{i:05d}' for i in range(users)]
+    capacities = {event_id: rng.randint(5, 50) for event_id in event_ids}
+
+    pairs = set()
+    while len(pairs) < registrations:
+        pairs.add((rng.choice(user_ids), rng.choice(event_ids)))
+
+    per_event = Counter()
+    per_user = Counter()
+    with engine.get_table('Registrations').batch_writer() as writer:
+        for user_id, event_id in sorted(pairs):
+            per_event[event_id] += 1
+            per_user[user_id] += 1
+            item = {'userId': user_id, 'eventId': event_id, 'registeredAt': '2025-01-01T00:00:00'}
+            if per_event[event_id] <= capacities[event_id]:
+                item['status'] = 'registered'
+            else:
+                item['status'] = 'waitlisted'
+                item['waitlistSeq'] = per_event[event_id] - capacities[event_id]
+            writer.put_item(Item=item)
+
+    with engine.get_table('Events').batch_writer() as writer:
+        for index, event_id in enumerate(event_ids):
+            item = event_item(event_id, capacities[event_id], index)
+            item['registeredCount'] = min(per_event[event_id], capacities[event_id])
+            waitlisted = per_event[event_id] - item['registeredCount']
+            if waitlisted:
+                item['waitlistSeq'] = waitlisted
+                item['waitlistCount'] = waitlisted
+            writer.put_item(Item=item)
+        writer.put_item(Item=event_item(OPEN_EVENT_ID, 1_000_000, events))
+
+    with engine.get_table('Users').batch_writer() as writer:
+        for user_id in user_ids:
+            writer.put_item(Item={'userId': user_id, 'name': user_id, 'createdAt': '2025-01-01T00:00:00'})
+
+    busiest_event = per_event.most_common(1)[0][0] if per_event else event_ids[0]
+    busiest_user = per_user.most_common(1)[0][0] if per_user else user_ids[0]
+    return busiest_event, busiest_user
+
+
+def scenarios(event_id: str, user_id: str):
+    """(name, method, path, body[, headers]) factories; `i` is the iteration number"""
+    return [
+        ('GET /events', lambda i: ('GET', '/events', None)),
+        ('GET /events?limit=50', lambda i: ('GET', '/events?limit=50', None)),
+        ('GET /events?status=active', lambda i: ('GET', '/events?status=active', None)),
+        ('GET /events/{id}', lambda i: ('GET', f'/events/{event_id}', None)),
+        ('GET /events/{id}/registrations', lambda i: ('GET', f'/events/{event_id}/registrations', None)),
+        ('GET /events/{id}/waitlist', lambda i: ('GET', f'/events/{event_id}/waitlist', None)),
+        ('GET /events/availability', lambda i: ('GET', '/events/availability', None)),
+        ('GET /events/search?q=hall 3', lambda i: ('GET', '/events/search?q=hall%203&limit=20', None)),
+        ('GET /users', lambda i: ('GET', '/users', None)),
+        ('GET /users?limit=50', lambda i: ('GET', '/users?limit=50', None)),
+        ('GET /users/{id}', lambda i: ('GET', f'/users/{user_id}', None)),
+        ('GET /users/{id}/registrations', lambda i: ('GET', f'/users/{user_id}/registrations', None)),
+        ('GET /users/{id}/waitlist', lambda i: ('GET', f'/users/{user_id}/waitlist', None)),
+        ('POST /events', lambda i: ('POST', '/events', dict(event_item(f'bench-new-{i}', 10, i), registeredCount=0))),
+        ('PUT /events/{id}', lambda i: ('PUT', f'/events/bench-new-{i}', {'location': f'Room {i}'})),
+        ('POST /users', lambda i: ('POST', '/users', {'userId': f'bench-user-{i}', 'name': f'Bench {i}'})),
+        ('POST /users (Idempotency-Key replay)', lambda i: (
+            'POST', '/users', {'userId': 'bench-idempotent', 'name': 'Bench'}, {'Idempotency-Key': 'bench-idempotent'})),
+        ('POST /events/{id}/register', lambda i: ('POST', f'/events/{OPEN_EVENT_ID}/register', {'userId': f'bench-user-{i}'})),
+        ('DELETE /events/{id}/register/{userId}', lambda i: ('DELETE', f'/events/{OPEN_EVENT_ID}/register/bench-user-{i}', None)),
+        ('DELETE /events/{id}', lambda i: ('DELETE', f'/events/bench-new-{i}', None)),
+    ]
+
+
+def percentile(values, pct: float):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def run_scenario(client, build, iterations: int, warmup: int):
+    """Time one scenario; write scenarios use fresh ids per iteration so warmup shares the id space"""
+    latencies = []
+    calls = []
+    for i in range(warmup + iterations):
+        method, path, body, *headers = build(i)
+        started = time.perf_counter()
+        response = client.request(method, path, json=body, headers=headers[0] if headers else None)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise SystemExit(f"{method} {path} returned {response.status_code}: {response.text}")
+        if i < warmup:
+            continue
+        latencies.append(elapsed_ms)
+        match = DDB_CALLS.search(response.headers.get('server-timing', ''))
+        calls.append(int(match.group(1)) if match else 0)
+    return {
+        'p50Ms': round(percentile(latencies, 50), 2),
+        'p90Ms': round(percentile(latencies, 90), 2),
+        'p99Ms': round(percentile(latencies, 99), 2),
+        'maxMs': round(max(latencies), 2),
+        'ddbCalls': round(statistics.mean(calls), 2),
+    }
+
+
+def run_size(client, main, name: str, size, iterations: int, warmup: int):
+    import db
+
+    events, users, registrations = size
+    if db.STORAGE_ENGINE == 'memory':
+        db.get_engine().reset()
+    else:
+        reset_tables()
+    main.event_cache.clear()
+    main.availability_cache.clear()
+    main.user_cache.clear()
+    main.idempotency.cache.clear()
+    event_id, user_id = seed(events, users, registrations, random.Random(name))
+    main.search_index.clear()
+    main.reindex_events()
+
+    print(f"\n== {name}: {events} events x {users} users x {registrations} registrations ==")
+    print(f"{'endpoint':<40} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'ddb calls':>10}")
+    results = {}
+    for endpoint, build in scenarios(event_id, user_id):
+        result = run_scenario(client, build, iterations, warmup)
+        results[endpoint] = result
+        print(f"{endpoint:<40} {result['p50Ms']:8.1f} {result['p90Ms']:8.1f} {result['p99Ms']:8.1f} "
+              f"{result['maxMs']:8.1f} {result['ddbCalls']:10g}")
+    return results
+
+
+def compare(results, baseline, latency_tolerance: float):
+    """Regressions against the baseline as human-readable lines"""
+    regressions = []
+    for size, endpoints in results.items():
+        for endpoint, result in endpoints.items():
+            expected = baseline.get(size, {}).get(endpoint)
+            if expected is None:
+                continue
+            if result['ddbCalls'] > expected['ddbCalls']:
+                regressions.append(
+                    f"{size} {endpoint}: {result['ddbCalls']:g} DynamoDB calls per request (baseline {expected['ddbCalls']:g})"
+                )
+            if result['p50Ms'] > expected['p50Ms'] * (1 + latency_tolerance):
+                regressions.append(
+                    f"{size} {endpoint}: p50 {result['p50Ms']:.1f} ms (baseline {expected['p50Ms']:.1f} ms)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='small,medium', help=f"comma separated: {', '.join(SIZES)} or EVENTSxUSERSxREGISTRATIONS")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the new baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=1.0,
+                        help='allowed p50 slowdown as a fraction of the baseline (default 1.0 = 2x)')
+    parser.add_argument('--engine', choices=['dynamodb', 'memory'], default='dynamodb',
+                        help='storage engine the backend runs on (default: the local DynamoDB stand-in)')
+    args = parser.parse_args()
+    sizes = [parse_size(value) for value in args.sizes.split(',')]
+
+    if args.engine == 'memory':
+        os.environ['STORAGE_ENGINE'] = 'memory'
+        configure_environment()
+    else:
+        start_local_dynamodb()
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    client = TestClient(app_module.app)
+    suffix = ' (memory)' if args.engine == 'memory' else ''
+    results = {name + suffix: run_size(client, app_module, name, size, args.iterations, args.warmup)
+               for name, size in sizes}
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.latency_tolerance)
+    if regressions:
+        print("\nregressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nno regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
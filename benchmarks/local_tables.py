@@ -0,0 +1,169 @@
+"""Local DynamoDB stand-in with the same tables and indexes as BackendStack.
+
+Uses moto's in-process mock, so benchmarks run without AWS credentials or
+network access. Keep the layout below in sync with
+infrastructure/stacks/backend_stack.py.
+"""
+import os
+import sys
+import threading
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+TABLES = [
+    {
+        'TableName': 'Events',
+        'KeySchema': [{'AttributeName': 'eventId', 'KeyType': 'HASH'}],
+        'AttributeDefinitions': [
+            {'AttributeName': 'eventId', 'AttributeType': 'S'},
+            {'AttributeName': 'status', 'AttributeType': 'S'},
+            {'AttributeName': 'date', 'AttributeType': 'S'},
+        ],
+        'GlobalSecondaryIndexes': [
+            {
+                'IndexName': 'status-date-index',
+                'KeySchema': [
+                    {'AttributeName': 'status', 'KeyType': 'HASH'},
+                    {'AttributeName': 'date', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            },
+        ],
+    },
+    {
+        'TableName': 'Users',
+        'KeySchema': [{'AttributeName': 'userId', 'KeyType': 'HASH'}],
+        'AttributeDefinitions': [{'AttributeName': 'userId', 'AttributeType': 'S'}],
+    },
+    {
+        'TableName': 'EventCounters',
+        'KeySchema': [
+            {'AttributeName': 'eventId', 'KeyType': 'HASH'},
+            {'AttributeName': 'shardId', 'KeyType': 'RANGE'},
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'eventId', 'AttributeType': 'S'},
+            {'AttributeName': 'shardId', 'AttributeType': 'N'},
+        ],
+    },
+    {
+        'TableName': 'SearchIndex',
+        'KeySchema': [{'AttributeName': 'eventId', 'KeyType': 'HASH'}],
+        'AttributeDefinitions': [
+            {'AttributeName': 'eventId', 'AttributeType': 'S'},
+            {'AttributeName': 'indexShard', 'AttributeType': 'S'},
+            {'AttributeName': 'seq', 'AttributeType': 'N'},
+        ],
+        'GlobalSecondaryIndexes': [
+            {
+                'IndexName': 'seq-index',
+                'KeySchema': [
+                    {'AttributeName': 'indexShard', 'KeyType': 'HASH'},
+                    {'AttributeName': 'seq', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            },
+        ],
+    },
+    {
+        'TableName': 'IdempotencyKeys',
+        'KeySchema': [{'AttributeName': 'idempotencyKey', 'KeyType': 'HASH'}],
+        'AttributeDefinitions': [{'AttributeName': 'idempotencyKey', 'AttributeType': 'S'}],
+    },
+    {
+        'TableName': 'Jobs',
+        'KeySchema': [{'AttributeName': 'jobId', 'KeyType': 'HASH'}],
+        'AttributeDefinitions': [{'AttributeName': 'jobId', 'AttributeType': 'S'}],
+    },
+    {
+        'TableName': 'Registrations',
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},
+            {'AttributeName': 'eventId', 'KeyType': 'RANGE'},
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'eventId', 'AttributeType': 'S'},
+            {'AttributeName': 'waitlistSeq', 'AttributeType': 'N'},
+        ],
+        'GlobalSecondaryIndexes': [
+            {
+                'IndexName': 'eventId-index',
+                'KeySchema': [
+                    {'AttributeName': 'eventId', 'KeyType': 'HASH'},
+                    {'AttributeName': 'userId', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            },
+            {
+                'IndexName': 'eventId-waitlistSeq-index',
+                'KeySchema': [
+                    {'AttributeName': 'eventId', 'KeyType': 'HASH'},
+                    {'AttributeName': 'waitlistSeq', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'KEYS_ONLY'},
+            },
+        ],
+    },
+]
+
+
+def configure_environment():
+    """Point boto3 at a fake region/credentials and make backend/ importable"""
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def start_local_dynamodb():
+    """Start moto's DynamoDB mock and create every table; returns the mock to stop later"""
+    configure_environment()
+    from moto import mock_aws
+
+    serialize_mock_requests()
+    mock = mock_aws()
+    mock.start()
+    create_tables()
+    return mock
+
+
+def serialize_mock_requests():
+    """Process one mocked request at a time.
+
+    DynamoDB applies every request (condition check, ADD, transaction)
+    atomically, but moto's backends are not thread-safe. Without this,
+    concurrent benchmarks would report races that only exist in the mock.
+    """
+    from moto.core.botocore_stubber import BotocoreStubber
+
+    if getattr(BotocoreStubber.process_request, 'serialized', False):
+        return
+    process_request = BotocoreStubber.process_request
+    lock = threading.Lock()
+
+    def serialized_process_request(self, request):
+        with lock:
+            return process_request(self, request)
+
+    serialized_process_request.serialized = True
+    BotocoreStubber.process_request = serialized_process_request
+
+
+def create_tables():
+    import boto3
+
+    client = boto3.client('dynamodb')
+    for table in TABLES:
+        client.create_table(BillingMode='PAY_PER_REQUEST', **table)
+
+
+def reset_tables():
+    """Drop and recreate every table so the next run starts empty"""
+    import boto3
+
+    client = boto3.client('dynamodb')
+    for table in TABLES:
+        client.delete_table(TableName=table['TableName'])
+    create_tables()
@@ -3,6 +3,8 @@ from aws_cdk import (
     aws_dynamodb as dynamodb,
     aws_lambda as lambda_,
     aws_apigateway as apigateway,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_sqs as sqs,
     RemovalPolicy,
     Duration,
 )
@@ -25,6 +27,19 @@ class BackendStack(Stack):
             removal_policy=RemovalPolicy.DESTROY
         )
         
+        # Add GSI for listing events by status, sorted by date
+        events_table.add_global_secondary_index(
+            index_name="status-date-index",
+            partition_key=dynamodb.Attribute(
+                name="status",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="date",
+                type=dynamodb.AttributeType.STRING
+            )
+        )
+        
         users_table = dynamodb.Table(
             self, "UsersTable",
             table_name="Users",
@@ -51,6 +66,74 @@ class BackendStack(Stack):
             removal_policy=RemovalPolicy.DESTROY
         )
         
+        # Sharded registeredCount counters for hot events
+        counters_table = dynamodb.Table(
+            self, "EventCountersTable",
+            table_name="EventCounters",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="shardId",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        
+        # Progress of background jobs such as cascading event deletes; rows expire after a week
+        jobs_table = dynamodb.Table(
+            self, "JobsTable",
+            table_name="Jobs",
+            partition_key=dynamodb.Attribute(
+                name="jobId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        
+        # First responses of requests sent with an Idempotency-Key, replayed to retries for a day
+        idempotency_table = dynamodb.Table(
+            self, "IdempotencyKeysTable",
+            table_name="IdempotencyKeys",
+            partition_key=dynamodb.Attribute(
+                name="idempotencyKey",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        
+        # Compact per-event term lists for full-text search; delete tombstones expire
+        search_index_table = dynamodb.Table(
+            self, "SearchIndexTable",
+            table_name="SearchIndex",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        
+        # Changes in write order, so warm containers only read what changed since their last refresh
+        search_index_table.add_global_secondary_index(
+            index_name="seq-index",
+            partition_key=dynamodb.Attribute(
+                name="indexShard",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="seq",
+                type=dynamodb.AttributeType.NUMBER
+            )
+        )
+        
         # Add GSI for querying registrations by eventId
         registrations_table.add_global_secondary_index(
             index_name="eventId-index",
@@ -64,6 +147,37 @@ class BackendStack(Stack):
             )
         )
         
+        # Sparse GSI holding only waitlisted registrations, ordered by sequence
+        registrations_table.add_global_secondary_index(
+            index_name="eventId-waitlistSeq-index",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="waitlistSeq",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY
+        )
+        
+        # Deferred work such as waitlist promotion, cascading deletes and reindexing,
+        # consumed by a separate worker function. Cascades over large events can run
+        # for minutes, far past the API's timeout, so the worker gets Lambda's maximum
+        # and the visibility timeout is six times that, as AWS recommends for SQS event
+        # sources, so a batch still running is never redelivered to a second worker.
+        # Messages that keep failing end up in the dead-letter queue.
+        worker_timeout = Duration.minutes(15)
+        tasks_dlq = sqs.Queue(
+            self, "TasksDeadLetterQueue",
+            retention_period=Duration.days(14)
+        )
+        tasks_queue = sqs.Queue(
+            self, "TasksQueue",
+            visibility_timeout=Duration.minutes(6 * worker_timeout.to_minutes()),
+            dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=5, queue=tasks_dlq)
+        )
+        
         # Lambda Layer with dependencies
         deps_layer = lambda_.LayerVersion(
             self, "DependenciesLayer",
@@ -71,7 +185,19 @@ class BackendStack(Stack):
             compatible_runtimes=[lambda_.Runtime.PYTHON_3_12]
         )
         
-        # Lambda Function
+        environment = {
+            "EVENTS_TABLE_NAME": events_table.table_name,
+            "USERS_TABLE_NAME": users_table.table_name,
+            "REGISTRATIONS_TABLE_NAME": registrations_table.table_name,
+            "COUNTERS_TABLE_NAME": counters_table.table_name,
+            "JOBS_TABLE_NAME": jobs_table.table_name,
+            "SEARCH_INDEX_TABLE_NAME": search_index_table.table_name,
+            "IDEMPOTENCY_TABLE_NAME": idempotency_table.table_name,
+            "TASK_QUEUE_BACKEND": "sqs",
+            "TASK_QUEUE_URL": tasks_queue.queue_url
+        }
+        
+        # Lambda Functions: both run the same handler, which dispatches on the event type
         api_lambda = lambda_.Function(
             self, "EventsApiLambda",
             runtime=lambda_.Runtime.PYTHON_3_12,
@@ -79,17 +205,35 @@ class BackendStack(Stack):
             code=lambda_.Code.from_asset("../backend"),
             layers=[deps_layer],
             timeout=Duration.seconds(30),
-            environment={
-                "EVENTS_TABLE_NAME": events_table.table_name,
-                "USERS_TABLE_NAME": users_table.table_name,
-                "REGISTRATIONS_TABLE_NAME": registrations_table.table_name
-            }
+            environment=environment
+        )
+        worker_lambda = lambda_.Function(
+            self, "TasksWorkerLambda",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            handler="lambda_handler.handler",
+            code=lambda_.Code.from_asset("../backend"),
+            layers=[deps_layer],
+            timeout=worker_timeout,
+            environment=environment
         )
         
-        # Grant Lambda permissions to access DynamoDB
-        events_table.grant_read_write_data(api_lambda)
-        users_table.grant_read_write_data(api_lambda)
-        registrations_table.grant_read_write_data(api_lambda)
+        # Grant Lambda permissions to access DynamoDB and enqueue tasks
+        for function in (api_lambda, worker_lambda):
+            events_table.grant_read_write_data(function)
+            users_table.grant_read_write_data(function)
+            registrations_table.grant_read_write_data(function)
+            counters_table.grant_read_write_data(function)
+            jobs_table.grant_read_write_data(function)
+            search_index_table.grant_read_write_data(function)
+            idempotency_table.grant_read_write_data(function)
+            tasks_queue.grant_send_messages(function)
+        
+        worker_lambda.add_event_source(lambda_event_sources.SqsEventSource(
+            tasks_queue,
+            batch_size=10,
+            max_batching_window=Duration.seconds(1),
+            report_batch_item_failures=True
+        ))
         
         # API Gateway
         api = apigateway.LambdaRestApi(
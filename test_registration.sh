@@ -111,6 +111,9 @@ curl -X DELETE "$API_URL/events/event-reg-test-001/register/user-001"
 echo ""
 echo ""
 
+# Promotion runs from the task queue after the response
+sleep 3
+
 # 11. Check event registrations after promotion
 echo "11. Checking event registrations after promotion..."
 curl "$API_URL/events/event-reg-test-001/registrations"